@@ -2,11 +2,13 @@ from typing import List
 from whatsapp_agent._debug import Logger
 from whatsapp_agent.agents.b2b_business_support_agent.instructions import dynamic_instructions
 from whatsapp_agent.context.global_context import GlobalContext
-from agents import Agent, Runner, OpenAIResponsesModel, FileSearchTool
+from whatsapp_agent.agents.streaming import run_agent
+from whatsapp_agent.agents.cascade import ModelCascade
+from agents import Agent, OpenAIResponsesModel, FileSearchTool
 
 from whatsapp_agent.tools.customer_support.escalate_to_human import escalate_to_human_support_tool
 from whatsapp_agent.tools.customer_support.send_product_image import send_product_image_tool
-from whatsapp_agent.utils.vector_store import VectorStoreManager
+from whatsapp_agent.utils.vector_store import vector_store_registry
 
 from whatsapp_agent.tools.quickbook_tools.invoices import (
     check_invoice_status_tool,
@@ -19,10 +21,10 @@ from whatsapp_agent.tools.quickbook_tools.invoices import (
 )
 
 class B2BBusinessSupportAgent(Agent):
-    def __init__(self, mcp_server, openai_client, context:GlobalContext):
+    def __init__(self, mcp_server, openai_client, cascade: ModelCascade | None = None):
         self.boost_mcp_server = mcp_server
-        self.context = context
-       
+        self.cascade = cascade
+
         super().__init__(
             name="B2BBusinessSupportAgent",
             instructions=dynamic_instructions,
@@ -35,9 +37,8 @@ class B2BBusinessSupportAgent(Agent):
         )
     
     def _get_all_tools(self) -> List[str]:
-        manager = VectorStoreManager()
-        faq_vector_store_id = manager.get_vector_store_id("FAQ-Vector-Store")
-        doc_vector_store_id = manager.get_vector_store_id("Company-Docs-Vector-Store")
+        # Empty until the registry has loaded; the agent is rebuilt once it has
+        vector_store_ids = vector_store_registry.get_ids("FAQ-Vector-Store", "Company-Docs-Vector-Store")
         BASE_TOOLS = [
             escalate_to_human_support_tool,
             check_invoice_status_tool,
@@ -48,30 +49,23 @@ class B2BBusinessSupportAgent(Agent):
             get_due_date_tool,
             get_invoice_tool,
             send_product_image_tool,
-            FileSearchTool(
+        ]
+        if vector_store_ids:
+            BASE_TOOLS.append(FileSearchTool(
                 max_num_results=3,
-                vector_store_ids=[faq_vector_store_id, doc_vector_store_id],
+                vector_store_ids=vector_store_ids,
                 include_search_results=True,
-            )
-        ]
+            ))
         return BASE_TOOLS
 
-    async def run(self, input_text: str):
+    async def run(self, input_text: str, global_context: GlobalContext):
         # This method would handle the input text and interact with QuickBook services
-        response = await self._run_agent(input_text)
+        response = await self._run_agent(input_text, global_context)
         Logger.info(f"B2B Business Support Agent response: {response.final_output}")
-        await self._cleanup()
         return response.final_output_as(str)
 
-    async def _run_agent(self, input_text: str):
+    async def _run_agent(self, input_text: str, global_context: GlobalContext):
         # This method would process the input text and return a response
-        return await Runner.run(
-            starting_agent=self,
-            input=input_text,
-            context=self.context,
-        )
-
-    async def _cleanup(self):
-        if self.boost_mcp_server:
-            Logger.info("Cleaning up B2B Business Support Agent resources.")
-            await self.boost_mcp_server.cleanup()
\ No newline at end of file
+        if self.cascade:
+            return await self.cascade.run(self, input_text, global_context)
+        return await run_agent(self, input_text, global_context)
@@ -0,0 +1,171 @@
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from agents import Agent, RunConfig, OpenAIResponsesModel, ToolCallItem, ToolCallOutputItem
+from agents.exceptions import MaxTurnsExceeded, ModelBehaviorError
+from agents.result import RunResultBase
+from whatsapp_agent.agents.streaming import agent_stream, run_agent
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent._debug import Logger
+
+DEFAULT_MAX_REPLY_CHARS = 1500
+# Weight of the newest sample in the per-model latency average
+LATENCY_SMOOTHING = 0.2
+
+# Tools whose effects cannot be repeated; a turn that called one is never re-run
+SIDE_EFFECT_TOOLS = {
+    "escalate_to_human_support_tool",
+    "send_product_image_tool",
+    "process_warranty_claim",
+    "add_customer_to_waitlist",
+    "create_invoice_tool",
+    "get_referral_link",
+}
+
+_REFUSAL_RE = re.compile(
+    r"^\W*(i'?m sorry,? (but )?i (can'?t|cannot|am unable)|i (can'?t|cannot) (help|assist) with|as an ai\b)",
+    re.IGNORECASE,
+)
+_TOOL_ERROR_MARKER = "An error occurred while running the tool"
+
+
+def _max_reply_chars() -> int:
+    try:
+        return int(Config.get("CASCADE_MAX_REPLY_CHARS", DEFAULT_MAX_REPLY_CHARS))
+    except (TypeError, ValueError):
+        return DEFAULT_MAX_REPLY_CHARS
+
+
+def _called_tools(result: RunResultBase) -> List[str]:
+    return [
+        getattr(item.raw_item, "name", None) or ""
+        for item in result.new_items if isinstance(item, ToolCallItem)
+    ]
+
+
+def validate_result(agent: Agent, result: RunResultBase) -> Optional[str]:
+    """
+    Cheap checks on a smaller model's turn.
+    Returns the reason to escalate to the next tier, or None to accept the result.
+    """
+    for item in result.new_items:
+        if isinstance(item, ToolCallOutputItem) and _TOOL_ERROR_MARKER in str(item.output):
+            return "tool call failed"
+
+    output = result.final_output
+    if agent.output_type not in (None, str):
+        return None if isinstance(output, agent.output_type) else "invalid structured output"
+
+    text = str(output or "").strip()
+    if not text:
+        return "empty reply"
+    if len(text) > _max_reply_chars():
+        return "reply too long"
+    if _REFUSAL_RE.search(text):
+        return "refusal"
+    return None
+
+
+@dataclass
+class CascadeStats:
+    turns: int = 0
+    escalations: int = 0
+    accepted: Dict[str, int] = field(default_factory=dict)
+    escalation_reasons: Dict[str, int] = field(default_factory=dict)
+    avg_latency: Dict[str, float] = field(default_factory=dict)
+    latency_saved_seconds: float = 0.0
+
+    def observe_latency(self, model: str, seconds: float):
+        previous = self.avg_latency.get(model)
+        self.avg_latency[model] = seconds if previous is None else previous + LATENCY_SMOOTHING * (seconds - previous)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "escalations": self.escalations,
+            "accepted": dict(self.accepted),
+            "escalation_reasons": dict(self.escalation_reasons),
+            "avg_latency_seconds": {model: round(s, 3) for model, s in self.avg_latency.items()},
+            "latency_saved_seconds": round(self.latency_saved_seconds, 3),
+        }
+
+
+# Kept outside the cascades so stats survive agents being rebuilt on config changes
+cascade_stats: Dict[str, CascadeStats] = {}
+
+
+class ModelCascade:
+    """
+    Runs an agent on increasingly larger models until a turn passes validation.
+
+    Tiers come from Config as a comma separated list, smallest first, e.g.
+    D2C_AGENT_MODEL_TIERS="gpt-4.1-mini,gpt-4.1". The same agent instance is used for
+    every tier; the model is swapped through RunConfig. The last tier is always accepted.
+    """
+
+    def __init__(self, name: str, models: List[str], openai_client):
+        self.name = name
+        self.tiers: List[Tuple[str, OpenAIResponsesModel]] = [
+            (model, OpenAIResponsesModel(model=model, openai_client=openai_client)) for model in models
+        ]
+        self.stats = cascade_stats.setdefault(name, CascadeStats())
+
+    @classmethod
+    def from_config(cls, name: str, config_key: str, openai_client) -> Optional["ModelCascade"]:
+        """Build a cascade from `config_key`, or None when it is not configured."""
+        value = Config.get(config_key)
+        models = [m.strip() for m in str(value).split(",") if m.strip()] if value else []
+        if not models:
+            return None
+        Logger.info(f"{name} model tiers: {' -> '.join(models)}")
+        return cls(name, models, openai_client)
+
+    async def run(self, agent: Agent, input_text: str, context: Any) -> RunResultBase:
+        started = time.monotonic()
+        self.stats.turns += 1
+        for index, (model_name, model) in enumerate(self.tiers):
+            last_tier = index == len(self.tiers) - 1
+            tier_started = time.monotonic()
+            try:
+                result = await run_agent(agent, input_text, context, run_config=RunConfig(model=model))
+            except (ModelBehaviorError, MaxTurnsExceeded) as e:
+                if last_tier:
+                    raise
+                await self._escalate(model_name, type(e).__name__)
+                continue
+            self.stats.observe_latency(model_name, time.monotonic() - tier_started)
+
+            reason = None
+            if not last_tier:
+                if SIDE_EFFECT_TOOLS.intersection(_called_tools(result)):
+                    Logger.debug(f"{self.name}: accepting {model_name} turn that already ran side-effecting tools")
+                else:
+                    reason = validate_result(agent, result)
+            if reason is None:
+                self._record_turn(model_name, time.monotonic() - started)
+                return result
+            await self._escalate(model_name, reason)
+
+    async def _escalate(self, model_name: str, reason: str):
+        self.stats.escalations += 1
+        self.stats.escalation_reasons[reason] = self.stats.escalation_reasons.get(reason, 0) + 1
+        Logger.info(f"{self.name}: escalating from {model_name} ({reason})")
+        stream = agent_stream.get()
+        if stream is not None:
+            # The dashboard already shows the rejected draft
+            await stream.reset()
+
+    def _record_turn(self, model_name: str, elapsed: float):
+        self.stats.accepted[model_name] = self.stats.accepted.get(model_name, 0) + 1
+        # Saved time is measured against the running average of the largest tier;
+        # escalated turns count negatively for the time spent on the smaller tiers
+        largest = self.tiers[-1][0]
+        baseline = self.stats.avg_latency.get(largest)
+        saved = baseline - elapsed if baseline is not None else 0.0
+        self.stats.latency_saved_seconds += saved
+        Logger.info(f"{self.name}: answered with {model_name} in {elapsed:.2f}s (saved ~{saved:.2f}s vs {largest})")
+
+
+def cascade_metrics() -> Dict[str, Any]:
+    return {name: stats.to_dict() for name, stats in cascade_stats.items()}
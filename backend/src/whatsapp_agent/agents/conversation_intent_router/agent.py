@@ -1,11 +1,15 @@
-from agents import Agent, Runner, ModelBehaviorError, OpenAIResponsesModel
+from agents import Agent, ModelBehaviorError, OpenAIResponsesModel
 from whatsapp_agent.agents.conversation_intent_router.instructions import dynamic_instructions
 from whatsapp_agent.agents.conversation_intent_router.output_type import SentimentAnalysisResult
+from whatsapp_agent.agents.conversation_intent_router.fast_path import intent_fast_path
+from whatsapp_agent.agents.cascade import ModelCascade
+from whatsapp_agent.agents.streaming import run_agent
 from whatsapp_agent._debug import Logger
 from whatsapp_agent.context.global_context import GlobalContext
 
 class ConversationIntentRouter(Agent):
-    def __init__(self, openai_client):
+    def __init__(self, openai_client, cascade: ModelCascade | None = None):
+        self.cascade = cascade
         super().__init__(
             name="ConversationIntentRouter",
             instructions=dynamic_instructions,
@@ -18,10 +22,17 @@ class ConversationIntentRouter(Agent):
 
     async def run(self, input_text: str, global_context: GlobalContext):
         """Handle the input text, decide routing, and return the next agent name."""
+        customer_type = global_context.customer_context.customer_type
+        # Confident local decisions skip the LLM call entirely
+        fast_path, use_fast_path = intent_fast_path.route(input_text, customer_type)
+        if use_fast_path:
+            return fast_path.to_result(input_text)
+
         response = await self._run_agent(input_text, global_context)
         Logger.debug(f"Conversation Intent Router response: {response.final_output}")
         try:
             sentiment = response.final_output_as(SentimentAnalysisResult)
+            intent_fast_path.record_decision(input_text, customer_type, sentiment.next_agent, fast_path)
             return sentiment
         except Exception as e:
             Logger.error(f"{__name__}: {self.run.__name__} -> Error processing response in Conversation Intent Router: {e}")
@@ -30,9 +41,7 @@ class ConversationIntentRouter(Agent):
 
     async def _run_agent(self, input_text: str, global_context: GlobalContext):
         """Process the input text and return routing decision."""
-        return await Runner.run(
-            starting_agent=self,
-            input=input_text,
-            context=global_context
-        )
+        if self.cascade:
+            return await self.cascade.run(self, input_text, global_context)
+        return await run_agent(self, input_text, global_context)
 
@@ -0,0 +1,356 @@
+import json
+import math
+import random
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from whatsapp_agent.agents.conversation_intent_router.output_type import SentimentAnalysisResult
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent._debug import Logger
+
+GREETING_AGENT = "CustomerGreetingAgent"
+D2C_AGENT = "D2CCustomerSupportAgent"
+B2B_AGENT = "B2BBusinessSupportAgent"
+AGENTS = (GREETING_AGENT, D2C_AGENT, B2B_AGENT)
+
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_HASH_DIM = 2 ** 18
+# Shorter messages ("yes", "ok") are follow-ups the LLM resolves from history
+MIN_MODEL_TOKENS = 3
+
+_TOKEN_RE = re.compile(r"[a-z0-9#]+")
+
+# (name, pattern, intent); "support" is mapped to D2C or B2B by customer type,
+# mirroring the router's customer type override
+RULES: List[Tuple[str, re.Pattern, str]] = [
+    (
+        "greeting",
+        re.compile(
+            r"^\W*(hi+|hello+|hey+|helo|salam|salaam|aoa|assalam\s*[ou]?\s*alaikum|asalam\s*[ou]?\s*alaikum"
+            r"|good\s+(morning|afternoon|evening))"
+            r"(\s+(there|team|boost|bro|sir|dear))?\W*$",
+            re.IGNORECASE,
+        ),
+        "greeting",
+    ),
+    (
+        "order_number",
+        re.compile(r"(#\s*\d{4,}|\border\s*(no\.?|number|id|#)?\s*:?\s*\d{4,}|\btrack(ing)?\b.{0,40}\border\b)", re.IGNORECASE),
+        "support",
+    ),
+    (
+        "human_handoff",
+        re.compile(
+            r"\b(human|real\s+person|representative|live\s+agent|customer\s+care"
+            r"|talk\s+to\s+(someone|a\s+person|an?\s+agent|support))\b",
+            re.IGNORECASE,
+        ),
+        "support",
+    ),
+]
+
+
+def _agent_for(intent_or_agent: str, customer_type: Optional[str]) -> str:
+    """Apply the customer type override to a support intent or predicted agent."""
+    if intent_or_agent in ("greeting", GREETING_AGENT):
+        return GREETING_AGENT
+    return B2B_AGENT if customer_type == "B2B" else D2C_AGENT
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class HashedNGramModel:
+    """
+    Multinomial logistic regression over hashed word uni/bigrams and character trigrams.
+    Weights are stored sparsely so the model file only holds features seen in training.
+    """
+
+    def __init__(self, dim: int = DEFAULT_HASH_DIM, labels: Iterable[str] = AGENTS):
+        self.dim = dim
+        self.labels = list(labels)
+        self.weights: Dict[str, Dict[int, float]] = {label: {} for label in self.labels}
+        self.bias: Dict[str, float] = {label: 0.0 for label in self.labels}
+
+    def features(self, text: str, customer_type: Optional[str] = None) -> Dict[int, float]:
+        tokens = tokenize(text)
+        grams = [f"w:{t}" for t in tokens]
+        grams += [f"b:{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+        for token in tokens:
+            padded = f"<{token}>"
+            grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        if customer_type:
+            grams.append(f"t:{customer_type}")
+
+        features: Dict[int, float] = {}
+        for gram in grams:
+            # crc32 rather than hash() so indices are stable across processes
+            index = zlib.crc32(gram.encode("utf-8")) % self.dim
+            features[index] = features.get(index, 0.0) + 1.0
+        norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+        return {i: v / norm for i, v in features.items()}
+
+    def _scores(self, features: Dict[int, float]) -> Dict[str, float]:
+        return {
+            label: self.bias[label] + sum(self.weights[label].get(i, 0.0) * v for i, v in features.items())
+            for label in self.labels
+        }
+
+    def predict_proba(self, text: str, customer_type: Optional[str] = None) -> Dict[str, float]:
+        scores = self._scores(self.features(text, customer_type))
+        top = max(scores.values())
+        exps = {label: math.exp(score - top) for label, score in scores.items()}
+        total = sum(exps.values())
+        return {label: value / total for label, value in exps.items()}
+
+    def predict(self, text: str, customer_type: Optional[str] = None) -> Tuple[str, float]:
+        probabilities = self.predict_proba(text, customer_type)
+        label = max(probabilities, key=probabilities.get)
+        return label, probabilities[label]
+
+    def fit(self, samples: List[Dict[str, Any]], epochs: int = 10, learning_rate: float = 0.5, l2: float = 1e-5, seed: int = 13):
+        """Train with plain SGD on softmax cross-entropy; samples use the decision log format."""
+        rows = [
+            (self.features(s["text"], s.get("customer_type")), s["next_agent"])
+            for s in samples if s.get("next_agent") in self.labels
+        ]
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(rows)
+            rate = learning_rate / (1 + epoch)
+            loss = 0.0
+            for features, label in rows:
+                scores = self._scores(features)
+                top = max(scores.values())
+                exps = {l: math.exp(s - top) for l, s in scores.items()}
+                total = sum(exps.values())
+                loss -= math.log(max(exps[label] / total, 1e-12))
+                for l in self.labels:
+                    gradient = exps[l] / total - (1.0 if l == label else 0.0)
+                    weights = self.weights[l]
+                    for i, v in features.items():
+                        weights[i] = weights.get(i, 0.0) * (1 - rate * l2) - rate * gradient * v
+                    self.bias[l] -= rate * gradient
+            Logger.info(f"Epoch {epoch + 1}/{epochs}: loss {loss / max(len(rows), 1):.4f}")
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "dim": self.dim,
+            "labels": self.labels,
+            "bias": self.bias,
+            "weights": {label: {str(i): round(w, 6) for i, w in weights.items() if abs(w) > 1e-6} for label, weights in self.weights.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HashedNGramModel":
+        model = cls(dim=data["dim"], labels=data["labels"])
+        model.bias = {label: float(b) for label, b in data["bias"].items()}
+        model.weights = {label: {int(i): float(w) for i, w in weights.items()} for label, weights in data["weights"].items()}
+        return model
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNGramModel":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+@dataclass
+class FastPathDecision:
+    next_agent: str
+    confidence: float
+    source: str  # "rule" or "model"
+    reason: str
+
+    def to_result(self, input_text: str) -> SentimentAnalysisResult:
+        return SentimentAnalysisResult(
+            user_message=input_text,
+            next_agent=self.next_agent,
+            routing_reasoning=f"Fast path {self.source} '{self.reason}' ({self.confidence:.2f})",
+        )
+
+
+def _config_flag(key: str, default: bool) -> bool:
+    value = Config.get(key, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def is_router_label(sample: Dict[str, Any]) -> bool:
+    """True for decisions made by the LLM router (older logs have no source)."""
+    return sample.get("source", "router") == "router"
+
+
+def load_samples(path: str) -> List[Dict[str, Any]]:
+    """Read a decision log written by IntentFastPath.record_decision."""
+    samples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                samples.append(json.loads(line))
+    return samples
+
+
+class IntentFastPath:
+    """
+    CPU-only routing stage in front of the LLM ConversationIntentRouter.
+
+    Keyword/regex rules catch unambiguous messages (plain greetings, order numbers,
+    requests for a human); a hashed n-gram model trained from logged router decisions
+    handles the rest when its confidence reaches INTENT_FAST_PATH_THRESHOLD. Anything
+    below that falls back to the LLM router. Messages routed here skip the router's
+    profile extraction (name, email, interest groups), which only the LLM performs.
+
+    Runs in shadow mode by default: the LLM router decides and the fast path is only
+    compared with it. Enable it once the agreement metrics have been reviewed.
+
+    Config:
+    - INTENT_FAST_PATH_ENABLED: use fast path decisions (default false)
+    - INTENT_FAST_PATH_MODEL_PATH: trained model file; rules only when unset
+    - INTENT_FAST_PATH_THRESHOLD: minimum model confidence (default 0.9)
+    - INTENT_FAST_PATH_COMPARE: always run the LLM router and record agreement (default true)
+    - INTENT_ROUTER_LOG_PATH: append routing decisions here as training data, each with
+      its source ("router", "rule" or "model")
+    """
+
+    def __init__(self):
+        self._model: Optional[HashedNGramModel] = None
+        self._model_path: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "rule_hits": 0,
+            "model_hits": 0,
+            "fallbacks": 0,
+            "compared": 0,
+            "agreed": 0,
+        }
+
+    @staticmethod
+    def enabled() -> bool:
+        return _config_flag("INTENT_FAST_PATH_ENABLED", False)
+
+    @staticmethod
+    def compare_mode() -> bool:
+        return _config_flag("INTENT_FAST_PATH_COMPARE", True)
+
+    @staticmethod
+    def threshold() -> float:
+        try:
+            return float(Config.get("INTENT_FAST_PATH_THRESHOLD", DEFAULT_THRESHOLD))
+        except (TypeError, ValueError):
+            return DEFAULT_THRESHOLD
+
+    def _get_model(self) -> Optional[HashedNGramModel]:
+        path = Config.get("INTENT_FAST_PATH_MODEL_PATH")
+        if not path:
+            return None
+        if path != self._model_path:
+            with self._lock:
+                if path != self._model_path:
+                    try:
+                        self._model = HashedNGramModel.load(path)
+                        Logger.info(f"Loaded intent fast path model from {path}")
+                    except Exception as e:
+                        Logger.error(f"{__name__}: _get_model -> Failed to load intent model from {path}: {e}")
+                        self._model = None
+                    self._model_path = path
+        return self._model
+
+    def reload(self):
+        """Force the model file to be read again on next use."""
+        with self._lock:
+            self._model_path = None
+            self._model = None
+
+    def classify(self, input_text: str, customer_type: Optional[str] = None) -> Optional[FastPathDecision]:
+        """Return a confident routing decision, or None to defer to the LLM router."""
+        for name, pattern, intent in RULES:
+            if pattern.search(input_text or ""):
+                return FastPathDecision(_agent_for(intent, customer_type), 1.0, "rule", name)
+
+        model = self._get_model()
+        if model is None or len(tokenize(input_text)) < MIN_MODEL_TOKENS:
+            return None
+        label, confidence = model.predict(input_text, customer_type)
+        if confidence < self.threshold():
+            return None
+        return FastPathDecision(_agent_for(label, customer_type), confidence, "model", label)
+
+    def route(self, input_text: str, customer_type: Optional[str] = None) -> Tuple[Optional[FastPathDecision], bool]:
+        """
+        Classify a message and decide whether the LLM router still has to run.
+        Returns (decision, use_decision).
+        """
+        if not self.enabled() and not self.compare_mode():
+            return None, False
+        decision = self.classify(input_text, customer_type)
+        if decision is None:
+            self._stats["fallbacks"] += 1
+            return None, False
+        if self.compare_mode() or not self.enabled():
+            # Shadow mode: the LLM router decides, the fast path is only compared
+            return decision, False
+        self._stats[f"{decision.source}_hits"] += 1
+        Logger.info(f"Fast path routed to {decision.next_agent} ({decision.source}: {decision.reason})")
+        self._log({
+            "text": input_text,
+            "customer_type": customer_type,
+            "next_agent": decision.next_agent,
+            "source": decision.source,
+            "reason": decision.reason,
+        })
+        return decision, True
+
+    def record_decision(self, input_text: str, customer_type: Optional[str], next_agent: str, fast_path: Optional[FastPathDecision] = None):
+        """Log an LLM router decision for training and track agreement with the fast path."""
+        if fast_path is not None:
+            self._stats["compared"] += 1
+            agreed = fast_path.next_agent == next_agent
+            self._stats["agreed"] += agreed
+            if not agreed:
+                Logger.info(f"Fast path disagreed: {fast_path.next_agent} ({fast_path.source}: {fast_path.reason}) vs router {next_agent}")
+
+        record = {"text": input_text, "customer_type": customer_type, "next_agent": next_agent, "source": "router"}
+        if fast_path is not None:
+            record["fast_path"] = fast_path.next_agent
+        self._log(record)
+
+    def _log(self, record: Dict[str, Any]):
+        """Append a routing decision to INTENT_ROUTER_LOG_PATH, if set."""
+        path = Config.get("INTENT_ROUTER_LOG_PATH")
+        if not path:
+            return
+        try:
+            with self._lock, open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            Logger.error(f"{__name__}: _log -> Failed to log routing decision to {path}: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        compared = self._stats["compared"]
+        return {
+            "enabled": self.enabled(),
+            "compare_mode": self.compare_mode(),
+            "model_loaded": self._model is not None,
+            **self._stats,
+            "agreement": round(self._stats["agreed"] / compared, 4) if compared else None,
+        }
+
+
+intent_fast_path = IntentFastPath()
+
+
+def _on_fast_path_config_change(new_version: int):
+    """Pick up a retrained model file on the next message."""
+    intent_fast_path.reload()
+
+Config.add_listener(_on_fast_path_config_change)
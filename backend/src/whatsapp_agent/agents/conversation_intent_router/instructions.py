@@ -1,5 +1,12 @@
 from agents import Agent, RunContextWrapper
 from whatsapp_agent.context.global_context import GlobalContext
+from whatsapp_agent.context.instruction_builder import (
+    PromptSection,
+    build_instructions,
+    CUSTOMER_CONTEXT_TEMPLATE,
+    CHAT_HISTORY_TEMPLATE,
+    CONVERSATION_SUMMARY_TEMPLATE,
+)
 
 BASE_INSTRUCTIONS = """
 # Role and Objective
@@ -198,22 +205,6 @@ Output must be a single, valid JSON object with this exact structure:
 }}
 ```
 
-# Context Processing
-
-## Chat History Format
-```
-<<<CHAT_HISTORY>>>
-{messages}
-<<<END_CHAT_HISTORY>>>
-```
-
-## Customer Context Format  
-```
-<<<CUSTOMER_CONTEXT>>>
-{customer_context}
-<<<END_CUSTOMER_CONTEXT>>>
-```
-
 # Final Validation Checklist
 
 Before outputting, verify:
@@ -228,10 +219,20 @@ Before outputting, verify:
 - [ ] `interest_groups` contains only allowed vocabulary terms
 - [ ] Null values properly formatted
 - [ ] No extra fields or explanatory text included
+
+# Context Processing
+The customer context and chat history to analyze follow below.
 """
 
+# The whole prompt above is static and cached by prefix; braces in the examples are escaped for str.format
+STATIC_INSTRUCTIONS = BASE_INSTRUCTIONS.format()
+
 async def dynamic_instructions(wrapper: RunContextWrapper[GlobalContext], agent: Agent) -> str:
-    return BASE_INSTRUCTIONS.format(
-    messages=wrapper.context.messages.formatted_message,
-    customer_context=wrapper.context.customer_context.formatted_context
-)
+    return build_instructions(
+        STATIC_INSTRUCTIONS,
+        [
+            PromptSection("customer_context", "## Customer Context\n" + CUSTOMER_CONTEXT_TEMPLATE, wrapper.context.customer_context.formatted_context),
+            PromptSection("conversation_summary", "## Earlier Conversation\n" + CONVERSATION_SUMMARY_TEMPLATE, wrapper.context.messages.summary or ""),
+            PromptSection("chat_history", "## Chat History\n" + CHAT_HISTORY_TEMPLATE, wrapper.context.messages.formatted_message, keep="tail"),
+        ],
+    )
@@ -1,11 +1,11 @@
-from agents import Agent, Runner, OpenAIResponsesModel
+from agents import Agent, OpenAIResponsesModel
 from whatsapp_agent.agents.customer_greeting_agent.instructions import dynamic_instructions
 from whatsapp_agent._debug import Logger
 from whatsapp_agent.context.global_context import GlobalContext
+from whatsapp_agent.agents.streaming import run_agent
 
 class CustomerGreetingAgent(Agent):
-    def __init__(self, openai_client, context:GlobalContext):
-        self.context = context
+    def __init__(self, openai_client):
         super().__init__(
             name="Customer Greeting Agent",
             instructions=dynamic_instructions,
@@ -15,21 +15,17 @@ class CustomerGreetingAgent(Agent):
             )
         )
         
-    async def run(self, input_text: str):
+    async def run(self, input_text: str, global_context: GlobalContext):
         """
         Handles incoming friendly or neutral greeting messages from customers.
         Generates a warm, short, WhatsApp-friendly response.
         """
-        response = await self._run_agent(input_text)
+        response = await self._run_agent(input_text, global_context)
         Logger.info(f"CustomerGreetingAgent response: {response.final_output_as(str)}")
         return response.final_output_as(str)
 
-    async def _run_agent(self, input_text: str):
+    async def _run_agent(self, input_text: str, global_context: GlobalContext):
         """
         Processes the greeting and returns a polite, conversational response.
         """
-        return await Runner.run(
-            starting_agent=self,
-            input=input_text,
-            context=self.context
-        )
+        return await run_agent(self, input_text, global_context)
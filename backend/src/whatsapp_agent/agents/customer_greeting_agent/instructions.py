@@ -1,40 +1,33 @@
 from agents import Agent, RunContextWrapper
 from whatsapp_agent.context.global_context import GlobalContext
-from whatsapp_agent.database.boost_buddy_persona import PersonaDB
+from whatsapp_agent.database.boost_buddy_persona import persona_cache
 from whatsapp_agent.utils.current_time import _get_current_karachi_time_str
+from whatsapp_agent.context.instruction_builder import (
+  PromptSection,
+  build_instructions,
+  CUSTOMER_CONTEXT_TEMPLATE,
+  CHAT_HISTORY_TEMPLATE,
+  CONVERSATION_SUMMARY_TEMPLATE,
+  CURRENT_TIME_TEMPLATE,
+)
 
-BASE_INSTRUCTIONS = """
+# Static prefix: identical for every customer so it can be served from the prompt cache
+STATIC_INSTRUCTIONS = """
 {persona}
 
 ## Context Provided
-```
-<<<CHAT_HISTORY>>>
-{messages}
-<<<END_CHAT_HISTORY>>>
-```
-
----
-```
-<<<CUSTOMER_CONTEXT>>>
-{customer_context}
-<<<END_CUSTOMER_CONTEXT>>>
-```
-
----
-```
-Current Time:
-{current_time}
-```
 """
 
 
 async def dynamic_instructions(wrapper: RunContextWrapper[GlobalContext], agent: Agent) -> str:
-  db = PersonaDB()
-  persona = db.get_persona("customer_greeting_agent")
+  persona = persona_cache.get("customer_greeting_agent")
   current_time = _get_current_karachi_time_str()
-  return BASE_INSTRUCTIONS.format(
-    persona=persona,
-    messages=wrapper.context.messages.formatted_message,
-    current_time=current_time,
-    customer_context=wrapper.context.customer_context.formatted_context,
+  return build_instructions(
+    STATIC_INSTRUCTIONS.format(persona=persona),
+    [
+      PromptSection("customer_context", CUSTOMER_CONTEXT_TEMPLATE, wrapper.context.customer_context.formatted_context),
+      PromptSection("conversation_summary", CONVERSATION_SUMMARY_TEMPLATE, wrapper.context.messages.summary or ""),
+      PromptSection("chat_history", CHAT_HISTORY_TEMPLATE, wrapper.context.messages.formatted_message, keep="tail"),
+      PromptSection("current_time", CURRENT_TIME_TEMPLATE, current_time),
+    ],
   )
\ No newline at end of file
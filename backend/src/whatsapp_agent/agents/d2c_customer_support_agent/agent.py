@@ -2,7 +2,9 @@ from typing import List
 from whatsapp_agent._debug import Logger
 from whatsapp_agent.agents.d2c_customer_support_agent.instructions import dynamic_instructions
 from whatsapp_agent.context.global_context import GlobalContext
-from agents import Agent, Runner, OpenAIResponsesModel, FileSearchTool
+from whatsapp_agent.agents.streaming import run_agent
+from whatsapp_agent.agents.cascade import ModelCascade
+from agents import Agent, OpenAIResponsesModel, FileSearchTool
 
 # Customer support tools
 from whatsapp_agent.tools.customer_support.escalate_to_human import escalate_to_human_support_tool
@@ -11,16 +13,18 @@ from whatsapp_agent.tools.customer_support.send_product_image import send_produc
 from whatsapp_agent.tools.customer_support.referral_link import get_referral_link
 from whatsapp_agent.tools.customer_support.waitlist_tool import add_customer_to_waitlist, check_customer_waitlist
 from whatsapp_agent.tools.customer_support.warranty_claim import process_warranty_claim
-from whatsapp_agent.utils.vector_store import VectorStoreManager
+from whatsapp_agent.utils.vector_store import vector_store_registry
+from whatsapp_agent.utils.semantic_cache import semantic_answer_cache
 
 
 from agents import RunContextWrapper
 
 
 class D2CCustomerSupportAgent(Agent):
-    def __init__(self, mcp_server, openai_client, context:GlobalContext): 
+    def __init__(self, mcp_server, openai_client, include_referral_tool: bool = False, cascade: ModelCascade | None = None):
         self.boost_mcp_server = mcp_server
-        self.context = context
+        self.include_referral_tool = include_referral_tool
+        self.cascade = cascade
 
         super().__init__(
             name="D2C Customer Support Agent",
@@ -34,9 +38,8 @@ class D2CCustomerSupportAgent(Agent):
         )
 
     def _get_all_tools(self) -> List[str]:
-        manager = VectorStoreManager()
-        faq_vector_store_id = manager.get_vector_store_id("FAQ-Vector-Store")
-        doc_vector_store_id = manager.get_vector_store_id("Company-Docs-Vector-Store")
+        # Empty until the registry has loaded; the agent is rebuilt once it has
+        vector_store_ids = vector_store_registry.get_ids("FAQ-Vector-Store", "Company-Docs-Vector-Store")
 
         BASE_TOOLS = [
             track_customer_order_tool,
@@ -45,33 +48,34 @@ class D2CCustomerSupportAgent(Agent):
             add_customer_to_waitlist,
             check_customer_waitlist,
             process_warranty_claim,
-            FileSearchTool(
+        ]
+        if vector_store_ids:
+            BASE_TOOLS.append(FileSearchTool(
                 max_num_results=3,
-                vector_store_ids=[faq_vector_store_id, doc_vector_store_id],
+                vector_store_ids=vector_store_ids,
                 include_search_results=True,
-            )
-        ]
+            ))
 
-        if self.context.campaigns:
+        if self.include_referral_tool:
             BASE_TOOLS.insert(3, get_referral_link)
 
         return BASE_TOOLS
 
-    async def run(self, input_text: str):
-        response = await self._run_agent(input_text)
-        Logger.info(f"D2C Customer Support Agent response: {response.final_output_as(str)}")
-        await self._cleanup()
-        return response.final_output_as(str)
+    async def run(self, input_text: str, global_context: GlobalContext):
+        # Repeated FAQ-style questions are answered from the semantic cache
+        cached = await semantic_answer_cache.lookup(input_text)
+        if cached.answer is not None:
+            Logger.info(f"D2C Customer Support Agent cached response: {cached.answer}")
+            return cached.answer
 
-    async def _run_agent(self, input_text: str):
-        return await Runner.run(
-            starting_agent=self,
-            input=input_text,
-            context=self.context,
-        )
+        response = await self._run_agent(input_text, global_context)
+        answer = response.final_output_as(str)
+        Logger.info(f"D2C Customer Support Agent response: {answer}")
+        semantic_answer_cache.store(cached, answer, response, global_context)
+        return answer
 
-    async def _cleanup(self):
-        if self.boost_mcp_server:
-            Logger.info("Cleaning up D2C Customer Support Agent resources (MCP).")
-            await self.boost_mcp_server.cleanup()
+    async def _run_agent(self, input_text: str, global_context: GlobalContext):
+        if self.cascade:
+            return await self.cascade.run(self, input_text, global_context)
+        return await run_agent(self, input_text, global_context)
 
@@ -1,9 +1,18 @@
 from agents import RunContextWrapper, Agent
 from whatsapp_agent.context.global_context import GlobalContext
-from whatsapp_agent.database.boost_buddy_persona import PersonaDB
+from whatsapp_agent.database.boost_buddy_persona import persona_cache
 from whatsapp_agent.utils.current_time import _get_current_karachi_time_str
+from whatsapp_agent.context.instruction_builder import (
+    PromptSection,
+    build_instructions,
+    CUSTOMER_CONTEXT_TEMPLATE,
+    CHAT_HISTORY_TEMPLATE,
+    CONVERSATION_SUMMARY_TEMPLATE,
+    CURRENT_TIME_TEMPLATE,
+)
 
-BASE_INSTRUCTIONS = """
+# Static prefix: identical for every customer so it can be served from the prompt cache
+STATIC_INSTRUCTIONS = """
 {persona}
 
 ----
@@ -33,20 +42,6 @@ BASE_INSTRUCTIONS = """
 ----
 
 ## Context Provided
-```
-<<<CHAT_HISTORY>>>
-{messages}
-<<<END_CHAT_HISTORY>>>
-```
-
-```
-<<<CUSTOMER_CONTEXT>>>
-{customer_context}
-<<<END_CUSTOMER_CONTEXT>>>
-```
-{campaigns_section}
-
-Current Time: {current_time}
 """
 
 
@@ -59,7 +54,7 @@ CAMPAIGNS_SECTION = """
 ```
 <<<CAMPAIGNS_CONTEXT>>>
 [campaign_code]: [campaign_name]
-{campaigns}
+{content}
 <<<END_CAMPAIGNS_CONTEXT>>>
 ```
 Referral Link Handling Instructions:
@@ -71,23 +66,18 @@ Referral Link Handling Instructions:
 
 
 async def dynamic_instructions(wrapper: RunContextWrapper[GlobalContext], agent: Agent) -> str:
-    db = PersonaDB()
-    persona = db.get_persona("d2c_customer_support_agent")
-
-    campaign_tool_instruction = ""
-    campaigns_section = ""
+    persona = persona_cache.get("d2c_customer_support_agent")
 
-    if wrapper.context.campaigns:
-        campaign_tool_instruction = CAMPAIGN_TOOL_INSTRUCTION
-        campaigns_section = CAMPAIGNS_SECTION.format(
-            campaigns="\n".join(f"- {campaign.id}: {campaign.name}" for campaign in wrapper.context.campaigns)
-        )
+    campaign_tool_instruction = CAMPAIGN_TOOL_INSTRUCTION if wrapper.context.campaigns else ""
+    campaigns = "\n".join(f"- {campaign.id}: {campaign.name}" for campaign in wrapper.context.campaigns)
 
-    return BASE_INSTRUCTIONS.format(
-        persona=persona,
-        messages=wrapper.context.messages.formatted_message,
-        customer_context=wrapper.context.customer_context.formatted_context,
-        campaign_tool_instruction=campaign_tool_instruction,
-        campaigns_section=campaigns_section,
-        current_time=_get_current_karachi_time_str(),
+    return build_instructions(
+        STATIC_INSTRUCTIONS.format(persona=persona, campaign_tool_instruction=campaign_tool_instruction),
+        [
+            PromptSection("campaigns", CAMPAIGNS_SECTION, campaigns),
+            PromptSection("customer_context", CUSTOMER_CONTEXT_TEMPLATE, wrapper.context.customer_context.formatted_context),
+            PromptSection("conversation_summary", CONVERSATION_SUMMARY_TEMPLATE, wrapper.context.messages.summary or ""),
+            PromptSection("chat_history", CHAT_HISTORY_TEMPLATE, wrapper.context.messages.formatted_message, keep="tail"),
+            PromptSection("current_time", CURRENT_TIME_TEMPLATE, _get_current_karachi_time_str()),
+        ],
     )
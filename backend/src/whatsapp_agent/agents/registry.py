@@ -0,0 +1,107 @@
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+from whatsapp_agent._debug import Logger
+from whatsapp_agent.agents.b2b_business_support_agent.agent import B2BBusinessSupportAgent
+from whatsapp_agent.agents.d2c_customer_support_agent.agent import D2CCustomerSupportAgent
+from whatsapp_agent.agents.conversation_intent_router.agent import ConversationIntentRouter
+from whatsapp_agent.agents.customer_greeting_agent.agent import CustomerGreetingAgent
+from whatsapp_agent.agents.cascade import ModelCascade
+from whatsapp_agent.mcp.boost_mcp import FilteredMCPServer, boost_mcp_pool
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent.utils.vector_store import vector_store_registry
+
+D2C_BLOCKED_MCP_TOOLS = ["search_shop_policies_and_faqs", "get_cart", "update_cart"]
+B2B_ALLOWED_MCP_TOOLS = ["search_shop_catalog"]
+
+
+class AgentRegistry:
+    """
+    Reusable agent instances, built once per config version.
+
+    Agents only hold configuration (model, tools, MCP view); everything that changes per
+    conversation lives in the GlobalContext passed to Runner.run, so one instance serves
+    every message. The cache is dropped when the config changes (new OpenAI key) and
+    rebuilt lazily when the vector store IDs used by the FileSearchTool change.
+    """
+
+    def __init__(self):
+        self._agents: Dict[str, Any] = {}
+        self._key: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self._builds = 0
+
+    @staticmethod
+    def _current_key() -> Tuple[int, int]:
+        return Config.get_version(), vector_store_registry.version
+
+    def _get(self, name: str, build: Callable[[Any], Any]):
+        key = self._current_key()
+        with self._lock:
+            if key != self._key:
+                self._agents = {}
+                self._key = key
+            agent = self._agents.get(name)
+            if agent is None:
+                # Every agent shares the pooled OpenAI client and its open connections
+                agent = self._agents[name] = build(Config.get_openai_client())
+                self._builds += 1
+                Logger.info(f"Built {name} for config version {key[0]}")
+        return agent
+
+    def router(self) -> ConversationIntentRouter:
+        return self._get(
+            "router",
+            lambda openai_client: ConversationIntentRouter(
+                openai_client,
+                cascade=ModelCascade.from_config("ConversationIntentRouter", "ROUTER_MODEL_TIERS", openai_client),
+            ),
+        )
+
+    def greeting(self) -> CustomerGreetingAgent:
+        return self._get("greeting", CustomerGreetingAgent)
+
+    def d2c(self, include_referral_tool: bool = False) -> D2CCustomerSupportAgent:
+        # The referral tool depends on whether campaigns are running, so keep both variants
+        name = "d2c_with_referrals" if include_referral_tool else "d2c"
+        return self._get(
+            name,
+            lambda openai_client: D2CCustomerSupportAgent(
+                FilteredMCPServer(boost_mcp_pool, blocked_tool_names=D2C_BLOCKED_MCP_TOOLS),
+                openai_client,
+                include_referral_tool=include_referral_tool,
+                cascade=ModelCascade.from_config("D2CCustomerSupportAgent", "D2C_AGENT_MODEL_TIERS", openai_client),
+            ),
+        )
+
+    def b2b(self) -> B2BBusinessSupportAgent:
+        return self._get(
+            "b2b",
+            lambda openai_client: B2BBusinessSupportAgent(
+                FilteredMCPServer(boost_mcp_pool, allowed_tool_names=B2B_ALLOWED_MCP_TOOLS),
+                openai_client,
+                cascade=ModelCascade.from_config("B2BBusinessSupportAgent", "B2B_AGENT_MODEL_TIERS", openai_client),
+            ),
+        )
+
+    def invalidate(self):
+        """Drop every cached agent; they are rebuilt on next use."""
+        with self._lock:
+            self._agents = {}
+            self._key = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "cached_agents": len(self._agents),
+            "builds": self._builds,
+        }
+
+
+agent_registry = AgentRegistry()
+
+
+def _on_agent_config_change(new_version: int):
+    """Release agents built for the previous config."""
+    Logger.info(f"Config changed to version {new_version}: rebuilding agents on next use")
+    agent_registry.invalidate()
+
+Config.add_listener(_on_agent_config_change)
@@ -0,0 +1,97 @@
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Optional
+from agents import Agent, Runner, RunConfig, RawResponsesStreamEvent, RunItemStreamEvent
+from agents.result import RunResultBase
+from whatsapp_agent.agents.usage import record_usage
+from whatsapp_agent.schema.chat_history import AgentStreamFrame
+from whatsapp_agent.utils.current_time import _get_current_karachi_time_str
+from whatsapp_agent.utils.websocket import websocket_manager
+from whatsapp_agent._debug import Logger
+
+# Deltas are batched so a long reply costs tens of frames rather than one per token
+DELTA_FLUSH_SECONDS = 0.05
+
+
+class DashboardStream:
+    """
+    Forwards a streamed agent run to the dashboard WebSocket of one phone number.
+    Frames share a stream_id so the dashboard can build a draft bubble and drop it
+    once the complete message arrives. Send failures never affect the agent run.
+    """
+
+    def __init__(self, phone_number: str):
+        self.phone_number = phone_number
+        self.stream_id = uuid.uuid4().hex
+        self._buffer = ""
+        self._last_flush = 0.0
+        self._started = False
+
+    async def _send(self, event: str, delta: str = "", tool_name: Optional[str] = None):
+        try:
+            await websocket_manager.send_to_phone(self.phone_number, AgentStreamFrame(
+                stream_id=self.stream_id,
+                event=event,
+                delta=delta,
+                tool_name=tool_name,
+                time_stamp=_get_current_karachi_time_str(),
+            ))
+        except Exception as e:
+            Logger.warning(f"{__name__}: _send -> Failed to stream {event} frame to {self.phone_number}: {e}")
+
+    async def on_event(self, event: Any):
+        if not self._started:
+            self._started = True
+            await self._send("start")
+
+        if isinstance(event, RawResponsesStreamEvent):
+            if getattr(event.data, "type", None) == "response.output_text.delta":
+                self._buffer += event.data.delta
+                if time.monotonic() - self._last_flush >= DELTA_FLUSH_SECONDS:
+                    await self.flush()
+        elif isinstance(event, RunItemStreamEvent):
+            if event.name == "tool_called":
+                await self.flush()
+                await self._send("tool_call", tool_name=getattr(event.item.raw_item, "name", None))
+            elif event.name == "tool_output":
+                await self._send("tool_output")
+
+    async def flush(self):
+        if self._buffer:
+            delta, self._buffer = self._buffer, ""
+            await self._send("delta", delta)
+        self._last_flush = time.monotonic()
+
+    async def reset(self):
+        """Discard the draft, e.g. when a model cascade retries the turn on a larger model."""
+        self._buffer = ""
+        if self._started:
+            await self._send("reset")
+
+    async def done(self):
+        await self.flush()
+        if self._started:
+            await self._send("done")
+
+
+# Set by the bot around the reply-producing agent run; the router is never streamed
+agent_stream: ContextVar[Optional[DashboardStream]] = ContextVar("agent_stream", default=None)
+
+
+async def run_agent(agent: Agent, input_text: str, context: Any, run_config: Optional[RunConfig] = None) -> RunResultBase:
+    """
+    Run an agent, streaming its events to the dashboard when a DashboardStream is active.
+    The returned result exposes final_output and new_items either way; its token usage
+    (including cached prompt tokens) is recorded per agent.
+    """
+    stream = agent_stream.get()
+    if stream is None:
+        result = await Runner.run(starting_agent=agent, input=input_text, context=context, run_config=run_config)
+    else:
+        result = Runner.run_streamed(starting_agent=agent, input=input_text, context=context, run_config=run_config)
+        async for event in result.stream_events():
+            await stream.on_event(event)
+        await stream.flush()
+    record_usage(agent.name, result)
+    return result
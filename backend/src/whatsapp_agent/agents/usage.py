@@ -0,0 +1,47 @@
+from dataclasses import dataclass
+from typing import Any, Dict
+from whatsapp_agent._debug import Logger
+
+
+@dataclass
+class PromptUsage:
+    runs: int = 0
+    requests: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_ratio": round(self.cached_tokens / self.input_tokens, 4) if self.input_tokens else None,
+        }
+
+
+# Token usage per agent name, including how much of the prompt OpenAI served from its cache
+prompt_usage: Dict[str, PromptUsage] = {}
+
+
+def record_usage(agent_name: str, result: Any):
+    """Add the token usage of a finished run to the per-agent totals."""
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    if usage is None:
+        return
+    details = getattr(usage, "input_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+
+    stats = prompt_usage.setdefault(agent_name, PromptUsage())
+    stats.runs += 1
+    stats.requests += usage.requests
+    stats.input_tokens += usage.input_tokens
+    stats.cached_tokens += cached
+    stats.output_tokens += usage.output_tokens
+    Logger.debug(f"{agent_name} usage: {usage.input_tokens} input ({cached} cached), {usage.output_tokens} output tokens")
+
+
+def usage_metrics() -> Dict[str, Any]:
+    return {name: stats.to_dict() for name, stats in prompt_usage.items()}
@@ -1,28 +1,24 @@
-# Import agents for handling different conversation flows
-from whatsapp_agent.agents.b2b_business_support_agent.agent import B2BBusinessSupportAgent
-from whatsapp_agent.agents.d2c_customer_support_agent.agent import D2CCustomerSupportAgent
-from whatsapp_agent.agents.conversation_intent_router.agent import ConversationIntentRouter
-from whatsapp_agent.agents.customer_greeting_agent.agent import CustomerGreetingAgent
-# Import QuickBooks integration and MCP server
+# Prebuilt agents for handling different conversation flows
+from whatsapp_agent.agents.registry import agent_registry
+from whatsapp_agent.agents.streaming import DashboardStream, agent_stream
+# Import QuickBooks integration
 from whatsapp_agent.quickbook.customers import QuickBookCustomer
-from whatsapp_agent.mcp.boost_mcp import get_boost_mcp_server
 
 # Shopify base for GraphQL Admin API
 from whatsapp_agent.shopify.base import ShopifyBase
 
 # Import database handlers
 from whatsapp_agent.database.supabase_storage import SupabaseStorageManager
-from whatsapp_agent.database.chat_history import ChatHistoryDataBase
-from whatsapp_agent.database.customer import CustomerDataBase
+from whatsapp_agent.database.repositories import repositories
 
 # Import schemas for chat history and customers
 from whatsapp_agent.schema.chat_history import MessageSchema
 from whatsapp_agent.schema.customer_schema import CustomerSchema, PersonalInfoSchema
 
 # Import utilities for message handling, timestamps, and WebSocket communication
-from whatsapp_agent.utils.campaign_handler import CampaignHandler
 from whatsapp_agent.utils.referrals_handler import ReferralHandler
 from whatsapp_agent.utils.current_time import _get_current_karachi_time_str
+from whatsapp_agent.utils.message_stages import message_stages, CUSTOMER_SAVED, REPLY, REPLY_SAVED, REPLY_SENT
 from whatsapp_agent.utils.wa_instance import wa
 from whatsapp_agent.utils.websocket import websocket_manager
 
@@ -30,7 +26,10 @@ from whatsapp_agent.utils.websocket import websocket_manager
 from whatsapp_agent.context.user_context import CustomerContextSchema
 from whatsapp_agent.context._formatter import customer_context_to_prompt, chat_history_to_prompt
 from whatsapp_agent.context.global_context import GlobalContext, CustomerContextSchemaExtra, MessageSchemaExtra
-from typing import List, Literal
+from whatsapp_agent.context.conversation_memory import conversation_memory, history_tail
+from whatsapp_agent.schema.conversation_memory import ConversationMemorySchema
+from typing import List, Literal, Optional, Tuple
+import asyncio
 import os
 from pywa_async.types import Message
 import tempfile
@@ -41,69 +40,113 @@ from whatsapp_agent._debug import Logger
 # Default constants for new customer creation
 DEFAULT_CUSTOMER_TYPE = "D2C"
 DEFAULT_TOTAL_SPEND = 0
+# A failed WhatsApp send is retried in place before the batch is failed
+SEND_ATTEMPTS = 3
 
 # Initialize database and integration instances
-chat_history_db = ChatHistoryDataBase()
-customer_db = CustomerDataBase()
 quickbook_customer = QuickBookCustomer()
 referral_handler = ReferralHandler()
-campaign_handler = CampaignHandler()
+# Strong references to in-flight background saves so they are not garbage collected
+_pending_saves = set()
+
+def _is_permanent_send_error(error: Exception) -> bool:
+    """A 4xx from the WhatsApp API other than rate limiting fails the same way on every retry."""
+    status_code = getattr(error, "status_code", None)
+    return isinstance(status_code, int) and 400 <= status_code < 500 and status_code != 429
+
 
 class WhatsappBot:
     """Handles WhatsApp incoming messages, routes them to the correct agent, and replies."""
 
     @classmethod
     async def execute_workflow(cls, message:Message, message_type):
+        """Process a single incoming WhatsApp message."""
+        await cls.execute_batch([(message, message_type)])
+
+    @classmethod
+    async def execute_batch(cls, batch: List[Tuple[Message, str]]):
         """
         Main entry point to process incoming WhatsApp messages.
-        1. Receive message from WhatsApp
-        2. Store message in history
-        3. Retrieve or create customer
-        4. Route message to appropriate agent based on intent
+        `batch` holds one or more consecutive (message, message_type) pairs from the same customer.
+        1. Receive messages from WhatsApp
+        2. Load history, customer and campaigns concurrently
+        3. Store each message in history in the background
+        4. Route the combined messages to the appropriate agent based on intent
         5. Send agent's response back to WhatsApp and dashboard
+        Every finished step is recorded in `message_stages` under the message IDs, so a
+        batch replayed by the webhook queue only redoes the steps that did not finish.
+        Errors are logged and re-raised, failing the job that runs the batch.
         """
+        message = batch[-1][0]
         # Ensure phone_number is available for logging in case of early failures
         try:
             phone_number = message.from_user.wa_id
         except Exception:
             phone_number = "unknown"
+        # Dashboard draft of the reply, closed once the final message has been pushed
+        stream: Optional[DashboardStream] = None
 
         try:
-            if message_type == "text":
-                raw_message = message.text
-            elif message_type in ["image", "document", "video"]:
-                raw_message = await cls._process_media_message(message, message_type)
-            elif message_type in ["audio", "voice"]:
-                # Transcribe audio message to text
-                transcription = await cls._transcribe_audio_message(message)
-                # Upload and return markdown with transcript + file URL
-                raw_message = await cls._process_media_message(message, "audio", transcription=transcription)
-            else:
-                raw_message = f"[{message_type.upper()} MESSAGE]"
-            
-            phone_number = message.from_user.wa_id
-            # Fetch recent chat history for context
-            chat_history = chat_history_db.get_recent_chat_history_by_phone(phone_number)
+            # The reply is recorded under the last message of the batch
+            reply_id = message.id
+            progress = await message_stages.get(*(batch_message.id for batch_message, _ in batch))
+            reply_progress = progress.get(reply_id, {})
+            if REPLY_SENT in reply_progress:
+                Logger.info(f"Reply to {reply_id} was already sent; skipping replayed batch")
+                return
+            if REPLY_SAVED in reply_progress:
+                # Only the WhatsApp send failed last time
+                await cls._send_reply(phone_number, reply_id, reply_progress[REPLY_SAVED])
+                return
+
+            raw_messages = [
+                (await cls._extract_raw_message(batch_message, message_type), message_type)
+                for batch_message, message_type in batch
+            ]
+            # Messages sent in a burst are answered as one turn
+            raw_message = "\n".join(raw for raw, _ in raw_messages)
+            unsaved_messages = [
+                (batch_message.id, raw, message_type)
+                for (batch_message, _), (raw, message_type) in zip(batch, raw_messages)
+                if CUSTOMER_SAVED not in progress.get(batch_message.id, {})
+            ]
 
-            Logger.debug("Fetched chat history for customer")
-
-            # save the incoming message from customer
-            cls._save_customer_message(phone_number, raw_message, message_type)
+            phone_number = message.from_user.wa_id
+            # Fetch history, customer and campaigns concurrently; the inbound messages are
+            # persisted in the background once the history snapshot has been read
+            history_task = asyncio.create_task(
+                repositories.chat_history.get_recent_chat_history_by_phone(phone_number)
+            )
+            save_task = asyncio.create_task(
+                cls._save_customer_messages_after(history_task, phone_number, unsaved_messages)
+            )
+            _pending_saves.add(save_task)
+            save_task.add_done_callback(_pending_saves.discard)
 
-            # Send message to dashboard WebSocket for live view
+            # Send messages to dashboard WebSocket for live view
             Logger.debug(f"Streaming customer message to dashboard for phone: {phone_number}")
-            await cls.stream_to_web_socket(phone_number, raw_message, "customer", message_type)
-
-            # Get or create the customer record
-            customer = cls._get_or_create_customer(phone_number)
+            chat_history, memory, customer, active_campaigns, _ = await asyncio.gather(
+                history_task,
+                conversation_memory.get(phone_number),
+                cls._get_or_create_customer(phone_number),
+                repositories.campaigns.get_current_active_campaigns(),
+                cls._stream_customer_messages(phone_number, [(raw, message_type) for _, raw, message_type in unsaved_messages]),
+            )
+            Logger.debug("Loaded conversation context for customer")
 
-            # If the conversation is not escalated, handle with AI agent
-            if not customer_db.is_escalated(phone_number):
+            if REPLY in reply_progress:
+                # The agent already answered before the last attempt failed
+                response = reply_progress[REPLY]
+                Logger.info(f"Reusing the reply recorded for {reply_id}")
+            elif customer.escalation_status:
+                # TODO: Future implementation to notify dashboard about escalation
+                Logger.info(f"Customer {phone_number} is escalated, skipping AI routing.")
+                await save_task
+                return
+            else:
                 # Format messages and customer context for the system prompt
-                messages_context = cls._format_message(chat_history)
+                messages_context = cls._format_message(chat_history, memory)
                 customer_context = await cls._format_customer_context(customer)
-                # Fetch current active campaigns
-                active_campaigns = campaign_handler.get_current_active_campaigns()
                 # Combine contexts into global context for agent
                 global_context = GlobalContext(
                     customer_context=customer_context,
@@ -116,32 +159,80 @@ class WhatsappBot:
                 else:
                     # Route to the appropriate AI agent based on intent
                     await message.indicate_typing()
-                    response = await cls._route_to_agent(phone_number, raw_message, global_context)
-
-                Logger.info(f"Response from agent: {response}")
-                # save the agent's response in chat history
-                cls._save_agent_message(phone_number, response)
+                    if websocket_manager.has_connections(phone_number):
+                        stream = DashboardStream(phone_number)
+                    response = await cls._route_to_agent(phone_number, raw_message, global_context, stream)
+                await message_stages.mark(reply_id, REPLY, response)
+
+            Logger.info(f"Response from agent: {response}")
+            # The customer messages must be stored before the reply to keep the history ordered
+            await save_task
+            # save the agent's response in chat history
+            if await cls._save_agent_message(phone_number, response):
+                await message_stages.mark(reply_id, REPLY_SAVED, response)
+
+            # Send the agent's message to the dashboard in real-time
+            Logger.info(f"Streaming agent response to dashboard for phone: {phone_number}")
+            await cls.stream_to_web_socket(phone_number, response, "agent", message_type="text")
+            if stream is not None:
+                # The final message is on the dashboard now, so the draft can go
+                await stream.done()
+                stream = None
+
+            # Debug print of the response
+            Logger.debug(f"Response sent to {phone_number}: {response}")
+
+            await cls._send_reply(phone_number, reply_id, response)
 
-                # Send the agent's message to the dashboard in real-time
-                Logger.info(f"Streaming agent response to dashboard for phone: {phone_number}")
-                await cls.stream_to_web_socket(phone_number, response, "agent", message_type="text")
+        except Exception as e:
+            if stream is not None:
+                # No final message is coming; drop the draft
+                await stream.done()
+            Logger.error(f"{__name__}: execute_workflow -> Error processing message for {phone_number}: {e}")
+            # Re-raised so the dispatcher counts the failure and the webhook queue can retry it;
+            # the replay skips every step recorded in message_stages
+            raise
 
-                # Debug print of the response
-                Logger.debug(f"Response sent to {phone_number}: {response}")
+    @classmethod
+    async def _send_reply(cls, phone_number: str, reply_id: str, response: str):
+        """
+        Send a stored reply on WhatsApp and record that it went out.
+        Rejections that a retry cannot fix (e.g. an invalid recipient) are logged, not raised.
+        """
+        try:
+            await cls.send_whatsapp_message(phone_number, response)
+        except Exception as e:
+            if not _is_permanent_send_error(e):
+                raise
+            Logger.error(f"{__name__}: _send_reply -> WhatsApp rejected the reply to {reply_id}; not retrying: {e}")
+            return
+        await message_stages.mark(reply_id, REPLY_SENT)
+        # Fold messages that left the raw tail into the rolling summary
+        conversation_memory.schedule_update(phone_number)
 
-                # Send to WhatsApp
-                await cls.send_whatsapp_message(phone_number, response)
-            else:
-                # TODO: Future implementation to notify dashboard about escalation
-                Logger.info(f"Customer {phone_number} is escalated, skipping AI routing.")
-                pass
+    @classmethod
+    async def _extract_raw_message(cls, message: Message, message_type: str) -> str:
+        """Turn an incoming message into the text stored in history and passed to the agents."""
+        if message_type == "text":
+            return message.text
+        if message_type in ["image", "document", "video"]:
+            return await cls._process_media_message(message, message_type)
+        if message_type in ["audio", "voice"]:
+            # Transcribe audio message to text
+            transcription = await cls._transcribe_audio_message(message)
+            # Upload and return markdown with transcript + file URL
+            return await cls._process_media_message(message, "audio", transcription=transcription)
+        return f"[{message_type.upper()} MESSAGE]"
 
-        except Exception as e:
-            Logger.error(f"{__name__}: execute_workflow -> Error processing message for {phone_number}: {e}")
+    @classmethod
+    async def _stream_customer_messages(cls, phone_number: str, raw_messages: List[Tuple[str, str]]):
+        """Push each customer message to the dashboard in order."""
+        for raw_message, message_type in raw_messages:
+            await cls.stream_to_web_socket(phone_number, raw_message, "customer", message_type)
 
     @staticmethod
-    def _save_customer_message(phone_number: str, raw_message: str, message_type):
-        """Stores the customer's incoming message in chat history."""
+    async def _save_customer_message(phone_number: str, raw_message: str, message_type) -> bool:
+        """Stores the customer's incoming message in chat history; False if it was not stored."""
         message = MessageSchema(
             time_stamp=_get_current_karachi_time_str(),
             content=raw_message,
@@ -149,8 +240,22 @@ class WhatsappBot:
             sender="customer",
         )
         Logger.info(f"Adding customer message to chat history: {message.content} (type: {message_type})")
-        chat_history_db.add_or_create_message(phone_number, message)
+        return await repositories.chat_history.record_message(phone_number, message)
         
+    @classmethod
+    async def _save_customer_messages_after(cls, history_task: asyncio.Task, phone_number: str, messages: List[Tuple[str, str, str]]):
+        """
+        Stores each (message ID, raw message, message type) once the history snapshot used
+        as context has been read, recording every stored message so a replay skips it.
+        """
+        await asyncio.wait({history_task})
+        for message_id, raw_message, message_type in messages:
+            try:
+                if await cls._save_customer_message(phone_number, raw_message, message_type):
+                    await message_stages.mark(message_id, CUSTOMER_SAVED)
+            except Exception as e:
+                Logger.error(f"{__name__}: _save_customer_messages_after -> Failed to save message for {phone_number}: {e}")
+
     @staticmethod
     async def _transcribe_audio_message(message: Message) -> str:
         """Transcribe audio message to text using OpenAI Whisper."""
@@ -188,8 +293,8 @@ class WhatsappBot:
             return "[AUDIO MESSAGE - Processing Error]"
 
     @staticmethod
-    def _save_agent_message(phone_number: str, response: str):
-        """Stores the agent's outgoing message in chat history."""
+    async def _save_agent_message(phone_number: str, response: str) -> bool:
+        """Stores the agent's outgoing message in chat history; False if it was not stored."""
         message = MessageSchema(
             time_stamp=_get_current_karachi_time_str(),
             content=response,
@@ -197,21 +302,21 @@ class WhatsappBot:
             sender="agent"
         )
         Logger.info(f"Adding agent message to chat history: {message.content}")
-        chat_history_db.add_or_create_message(phone_number, message)
+        return await repositories.chat_history.record_message(phone_number, message)
 
     @staticmethod
-    def _get_or_create_customer(phone_number: str):
+    async def _get_or_create_customer(phone_number: str):
         """
         Retrieve customer by phone number or create a new one.
         Logic: Check DB -> If not found: QB first (if found skip Shopify), then Shopify -> Create
             If found but incomplete: Update from QB if B2B, else from Shopify
         """
-        customer_details = customer_db.get_customer_by_phone(phone_number)
+        customer_details = await repositories.customers.get_customer_by_phone(phone_number)
         
         # Case 1: No customer found in database - CREATE NEW
         if not customer_details:
             # Try QuickBooks first for new customers
-            qb_customer = quickbook_customer.get_customer_with_type_by_phone(phone_number)
+            qb_customer = await asyncio.to_thread(quickbook_customer.get_customer_with_type_by_phone, phone_number)
             
             if qb_customer:
                 # Create from QuickBooks data (skip Shopify since we found in QB)
@@ -228,13 +333,13 @@ class WhatsappBot:
                     address=qb_customer.address,
                     tags=["existing customer from QBO"],
                 )
-                referral_handler.check_or_create_referral(new_customer)
-                customer_details = customer_db.add_customer(new_customer)
+                await referral_handler.check_or_create_referral(new_customer)
+                customer_details = await repositories.customers.add_customer(new_customer)
             else:
                 # QB didn't have customer, try Shopify
                 try:
                     shopify = ShopifyBase()
-                    shopify_customer = shopify.find_customer_by_phone(phone_number)
+                    shopify_customer = await asyncio.to_thread(shopify.find_customer_by_phone, phone_number)
                     
                     if shopify_customer:
                         Logger.info(f"Creating new customer {phone_number} from Shopify data")
@@ -254,8 +359,8 @@ class WhatsappBot:
                             ]) or None,
                             tags=["existing customer from shopify"]
                         )
-                        referral_handler.check_or_create_referral(new_customer)
-                        customer_details = customer_db.add_customer(new_customer)
+                        await referral_handler.check_or_create_referral(new_customer)
+                        customer_details = await repositories.customers.add_customer(new_customer)
                     else:
                         # Neither QB nor Shopify had customer, create minimal
                         Logger.info(f"Creating new customer {phone_number} without external data")
@@ -267,8 +372,8 @@ class WhatsappBot:
                             total_spend=DEFAULT_TOTAL_SPEND,
                             tags=["new customer"]
                         )
-                        referral_handler.check_or_create_referral(new_customer)
-                        customer_details = customer_db.add_customer(new_customer)
+                        await referral_handler.check_or_create_referral(new_customer)
+                        customer_details = await repositories.customers.add_customer(new_customer)
                         
                 except Exception as e:
                     Logger.error(f"Shopify lookup failed for {phone_number}: {e}")
@@ -281,8 +386,8 @@ class WhatsappBot:
                         customer_type=DEFAULT_CUSTOMER_TYPE,
                         total_spend=DEFAULT_TOTAL_SPEND
                     )
-                    referral_handler.check_or_create_referral(new_customer)
-                    customer_details = customer_db.add_customer(new_customer)
+                    await referral_handler.check_or_create_referral(new_customer)
+                    customer_details = await repositories.customers.add_customer(new_customer)
         
         # Case 2: Customer found but may have incomplete data - UPDATE EXISTING
         else:
@@ -300,15 +405,15 @@ class WhatsappBot:
                 # Check customer type to determine update source
                 if customer_details.customer_type == 'B2B':
                     # B2B customers - update from QuickBooks
-                    qb_customer = quickbook_customer.get_customer_with_type_by_phone(phone_number)
+                    qb_customer = await asyncio.to_thread(quickbook_customer.get_customer_with_type_by_phone, phone_number)
                     if qb_customer:
                         Logger.info(f"Updating existing B2B customer {phone_number} with QuickBooks data")
-                        customer_details = customer_db.update_customer(phone_number, qb_customer.dict())
+                        customer_details = await repositories.customers.update_customer(phone_number, qb_customer.dict())
                 else:
                     # Non-B2B customers - update from Shopify
                     try:
                         shopify = ShopifyBase()
-                        shopify_customer = shopify.find_customer_by_phone(phone_number)
+                        shopify_customer = await asyncio.to_thread(shopify.find_customer_by_phone, phone_number)
                         
                         if shopify_customer:
                             Logger.info(f"Updating existing customer {phone_number} with Shopify data")
@@ -335,7 +440,7 @@ class WhatsappBot:
                                 update_data["address"] = ", ".join([part for part in address_parts if part])
                             
                             if update_data:  # Only update if we have data
-                                customer_details = customer_db.update_customer(phone_number, update_data)[0]
+                                customer_details = (await repositories.customers.update_customer(phone_number, update_data))[0]
                                 
                     except Exception as e:
                         Logger.error(f"Shopify customer update failed for {phone_number}: {e}")
@@ -345,15 +450,14 @@ class WhatsappBot:
         return customer
 
     @staticmethod
-    async def _route_to_agent(phone_number: str, raw_message: str, global_context: GlobalContext) -> str:
+    async def _route_to_agent(phone_number: str, raw_message: str, global_context: GlobalContext, stream: Optional[DashboardStream] = None) -> str:
         """
         Determine which agent should handle the message based on intent,
         and get the AI-generated response.
         """
         # Use the conversation intent router to decide the next agent
-        openai_client = Config.get_openai_client()
         Logger.info("Routing message to appropriate agent based on intent")
-        router_agent = ConversationIntentRouter(openai_client)
+        router_agent = agent_registry.router()
         sentiment = await router_agent.run(raw_message, global_context)
 
         if (
@@ -372,7 +476,7 @@ class WhatsappBot:
             )
             Logger.info(f"Personal info extracted: {personal_info}")
             try:
-                customer_db.update_customer(phone_number, personal_info.dict())
+                await repositories.customers.update_customer(phone_number, personal_info.dict())
                 Logger.debug(f"Updated customer {phone_number} with personal info: {personal_info}")
             except Exception as e:
                 Logger.error(f"{__name__}: _route_to_agent -> Failed to update customer info: {e}")
@@ -381,27 +485,37 @@ class WhatsappBot:
 
         # Route to the appropriate agent
         if sentiment.next_agent == "CustomerGreetingAgent":
-            agent = CustomerGreetingAgent(openai_client, global_context)
-            return await agent.run(raw_message)
+            agent = agent_registry.greeting()
+            return await WhatsappBot._run_reply_agent(agent, raw_message, global_context, stream)
 
         if sentiment.next_agent == "D2CCustomerSupportAgent":
-            boost_mcp_server = await get_boost_mcp_server(
-                blocked_tool_names=["search_shop_policies_and_faqs","get_cart","update_cart"]
-            )
-            agent = D2CCustomerSupportAgent(boost_mcp_server, openai_client, global_context)
-            return await agent.run(raw_message)
+            agent = agent_registry.d2c(include_referral_tool=bool(global_context.campaigns))
+            return await WhatsappBot._run_reply_agent(agent, raw_message, global_context, stream)
 
         if sentiment.next_agent == "B2BBusinessSupportAgent":
-            boost_mcp_server = await get_boost_mcp_server(
-                allowed_tool_names=["search_shop_catalog"]
-            )
-            agent = B2BBusinessSupportAgent(boost_mcp_server, openai_client, global_context)
-            return await agent.run(raw_message)
+            agent = agent_registry.b2b()
+            return await WhatsappBot._run_reply_agent(agent, raw_message, global_context, stream)
 
         # If no match, raise an error
         Logger.error(f"{__name__}: _route_to_agent -> Unknown agent: {sentiment.next_agent}")
         raise ValueError(f"Unknown agent: {sentiment.next_agent}")
 
+    @staticmethod
+    async def _run_reply_agent(agent, raw_message: str, global_context: GlobalContext, stream: Optional[DashboardStream] = None) -> str:
+        """
+        Run the agent that writes the reply, streaming partial output to the dashboard
+        while a representative is watching this chat. WhatsApp still gets the final text.
+        The caller closes the stream once the final message has reached the dashboard.
+        """
+        if stream is None:
+            return await agent.run(raw_message, global_context)
+
+        token = agent_stream.set(stream)
+        try:
+            return await agent.run(raw_message, global_context)
+        finally:
+            agent_stream.reset(token)
+
     @staticmethod
     async def _format_customer_context(customer: CustomerSchema) -> CustomerContextSchemaExtra:
         """
@@ -427,28 +541,38 @@ class WhatsappBot:
         return formatted_context
 
     @staticmethod
-    def _format_message(messages: List[MessageSchema]) -> MessageSchemaExtra:
+    def _format_message(messages: List[MessageSchema], memory: Optional[ConversationMemorySchema] = None) -> MessageSchemaExtra:
         """
         Format chat messages for the system prompt.
-        Converts message history to a string and wraps it in the schema.
+        With a stored summary only a short raw tail is formatted; the summary covers the rest.
         """
-        formatted_message = chat_history_to_prompt(messages)
+        tail = history_tail(messages, memory)
+        formatted_message = chat_history_to_prompt(tail)
         formatted = {
             'formatted_message': formatted_message,
-            'messages': messages
+            'messages': tail,
+            'summary': memory.summary if memory and memory.summary else None,
         }
         Logger.debug(f"Formatted message: {formatted}")
         return MessageSchemaExtra.model_validate(formatted)
 
     @staticmethod
     async def send_whatsapp_message(to: str, message: str):
-        """Send a WhatsApp text message."""
-        try:
-            Logger.info(f"Sending WhatsApp message to {to}...")
-            resp = await wa.send_message(to, message, preview_url=True)
-            Logger.info(f"WhatsApp send response: {resp}")
-        except Exception as e:
-            Logger.error(f"Failed to send WhatsApp message to {to}: {e}")
+        """
+        Send a WhatsApp text message. Transient failures are retried up to SEND_ATTEMPTS
+        times; the last error, or a permanent rejection, is logged and re-raised.
+        """
+        for attempt in range(1, SEND_ATTEMPTS + 1):
+            try:
+                Logger.info(f"Sending WhatsApp message to {to}...")
+                resp = await wa.send_message(to, message, preview_url=True)
+                Logger.info(f"WhatsApp send response: {resp}")
+                return
+            except Exception as e:
+                Logger.error(f"Failed to send WhatsApp message to {to} (attempt {attempt}): {e}")
+                if attempt == SEND_ATTEMPTS or _is_permanent_send_error(e):
+                    raise
+                await asyncio.sleep(2 ** attempt)
 
     @staticmethod
     async def stream_to_web_socket(phone_number: str, message: str, sender: Literal["customer", "agent"], message_type:str):
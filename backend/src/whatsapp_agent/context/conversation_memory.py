@@ -0,0 +1,159 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from whatsapp_agent.context._formatter import chat_history_to_prompt
+from whatsapp_agent.database.repositories import repositories
+from whatsapp_agent.schema.chat_history import MessageSchema
+from whatsapp_agent.schema.conversation_memory import ConversationMemorySchema
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent._debug import Logger
+
+DEFAULT_SUMMARY_MODEL = "gpt-4.1-nano"
+# Raw messages always shown verbatim after the summary
+DEFAULT_TAIL_MESSAGES = 6
+# Messages read when folding; anything older that was never summarized is dropped
+FOLD_WINDOW_MESSAGES = 30
+# Messages that must leave the tail before a summary call is worth its cost
+MIN_FOLD_MESSAGES = 4
+MAX_SUMMARY_CHARS = 1600
+
+SUMMARY_INSTRUCTIONS = """You maintain the running memory of a WhatsApp support conversation between a customer and Boost's assistant.
+Update the existing summary with the new messages. Keep:
+- who the customer is and what they bought, asked for or complained about
+- order numbers, claim numbers, product names, prices, addresses and dates mentioned
+- promises made, open issues and what the customer is waiting for
+Drop greetings, small talk and anything already resolved unless it matters later.
+Write short plain bullet points in English, at most 12, newest facts last. Return only the summary."""
+
+
+def _config_int(key: str, default: int) -> int:
+    try:
+        return int(Config.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _config_flag(key: str, default: bool) -> bool:
+    value = Config.get(key, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _is_after(time_stamp: datetime, cutoff: Optional[datetime]) -> bool:
+    # timestamp() handles both naive and timezone-aware values
+    return cutoff is None or time_stamp.timestamp() > cutoff.timestamp()
+
+
+def tail_size() -> int:
+    return max(1, _config_int("CONVERSATION_TAIL_MESSAGES", DEFAULT_TAIL_MESSAGES))
+
+
+def history_tail(messages: List[MessageSchema], memory: Optional[ConversationMemorySchema]) -> List[MessageSchema]:
+    """
+    Messages to show verbatim next to the summary: the last `tail_size()` messages plus any
+    older one the summary does not cover yet (e.g. while a fold is still running).
+    """
+    if memory is None or not memory.summary:
+        return messages
+    first_tail = len(messages) - tail_size()
+    return [
+        message for index, message in enumerate(messages)
+        if index >= first_tail or _is_after(message.time_stamp, memory.summarized_until)
+    ]
+
+
+class ConversationMemoryManager:
+    """
+    Keeps a rolling summary per phone number so agent prompts stay small on long chats.
+
+    After each agent reply, messages that have scrolled out of the raw tail and are newer
+    than `summarized_until` are folded into the stored summary with a small model. Updates
+    run in the background, at most one per phone at a time; a reply arriving during an update
+    marks the phone dirty so it is folded again afterwards.
+    """
+
+    def __init__(self):
+        self._running: Set[str] = set()
+        self._dirty: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats: Dict[str, int] = {"folds": 0, "folded_messages": 0, "skipped": 0, "errors": 0}
+
+    @staticmethod
+    def enabled() -> bool:
+        return _config_flag("CONVERSATION_MEMORY_ENABLED", True)
+
+    async def get(self, phone_number: str) -> Optional[ConversationMemorySchema]:
+        """Load the stored summary; failures only cost the summary, never the reply."""
+        if not self.enabled():
+            return None
+        try:
+            return await repositories.conversation_memory.get_memory(phone_number)
+        except Exception as e:
+            Logger.warning(f"{__name__}: get -> Failed to load conversation summary for {phone_number}: {e}")
+            return None
+
+    def schedule_update(self, phone_number: str):
+        """Fold old messages into the summary in the background."""
+        if not self.enabled():
+            return
+        if phone_number in self._running:
+            self._dirty.add(phone_number)
+            return
+        self._running.add(phone_number)
+        task = asyncio.create_task(self._update_loop(phone_number))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _update_loop(self, phone_number: str):
+        try:
+            while True:
+                self._dirty.discard(phone_number)
+                try:
+                    await self._fold(phone_number)
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    Logger.error(f"{__name__}: _update_loop -> Failed to update conversation summary for {phone_number}: {e}")
+                if phone_number not in self._dirty:
+                    break
+        finally:
+            self._running.discard(phone_number)
+
+    async def _fold(self, phone_number: str):
+        memory = await repositories.conversation_memory.get_memory(phone_number) \
+            or ConversationMemorySchema(phone_number=phone_number)
+        messages = await repositories.chat_history.get_recent_chat_history_by_phone(phone_number, limit=FOLD_WINDOW_MESSAGES)
+        older = messages[:-tail_size()]
+        pending = [message for message in older if _is_after(message.time_stamp, memory.summarized_until)]
+        if len(pending) < MIN_FOLD_MESSAGES:
+            self._stats["skipped"] += 1
+            return
+
+        summary = await self._summarize(memory.summary, pending)
+        if not summary:
+            return
+        await repositories.conversation_memory.save_memory(ConversationMemorySchema(
+            phone_number=phone_number,
+            summary=summary[:MAX_SUMMARY_CHARS],
+            summarized_until=pending[-1].time_stamp,
+            summarized_messages=memory.summarized_messages + len(pending),
+        ))
+        self._stats["folds"] += 1
+        self._stats["folded_messages"] += len(pending)
+
+    async def _summarize(self, previous: str, messages: List[MessageSchema]) -> Optional[str]:
+        client = Config.get_openai_client()
+        if client is None:
+            return None
+        response = await client.responses.create(
+            model=Config.get("CONVERSATION_SUMMARY_MODEL", DEFAULT_SUMMARY_MODEL),
+            instructions=SUMMARY_INSTRUCTIONS,
+            input=f"## Existing Summary\n{previous or '(none)'}\n\n{chat_history_to_prompt(messages)}",
+        )
+        return (response.output_text or "").strip()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled(), "in_flight": len(self._running), **self._stats}
+
+
+conversation_memory = ConversationMemoryManager()
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from whatsapp_agent.context.user_context import CustomerContextSchema
 from whatsapp_agent.schema.chat_history import MessageSchema
 from whatsapp_agent.schema.campaign import CampaignSchema
@@ -10,6 +10,7 @@ class CustomerContextSchemaExtra(CustomerContextSchema):
 class MessageSchemaExtra(BaseModel):
     formatted_message: str
     messages: List[MessageSchema]
+    summary: Optional[str] = None  # Rolling summary of the messages older than `messages`
 
 class GlobalContext(BaseModel):
     customer_context: CustomerContextSchemaExtra
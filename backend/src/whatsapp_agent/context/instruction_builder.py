@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+from typing import List, Literal
+from whatsapp_agent.utils.config import Config
+
+# Rough size of a token for English/Roman Urdu text; avoids shipping a tokenizer
+CHARS_PER_TOKEN = 4
+# Appended to a line cut to fit the budget
+TRUNCATED_MARKER = " [...]"
+
+# Default per-section token budgets, overridable with PROMPT_TOKENS_<SECTION NAME>
+DEFAULT_BUDGETS = {
+    "conversation_summary": 400,
+    "chat_history": 1500,
+    "customer_context": 300,
+    "campaigns": 300,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def section_budget(name: str) -> int:
+    try:
+        return int(Config.get(f"PROMPT_TOKENS_{name.upper()}", DEFAULT_BUDGETS.get(name, 500)))
+    except (TypeError, ValueError):
+        return DEFAULT_BUDGETS.get(name, 500)
+
+
+def truncate_to_budget(text: str, max_tokens: int, keep: Literal["head", "tail"] = "head") -> str:
+    """
+    Trim `text` line by line to roughly `max_tokens`.
+    A leading markdown heading is always kept; "tail" keeps the newest lines (chat history).
+    """
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+
+    lines = text.splitlines()
+    header = [lines.pop(0)] if lines and lines[0].startswith("#") else []
+    budget = max_tokens * CHARS_PER_TOKEN - sum(len(line) + 1 for line in header)
+
+    kept: List[str] = []
+    for line in (reversed(lines) if keep == "tail" else lines):
+        if budget - (len(line) + 1) < 0:
+            # Cut the first line that does not fit instead of dropping it, so one oversized
+            # message (a long link or transcript) cannot push everything else out
+            if budget > len(TRUNCATED_MARKER) + 1:
+                kept.append(line[:budget - len(TRUNCATED_MARKER) - 1] + TRUNCATED_MARKER)
+            break
+        kept.append(line)
+        budget -= len(line) + 1
+    omitted = len(lines) - len(kept)
+
+    if keep == "tail":
+        kept.reverse()
+        return "\n".join(header + [f"[... {omitted} earlier lines omitted]"] + kept)
+    return "\n".join(header + kept + [f"[... {omitted} more lines omitted]"])
+
+
+@dataclass
+class PromptSection:
+    name: str
+    template: str  # Must contain {content}
+    content: str
+    keep: Literal["head", "tail"] = "head"
+
+    def render(self) -> str:
+        if not self.content:
+            return ""
+        content = truncate_to_budget(self.content, section_budget(self.name), self.keep)
+        return self.template.format(content=content)
+
+
+def build_instructions(static_prefix: str, sections: List[PromptSection]) -> str:
+    """
+    Assemble a system prompt as a static prefix followed by volatile sections.
+
+    OpenAI caches prompts by exact prefix, so everything that is the same for every
+    customer (persona, tool rules, output format) must come first and byte-identical;
+    sections should be ordered from least to most volatile (current time last).
+    """
+    rendered = [section.render() for section in sections]
+    return "\n".join([static_prefix.rstrip(), *(part for part in rendered if part)]) + "\n"
+
+
+# Shared section templates, listed from least to most volatile
+CUSTOMER_CONTEXT_TEMPLATE = """```
+<<<CUSTOMER_CONTEXT>>>
+{content}
+<<<END_CUSTOMER_CONTEXT>>>
+```"""
+
+CONVERSATION_SUMMARY_TEMPLATE = """```
+<<<CONVERSATION_SUMMARY>>>
+{content}
+<<<END_CONVERSATION_SUMMARY>>>
+```"""
+
+CHAT_HISTORY_TEMPLATE = """```
+<<<CHAT_HISTORY>>>
+{content}
+<<<END_CHAT_HISTORY>>>
+```"""
+
+CURRENT_TIME_TEMPLATE = "Current Time: {content}"
@@ -1,10 +1,20 @@
+from postgrest.exceptions import APIError
 from supabase import create_client, Client
 from whatsapp_agent.utils.config import Config
 
+# PostgREST / Postgres error codes for a function or table that does not exist (yet)
+MISSING_OBJECT_CODES = ("PGRST202", "PGRST205", "42883", "42P01")
+
+
+def is_missing_object_error(error: Exception) -> bool:
+    """True when a supabase call failed because a database function or table is not installed."""
+    return isinstance(error, APIError) and error.code in MISSING_OBJECT_CODES
+
+
 class DataBase:
     def __init__(self):
         self._connect_to_db()
 
     def _connect_to_db(self):
         config = Config()
-        self.supabase: Client = create_client(config.get("SUPABASE_URL"), config.get("SUPABASE_SERVICE_ROLE_KEY"))
\ No newline at end of file
+        self.supabase: Client = create_client(config.get("SUPABASE_URL"), config.get("SUPABASE_SERVICE_ROLE_KEY"))
@@ -1,10 +1,146 @@
+import asyncio
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
 from whatsapp_agent.database.base import DataBase
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent._debug import Logger
+
+DEFAULT_REFRESH_SECONDS = 30
+
 
 class PersonaDB(DataBase):
     def get_persona(self, agent_name: str) -> str:
         response = self.supabase.table("boost_buddy_persona").select("persona").eq("agent_name", agent_name).single().execute()
         return response.data["persona"] if response.data else ""
 
+    def get_all_personas(self) -> Dict[str, str]:
+        response = self.supabase.table("boost_buddy_persona").select("agent_name,persona").execute()
+        return {row["agent_name"]: row["persona"] for row in response.data or []}
+
+    def get_personas_version(self) -> Optional[str]:
+        """Latest persona edit time; changes whenever any persona is updated."""
+        response = self.supabase.table("boost_buddy_persona") \
+            .select("updated_at") \
+            .order("updated_at", desc=True) \
+            .limit(1) \
+            .execute()
+        return response.data[0]["updated_at"] if response.data else None
+
     def update_persona(self, agent_name: str, new_persona: str) -> bool:
-        response = self.supabase.table("boost_buddy_persona").update({"persona": new_persona}).eq("agent_name", agent_name).execute()
-        return bool(response.data)
\ No newline at end of file
+        response = self.supabase.table("boost_buddy_persona").update({
+            "persona": new_persona,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }).eq("agent_name", agent_name).execute()
+        return bool(response.data)
+
+
+class PersonaCache:
+    """
+    Process-wide cache of agent personas, so rendering agent instructions does no I/O.
+
+    Loaded once at startup, updated in place by PATCH /persona, and kept in sync with edits
+    made through other workers by polling the latest `updated_at` every
+    PERSONA_REFRESH_SECONDS (0 disables polling).
+    """
+
+    def __init__(self):
+        self._personas: Dict[str, str] = {}
+        self._version: Optional[str] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._db: Optional[PersonaDB] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _get_db(self) -> PersonaDB:
+        if self._db is None:
+            self._db = PersonaDB()
+        return self._db
+
+    def _load(self):
+        db = self._get_db()
+        version = db.get_personas_version()
+        personas = db.get_all_personas()
+        with self._lock:
+            self._personas = personas
+            self._version = version
+            self._loaded = True
+        Logger.info(f"Loaded {len(personas)} agent personas")
+
+    async def refresh(self):
+        """Reload every persona without blocking the event loop."""
+        await asyncio.to_thread(self._load)
+
+    def get(self, agent_name: str) -> str:
+        if not self._loaded:
+            # Only reached if the startup load failed. Rendering never waits on the database:
+            # an empty persona is served until the background reload lands. Off the event
+            # loop (scripts, worker threads) loading inline blocks nobody
+            if not self._refresh_in_background():
+                self._load()
+        return self._personas.get(agent_name, "")
+
+    @property
+    def version(self) -> Optional[str]:
+        """Latest persona edit time this worker has loaded."""
+        return self._version
+
+    def update(self, agent_name: str, new_persona: str) -> bool:
+        """Persist a persona and apply it to this worker immediately."""
+        if not self._get_db().update_persona(agent_name, new_persona):
+            return False
+        with self._lock:
+            self._personas = {**self._personas, agent_name: new_persona}
+        return True
+
+    def _refresh_seconds(self) -> float:
+        try:
+            return float(Config.get("PERSONA_REFRESH_SECONDS", DEFAULT_REFRESH_SECONDS))
+        except (TypeError, ValueError):
+            return DEFAULT_REFRESH_SECONDS
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self._refresh_seconds())
+            try:
+                version = await asyncio.to_thread(self._get_db().get_personas_version)
+                if version != self._version:
+                    Logger.info("Personas changed in another worker; reloading")
+                    await self.refresh()
+            except Exception as e:
+                Logger.warning(f"{__name__}: _poll -> Failed to check persona version: {e}")
+
+    async def start(self):
+        """Load the personas and start watching for edits made by other workers."""
+        try:
+            await self.refresh()
+        except Exception as e:
+            Logger.error(f"Failed to load personas at startup: {e}")
+        if self._poll_task is None and self._refresh_seconds() > 0:
+            self._poll_task = asyncio.create_task(self._poll())
+
+    def _refresh_in_background(self) -> bool:
+        """Start a reload on the running loop unless one is in flight. False without a loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = loop.create_task(self.refresh())
+            self._refresh_task.add_done_callback(self._log_refresh_error)
+        return True
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            Logger.error(f"{__name__}: refresh -> Failed to reload personas: {task.exception()}")
+
+    async def stop(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            await asyncio.gather(self._poll_task, return_exceptions=True)
+            self._poll_task = None
+
+
+persona_cache = PersonaCache()
@@ -0,0 +1,98 @@
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+from whatsapp_agent.database.base import DataBase
+from whatsapp_agent.schema.chat_history import MessageSchema
+from whatsapp_agent._debug import Logger
+
+class ChatConversationDataBase(DataBase):
+    """Per-conversation summary (last message, message and unread counts) used by the chat list."""
+
+    TABLE_NAME = "chat_conversations"
+
+    def __init__(self):
+        super().__init__()
+
+    def record_message(self, phone_number: str, message: MessageSchema) -> None:
+        """Atomically update the conversation summary with a newly stored message."""
+        time_stamp = message.time_stamp.isoformat() if isinstance(message.time_stamp, datetime) else message.time_stamp
+        self.supabase.rpc("upsert_chat_conversation", {
+            "p_phone_number": phone_number,
+            "p_content": message.content,
+            "p_time_stamp": time_stamp,
+            "p_sender": message.sender,
+            "p_message_type": message.message_type,
+        }).execute()
+        Logger.info(f"Updated conversation summary for {phone_number}")
+
+    def mark_read(self, phone_number: str) -> bool:
+        """Reset the unread counter of a conversation."""
+        response = self.supabase.table(self.TABLE_NAME) \
+            .update({"unread_count": 0}) \
+            .eq("phone_number", phone_number) \
+            .execute()
+        return bool(response.data)
+
+    def delete_conversation(self, phone_number: str) -> bool:
+        """Delete the summary row of a conversation."""
+        response = self.supabase.table(self.TABLE_NAME) \
+            .delete() \
+            .eq("phone_number", phone_number) \
+            .execute()
+        return bool(response.data)
+
+    def list_conversations(
+        self,
+        limit: int,
+        offset: int = 0,
+        search: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        customer_type: Optional[str] = None,
+        escalation_status: Optional[bool] = None,
+        is_active: Optional[bool] = None,
+        min_spend: Optional[float] = None,
+        max_spend: Optional[float] = None,
+        sort_by: str = "updated_at",
+        sort_order: str = "desc",
+    ) -> List[Dict[str, Any]]:
+        """
+        Return one filtered, sorted page of conversations joined to their customers.
+        Use count_conversations for the totals of the filtered set.
+        """
+        response = self.supabase.rpc("list_chat_conversations", {
+            "p_limit": limit,
+            "p_offset": offset,
+            "p_search": search,
+            "p_tags": tags,
+            "p_customer_type": customer_type,
+            "p_escalation_status": escalation_status,
+            "p_is_active": is_active,
+            "p_min_spend": min_spend,
+            "p_max_spend": max_spend,
+            "p_sort_by": sort_by,
+            "p_sort_order": sort_order,
+        }).execute()
+        Logger.info(f"Listed {len(response.data or [])} conversations")
+        return response.data or []
+
+    def count_conversations(
+        self,
+        search: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        customer_type: Optional[str] = None,
+        escalation_status: Optional[bool] = None,
+        is_active: Optional[bool] = None,
+        min_spend: Optional[float] = None,
+        max_spend: Optional[float] = None,
+    ) -> Tuple[int, int]:
+        """Return the total and escalated conversation counts for the list_conversations filters."""
+        response = self.supabase.rpc("count_chat_conversations", {
+            "p_search": search,
+            "p_tags": tags,
+            "p_customer_type": customer_type,
+            "p_escalation_status": escalation_status,
+            "p_is_active": is_active,
+            "p_min_spend": min_spend,
+            "p_max_spend": max_spend,
+        }).execute()
+        counts = response.data or {}
+        return counts.get("total", 0), counts.get("escalated", 0)
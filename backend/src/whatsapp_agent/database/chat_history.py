@@ -1,28 +1,69 @@
 from datetime import datetime
-from typing import Dict, Any, Optional, List
-from whatsapp_agent.database.base import DataBase
+from typing import Dict, Any, Optional, List, Tuple
+from whatsapp_agent.database.base import DataBase, is_missing_object_error
 from whatsapp_agent.schema.chat_history import ChatHistorySchema, MessageSchema
 from whatsapp_agent.database.message_stats import MessageStatsDatabase
+from whatsapp_agent.database.message_stats_aggregator import message_stats_aggregator
+from whatsapp_agent.database.chat_conversation import ChatConversationDataBase
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent.utils.current_time import _get_current_karachi_time
 from whatsapp_agent._debug import Logger
 
 daily_stats_db = MessageStatsDatabase()
+conversation_db = ChatConversationDataBase()
 
 class ChatHistoryDataBase(DataBase):
     TABLE_NAME = "chat_history"
+    MESSAGES_TABLE_NAME = "chat_messages"
+
+    # Storage modes (config key CHAT_STORAGE_MODE):
+    #   "json"     - legacy, one JSON array of messages per phone in chat_history
+    #   "dual"     - write to both stores, read from chat_history (run the backfill in this mode)
+    #   "messages" - one row per message in chat_messages, chat_history is no longer touched
+    STORAGE_MODES = ("json", "dual", "messages")
+    DEFAULT_STORAGE_MODE = "json"
 
     def __init__(self):
         super().__init__()
 
-    def _convert_dt(self, obj):
+    @classmethod
+    def storage_mode(cls) -> str:
+        """Return the configured chat storage mode."""
+        mode = str(Config.get("CHAT_STORAGE_MODE", cls.DEFAULT_STORAGE_MODE) or "").strip().lower()
+        if mode not in cls.STORAGE_MODES:
+            Logger.warning(f"Unknown CHAT_STORAGE_MODE '{mode}', falling back to '{cls.DEFAULT_STORAGE_MODE}'")
+            return cls.DEFAULT_STORAGE_MODE
+        return mode
+
+    def _reads_messages_table(self) -> bool:
+        return self.storage_mode() == "messages"
+
+    @staticmethod
+    def _normalize_phone(phone_number: str) -> str:
+        """Keep only the digits of a phone number."""
+        return "".join(ch for ch in str(phone_number) if ch.isdigit())
+
+    @classmethod
+    def _convert_dt(cls, obj):
         """Recursively convert datetime objects in nested structures to ISO strings."""
         if isinstance(obj, datetime):
             return obj.isoformat()
         if isinstance(obj, list):
-            return [self._convert_dt(i) for i in obj]
+            return [cls._convert_dt(i) for i in obj]
         if isinstance(obj, dict):
-            return {k: self._convert_dt(v) for k, v in obj.items()}
+            return {k: cls._convert_dt(v) for k, v in obj.items()}
         return obj
 
+    @staticmethod
+    def _message_from_row(row: Dict[str, Any]) -> MessageSchema:
+        """Build a MessageSchema from a chat_messages row."""
+        return MessageSchema(
+            time_stamp=row["time_stamp"],
+            content=row.get("content") or "",
+            message_type=row["message_type"],
+            sender=row["sender"],
+        )
+
     def _create_chat_history(self, chat: ChatHistorySchema) -> Dict[str, Any]:
         """Insert a new chat history record."""
         data = self._convert_dt(chat.dict())
@@ -37,44 +78,144 @@ class ChatHistoryDataBase(DataBase):
             .eq("phone_number", phone_number) \
             .limit(1) \
             .execute()
-        
+
         Logger.info("Fetched chat by phone")
         return response.data[0] if response.data else None
 
-    def add_message(self, phone_number: str, message: MessageSchema) -> bool:
-        """Append a message to the existing chat history for a customer."""
+    def _append_json_message(self, phone_number: str, message: MessageSchema, create: bool) -> bool:
+        """Append a message to the legacy JSON array, optionally creating the chat row."""
         existing_chat = self._get_chat_by_phone(phone_number)
-        if not existing_chat:
+
+        if existing_chat:
+            messages = existing_chat.get("messages", [])
+            messages.append(message.dict())
+            messages = self._convert_dt(messages)
+
+            response = self.supabase.table(self.TABLE_NAME) \
+                .update({"messages": messages}) \
+                .eq("phone_number", phone_number) \
+                .execute()
+            Logger.info("Added message to existing chat history")
+            return bool(response.data)
+
+        if not create:
             Logger.warning(f"No existing chat found for phone: {phone_number}")
             return False
 
-        messages = existing_chat.get("messages", [])
-        messages.append(message.dict())
-        messages = self._convert_dt(messages)
+        new_chat = ChatHistorySchema(phone_number=phone_number, messages=[message])
+        return bool(self._create_chat_history(new_chat))
 
-        response = self.supabase.table(self.TABLE_NAME) \
-            .update({"messages": messages}) \
-            .eq("phone_number", phone_number) \
-            .execute()
+    def _insert_message_row(self, phone_number: str, message: MessageSchema) -> bool:
+        """Append a message as a single row in the chat_messages table."""
+        data = self._convert_dt(message.dict())
+        data["phone_number"] = phone_number
+        response = self.supabase.table(self.MESSAGES_TABLE_NAME).insert(data).execute()
+        Logger.info("Inserted message into chat messages")
+        return bool(response.data)
 
-        Logger.info("Updated chat history with new message")
+    def _dual_write_message(self, phone_number: str, message: MessageSchema, create: bool) -> Optional[bool]:
+        """
+        Write a message to both stores in one transaction so a concurrent backfill cannot copy it twice.
+        Returns None if dual_write_chat_message is not installed yet.
+        """
+        try:
+            response = self.supabase.rpc("dual_write_chat_message", {
+                "p_phone_number": phone_number,
+                "p_time_stamp": self._convert_dt(message.time_stamp),
+                "p_content": message.content,
+                "p_message_type": message.message_type,
+                "p_sender": message.sender,
+                "p_create": create,
+            }).execute()
+        except Exception as e:
+            if not is_missing_object_error(e):
+                raise
+            Logger.error(f"dual_write_chat_message is missing, writing the stores separately: {e}")
+            return None
+        Logger.info("Added message to chat history and chat messages")
         return bool(response.data)
 
+    def _write_message(self, phone_number: str, message: MessageSchema, create: bool) -> bool:
+        """Write a message to the store(s) selected by the storage mode."""
+        mode = self.storage_mode()
+        success = True
+
+        if mode == "dual":
+            written = self._dual_write_message(phone_number, message, create)
+            if written is not None:
+                return written
+
+        if mode in ("json", "dual"):
+            success = self._append_json_message(phone_number, message, create)
+            if not success:
+                return False
+
+        if mode in ("dual", "messages"):
+            try:
+                success = self._insert_message_row(phone_number, message)
+            except Exception as e:
+                if mode == "messages":
+                    raise
+                # In dual mode the legacy store is still the source of truth
+                Logger.error(f"Failed to dual-write message for {phone_number}: {e}")
+
+        return success
+
+    def add_message(self, phone_number: str, message: MessageSchema) -> bool:
+        """Append a message to the existing chat history for a customer."""
+        if self._reads_messages_table() and not self.has_chat(phone_number):
+            Logger.warning(f"No existing chat found for phone: {phone_number}")
+            return False
+        return self._write_message(phone_number, message, create=False)
+
+    def has_chat(self, phone_number: str) -> bool:
+        """Check whether any chat history exists for a phone number."""
+        if self._reads_messages_table():
+            response = self.supabase.table(self.MESSAGES_TABLE_NAME) \
+                .select("seq") \
+                .eq("phone_number", phone_number) \
+                .limit(1) \
+                .execute()
+            return bool(response.data)
+        return self._get_chat_by_phone(phone_number) is not None
+
     def delete_chat(self, phone_number: str) -> bool:
         """Delete a chat history by phone number."""
-        response = self.supabase.table(self.TABLE_NAME) \
-            .delete() \
-            .eq("phone_number", phone_number) \
-            .execute()
-        
+        mode = self.storage_mode()
+        deleted = False
+
+        if mode in ("json", "dual"):
+            response = self.supabase.table(self.TABLE_NAME) \
+                .delete() \
+                .eq("phone_number", phone_number) \
+                .execute()
+            deleted = bool(response.data)
+
+        if mode in ("dual", "messages"):
+            response = self.supabase.table(self.MESSAGES_TABLE_NAME) \
+                .delete() \
+                .eq("phone_number", phone_number) \
+                .execute()
+            deleted = deleted or bool(response.data)
+
+        try:
+            conversation_db.delete_conversation(phone_number)
+        except Exception as e:
+            Logger.error(f"Failed to delete conversation summary: {e}")
+
         Logger.info(f"Deleted chat history of {phone_number}")
-        return bool(response.data)
+        return deleted
 
-    def add_or_create_message(self, phone_number: str, message: MessageSchema) -> bool:
-        """Add message to existing chat history or create a new record."""
+    def record_message(self, phone_number: str, message: MessageSchema) -> bool:
+        """
+        Store a message, update its conversation summary and count it in the daily stats.
+        Everything happens in one record_chat_message call; if that database function is
+        not installed yet, the separate writes are used instead. Other errors are logged and
+        return False (never raised), in both this and the asyncpg backend.
+        """
         # Normalize and validate phone number
         try:
-            normalized_phone = "".join(ch for ch in str(phone_number) if ch.isdigit())
+            normalized_phone = self._normalize_phone(phone_number)
         except Exception:
             Logger.warning(f"Invalid phone number type: {type(phone_number)}")
             return False
@@ -83,42 +224,175 @@ class ChatHistoryDataBase(DataBase):
             Logger.warning("Empty or invalid phone number after normalization")
             return False
 
-        existing_chat = self._get_chat_by_phone(normalized_phone)
+        # While the aggregator runs the counts are buffered and flushed in batches instead
+        buffered_stats = message_stats_aggregator.running
+        try:
+            response = self.supabase.rpc("record_chat_message", {
+                "p_phone_number": normalized_phone,
+                "p_time_stamp": self._convert_dt(message.time_stamp),
+                "p_content": message.content,
+                "p_message_type": message.message_type,
+                "p_sender": message.sender,
+                "p_storage_mode": self.storage_mode(),
+                "p_stats_date": None if buffered_stats else str(_get_current_karachi_time().date()),
+            }).execute()
+        except Exception as e:
+            if is_missing_object_error(e):
+                # Database function not installed yet; fall back to the separate writes
+                Logger.error(f"record_chat_message is missing, using separate writes for {normalized_phone}: {e}")
+                return self._record_message_separately(normalized_phone, message)
+            # The call may have committed, so writing again could store and count it twice
+            Logger.error(f"record_chat_message failed for {normalized_phone}: {e}")
+            return False
 
-        if existing_chat:
-            messages = existing_chat.get("messages", [])
-            messages.append(message.dict())
-            messages = self._convert_dt(messages)
+        if buffered_stats:
+            message_stats_aggregator.add(message.sender, message.message_type)
+        Logger.info(f"Stored message for {normalized_phone}")
+        return bool(response.data)
 
-            response = self.supabase.table(self.TABLE_NAME) \
-                .update({"messages": messages}) \
-                .eq("phone_number", normalized_phone) \
-                .execute()
-            success = bool(response.data)  # Access data directly from APIResponse
-            Logger.info("Added message to existing chat history")
-        else:
-            new_chat = ChatHistorySchema(phone_number=normalized_phone, messages=[message])
-            response = self._create_chat_history(new_chat)
-            success = bool(response)  # _create_chat_history already returns the data part
+    def _record_message_separately(self, phone_number: str, message: MessageSchema) -> bool:
+        """Store a message with one request per table (before record_chat_message existed)."""
+        success = self._write_message(phone_number, message, create=True)
 
-        # ✅ Always increment stats
+        if success:
+            try:
+                conversation_db.record_message(phone_number, message)
+            except Exception as e:
+                Logger.error(f"Failed to update conversation summary: {e}")
+
+        # ✅ Always increment stats (buffered and flushed in batches while the app runs)
         try:
-            daily_stats_db.increment_message_count(message.sender, message.message_type)
+            if not message_stats_aggregator.add(message.sender, message.message_type):
+                daily_stats_db.increment_message_count(message.sender, message.message_type)
         except Exception as e:
             Logger.error(f"Failed to increment daily stats: {e}")
 
         return success
 
+    def get_messages_page(self, phone_number: str, offset: int, limit: int) -> Tuple[List[MessageSchema], int]:
+        """
+        Return one page of messages (newest first) and the total message count.
+        Returns an empty list and a total of 0 if the phone has no chat history.
+        """
+        if self._reads_messages_table():
+            response = self.supabase.table(self.MESSAGES_TABLE_NAME) \
+                .select("time_stamp, content, message_type, sender", count="exact") \
+                .eq("phone_number", phone_number) \
+                .order("seq", desc=True) \
+                .range(offset, offset + limit - 1) \
+                .execute()
+            messages = [self._message_from_row(row) for row in response.data or []]
+            return messages, response.count or 0
+
+        chat = self._get_chat_by_phone(phone_number)
+        if not chat or "messages" not in chat:
+            return [], 0
+
+        raw_messages = chat["messages"] or []
+        newest_first = list(reversed(raw_messages))[offset:offset + limit]
+        return [MessageSchema.model_validate(m) for m in newest_first], len(raw_messages)
+
+    def get_messages_by_cursor(
+        self,
+        phone_number: str,
+        limit: int,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        include_total: bool = False,
+    ) -> Tuple[List[Tuple[int, MessageSchema]], bool, Optional[int]]:
+        """
+        Keyset pagination over a conversation.
+
+        Returns up to `limit` (seq, message) pairs newest first, whether more messages
+        exist in the direction of travel, and the total count (None unless requested).
+        `before` walks towards older messages, `after` towards newer ones.
+        """
+        # Fetch one extra row to know whether another page exists
+        fetch_limit = limit + 1
+        total: Optional[int] = None
+
+        if self._reads_messages_table():
+            query = self.supabase.table(self.MESSAGES_TABLE_NAME) \
+                .select("seq, time_stamp, content, message_type, sender") \
+                .eq("phone_number", phone_number)
+            if before is not None:
+                query = query.lt("seq", before)
+            if after is not None:
+                query = query.gt("seq", after)
+            response = query.order("seq", desc=(after is None)).limit(fetch_limit).execute()
+            rows = [(row["seq"], self._message_from_row(row)) for row in response.data or []]
+            if include_total:
+                # Counted without the cursor filter so it is the size of the whole conversation
+                count_response = self.supabase.table(self.MESSAGES_TABLE_NAME) \
+                    .select("seq", count="exact", head=True) \
+                    .eq("phone_number", phone_number) \
+                    .execute()
+                total = count_response.count or 0
+        else:
+            response = self.supabase.rpc(
+                "get_chat_history_page",
+                {"p_phone_number": phone_number, "p_limit": fetch_limit, "p_before": before, "p_after": after}
+            ).execute()
+            page = response.data or {}
+            rows = [(item["seq"], MessageSchema.model_validate(item["message"])) for item in page.get("messages", [])]
+            if include_total:
+                total = page.get("total", 0)
+
+        rows.sort(key=lambda item: item[0])
+        has_more = len(rows) > limit
+        # Keep the rows closest to the cursor
+        rows = rows[-limit:] if after is None else rows[:limit]
+        rows.reverse()
+        return rows, has_more, total
+
+    def backfill_messages_table(self, phone_number: str) -> int:
+        """Copy the legacy JSON messages of one phone into chat_messages. Returns rows copied."""
+        response = self.supabase.rpc("backfill_chat_messages", {"p_phone_number": phone_number}).execute()
+        return int(response.data or 0)
 
     def get_recent_chat_history_by_phone(self, phone_number: str, limit: int = 10) -> List[MessageSchema]:
         """
         Retrieve the most recent messages for a given phone number.
+        The database returns only the last `limit` messages, already sorted,
+        so only those messages are transferred and validated.
         Args:
             phone_number: The phone number to search for.
             limit: Number of recent messages to return.
         Returns:
             A list of message dictionaries sorted by datetime (newest last).
         """
+        if self._reads_messages_table():
+            response = self.supabase.table(self.MESSAGES_TABLE_NAME) \
+                .select("time_stamp, content, message_type, sender") \
+                .eq("phone_number", phone_number) \
+                .order("seq", desc=True) \
+                .limit(limit) \
+                .execute()
+            if not response.data:
+                Logger.warning(f"No chat history found for phone {phone_number}")
+                return []
+            Logger.info(f"Fetched recent chat history for phone {phone_number}")
+            return [self._message_from_row(row) for row in reversed(response.data)]
+
+        try:
+            response = self.supabase.rpc(
+                "get_recent_chat_history",
+                {"p_phone_number": phone_number, "p_limit": limit}
+            ).execute()
+        except Exception as e:
+            if not is_missing_object_error(e):
+                Logger.error(f"Tail read failed for {phone_number}: {e}")
+                raise
+            # Database function not installed yet; fall back to the full download
+            Logger.error(f"get_recent_chat_history is missing, falling back to full history for {phone_number}: {e}")
+        else:
+            recent_messages = response.data or []
+            if not recent_messages:
+                Logger.warning(f"No chat history found for phone {phone_number}")
+                return []
+            Logger.info(f"Fetched recent chat history for phone {phone_number}")
+            return [MessageSchema.model_validate(message) for message in recent_messages]
+
         chat = self._get_chat_by_phone(phone_number)
         if not chat or "messages" not in chat:
             Logger.warning(f"No chat history found for phone {phone_number}")
@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Optional
+from whatsapp_agent.database.base import DataBase
+from whatsapp_agent.schema.conversation_memory import ConversationMemorySchema
+from whatsapp_agent._debug import Logger
+
+class ConversationMemoryDataBase(DataBase):
+    """Rolling per-phone conversation summary used to keep agent prompts bounded."""
+
+    TABLE_NAME = "conversation_memory"
+
+    def __init__(self):
+        super().__init__()
+
+    def get_memory(self, phone_number: str) -> Optional[ConversationMemorySchema]:
+        """Fetch the stored summary of a conversation."""
+        response = self.supabase.table(self.TABLE_NAME) \
+            .select("*") \
+            .eq("phone_number", phone_number) \
+            .limit(1) \
+            .execute()
+        if not response.data:
+            return None
+        return ConversationMemorySchema.model_validate(response.data[0])
+
+    def save_memory(self, memory: ConversationMemorySchema) -> None:
+        """Insert or replace the summary of a conversation."""
+        data = memory.dict()
+        if isinstance(data["summarized_until"], datetime):
+            data["summarized_until"] = data["summarized_until"].isoformat()
+        data["updated_at"] = datetime.now().astimezone().isoformat()
+        self.supabase.table(self.TABLE_NAME).upsert(data, on_conflict="phone_number").execute()
+        Logger.info(f"Saved conversation summary for {memory.phone_number}")
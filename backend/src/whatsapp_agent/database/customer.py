@@ -105,6 +105,26 @@ class CustomerDataBase(DataBase):
             .execute()
         return response.count or 0
 
+    def get_customer_analytics(self, high_value_spend: int = 10000, top_limit: int = 5) -> Dict[str, Any]:
+        """
+        Customer counts, spend totals and the top spenders from one aggregate query.
+        Keys: total, active, escalated, b2b, d2c, escalated_b2b, escalated_d2c,
+        total_spend, high_value, top_customers.
+        """
+        response = self.supabase.rpc("get_customer_analytics", {
+            "p_high_value_spend": high_value_spend,
+            "p_top_limit": top_limit,
+        }).execute()
+        return response.data or {}
+
+    def list_escalated_customers(self) -> List[Dict[str, Any]]:
+        """List the customers currently escalated to a human."""
+        response = self.supabase.table(self.TABLE_NAME) \
+            .select("phone_number, customer_name, customer_type, total_spend, company_name") \
+            .eq("escalation_status", True) \
+            .execute()
+        return response.data or []
+
     def is_escalated(self, phone_number: str) -> bool:
         """Check if a customer has escalation_status=True."""
         response = self.supabase.table(self.TABLE_NAME) \
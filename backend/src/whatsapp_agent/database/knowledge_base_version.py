@@ -0,0 +1,13 @@
+from whatsapp_agent.database.base import DataBase
+
+
+class KnowledgeBaseVersionDB(DataBase):
+    """Shared counter of FAQ / knowledge base changes, so every worker can drop stale cached answers."""
+
+    def get_version(self) -> int:
+        response = self.supabase.table("knowledge_base_version").select("version").limit(1).execute()
+        return response.data[0]["version"] if response.data else 0
+
+    def bump(self) -> int:
+        response = self.supabase.rpc("bump_knowledge_base_version", {}).execute()
+        return response.data or 0
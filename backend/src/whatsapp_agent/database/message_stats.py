@@ -1,4 +1,4 @@
-from typing import Dict, Optional, Literal, List, Any
+from typing import Dict, Optional, Literal, List, Any, Tuple
 from whatsapp_agent.utils.current_time import _get_current_karachi_time
 from whatsapp_agent.database.base import DataBase
 from whatsapp_agent._debug import Logger
@@ -30,59 +30,49 @@ class MessageStatsDatabase(DataBase):
         except ValueError:
             return False
 
+    SENDER_COLUMNS = {
+        "customer": "total_customer_messages",
+        "representative": "total_representative_messages",
+        "agent": "total_agent_messages",
+    }
+
+    @classmethod
+    def delta_rows(cls, counts: Dict[Tuple[str, str, str], int]) -> List[Dict[str, Any]]:
+        """
+        Turn (date, sender, message_type) -> count into one row of column deltas per date,
+        the input of the increment_daily_message_stats SQL function.
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        for (date, sender, message_type), count in counts.items():
+            row = rows.setdefault(date, {"date": date, "total_messages": 0})
+            type_column = cls.MESSAGE_TYPE_COLUMNS.get(message_type.lower(), "text_messages")
+            sender_column = cls.SENDER_COLUMNS.get(sender, "total_agent_messages")
+            row["total_messages"] += count
+            row[type_column] = row.get(type_column, 0) + count
+            row[sender_column] = row.get(sender_column, 0) + count
+        return list(rows.values())
+
+    def apply_deltas(self, rows: List[Dict[str, Any]]) -> None:
+        """Add per-date column deltas to the stats in one atomic statement."""
+        if rows:
+            self.supabase.rpc("increment_daily_message_stats", {"p_deltas": rows}).execute()
+
     def increment_message_count(
         self,
         sender: Literal["customer", "agent","representative"],
         message_type: str,
     ) -> None:
         """
-        Increment message count for a specific phone number and message type.
+        Increment today's counters for a single message.
+        The message hot path buffers counts in message_stats_aggregator instead.
         
         Args:
             sender: Who sent the message ("customer" or "agent" or "representative")
             message_type: Type of message (text, image, audio, etc.)
         """
         try:
-            current_time = _get_current_karachi_time()
-            date = current_time.date()
-            
-            # Get the column name for the message type
-            column = self.MESSAGE_TYPE_COLUMNS.get(message_type.lower(), "text_messages")
-            
-            # Get current stats first
-            response = self.supabase.table(self.TABLE_NAME).select("*").eq("date", str(date)).limit(1).execute()
-            current_stats = response.data[0] if response.data else {
-                "date": str(date),
-                "total_messages": 0,
-                "text_messages": 0,
-                "image_messages": 0,
-                "video_messages": 0,
-                "audio_messages": 0,
-                "document_messages": 0,
-                "total_customer_messages": 0,
-                "total_agent_messages": 0,
-                "total_representative_messages": 0
-            }
-            
-            # Prepare updates
-            updates = {
-                column: current_stats.get(column, 0) + 1,
-                "total_messages": current_stats.get("total_messages", 0) + 1
-            }
-            
-            # Add sender-specific updates
-            if sender == "representative":
-                updates["total_representative_messages"] = current_stats.get("total_representative_messages", 0) + 1
-            elif sender == "customer":
-                updates["total_customer_messages"] = current_stats.get("total_customer_messages", 0) + 1
-            else:
-                updates["total_agent_messages"] = current_stats.get("total_agent_messages", 0) + 1
-
-            # Use upsert to create or update the row atomically
-            self.supabase.table(self.TABLE_NAME).upsert(
-                {"date": str(date), **current_stats, **updates},
-                on_conflict=["date"]
-            ).execute()
+            date = str(_get_current_karachi_time().date())
+            self.apply_deltas(self.delta_rows({(date, sender, message_type): 1}))
             Logger.info(f"Updated message stats for {date}")
             
         except Exception as e:
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+from whatsapp_agent.utils.current_time import _get_current_karachi_time
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent._debug import Logger
+
+DEFAULT_FLUSH_SECONDS = 5.0
+
+
+class MessageStatsAggregator:
+    """
+    Write-behind buffer for daily_message_stats.
+
+    Each stored message only bumps an in-memory (date, sender, message_type) counter; the
+    counters are flushed every MESSAGE_STATS_FLUSH_SECONDS and on shutdown as a single
+    increment_daily_message_stats call, which adds the deltas in place. A failed flush keeps
+    its counts for the next attempt. Until start() runs (scripts, tests) or with a flush
+    interval of 0, add() returns False and callers fall back to a direct increment.
+    """
+
+    def __init__(self):
+        self._pending: Counter = Counter()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"buffered": 0, "flushes": 0, "flushed_messages": 0, "failed_flushes": 0}
+
+    @staticmethod
+    def _flush_seconds() -> float:
+        try:
+            return float(Config.get("MESSAGE_STATS_FLUSH_SECONDS", DEFAULT_FLUSH_SECONDS))
+        except (TypeError, ValueError):
+            return DEFAULT_FLUSH_SECONDS
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def add(self, sender: str, message_type: str) -> bool:
+        """Buffer one message; safe to call from worker threads."""
+        if not self.running:
+            return False
+        key = (str(_get_current_karachi_time().date()), sender, message_type)
+        with self._lock:
+            self._pending[key] += 1
+            self._stats["buffered"] += 1
+        return True
+
+    def _drain(self) -> Dict[Tuple[str, str, str], int]:
+        with self._lock:
+            counts, self._pending = self._pending, Counter()
+        return counts
+
+    def _restore(self, counts: Dict[Tuple[str, str, str], int]):
+        with self._lock:
+            self._pending.update(counts)
+
+    async def flush(self) -> bool:
+        """Write the buffered counts; returns False (keeping them) if the write failed."""
+        counts = self._drain()
+        if not counts:
+            return True
+        # Imported here: the repositories import the chat history module that feeds this buffer
+        from whatsapp_agent.database.repositories import repositories
+        stats_db = repositories.message_stats
+        try:
+            await stats_db.apply_deltas(stats_db.delta_rows(counts))
+        except Exception as e:
+            self._restore(counts)
+            self._stats["failed_flushes"] += 1
+            Logger.error(f"{__name__}: flush -> Failed to write message stats, will retry: {e}")
+            return False
+        self._stats["flushes"] += 1
+        self._stats["flushed_messages"] += sum(counts.values())
+        return True
+
+    async def _run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def start(self):
+        interval = self._flush_seconds()
+        if self._task is None and interval > 0:
+            self._task = asyncio.create_task(self._run(interval))
+            Logger.info(f"Buffering message stats, flushing every {interval}s")
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still buffered."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if not await self.flush():
+            lost = sum(self._drain().values())
+            Logger.error(f"Dropped {lost} buffered message stats on shutdown")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = sum(self._pending.values())
+        return {"running": self.running, "pending": pending, **self._stats}
+
+
+message_stats_aggregator = MessageStatsAggregator()
@@ -0,0 +1,82 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+import asyncpg
+from whatsapp_agent.exceptions import DatabaseConnectionError
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent._debug import Logger
+
+DEFAULT_POOL_MIN_SIZE = 1
+DEFAULT_POOL_MAX_SIZE = 10
+
+class AsyncPostgresDataBase:
+    """
+    Base class for asyncpg-backed repositories.
+    All subclasses share one connection pool per process, created on first use.
+    Rows are returned as `to_jsonb(row)` dicts so they have the same shape as supabase responses.
+    """
+
+    _pool: Optional[asyncpg.Pool] = None
+    _pool_lock: Optional[asyncio.Lock] = None
+
+    @staticmethod
+    async def _init_connection(connection: asyncpg.Connection):
+        """Decode json/jsonb columns into Python objects."""
+        for type_name in ("json", "jsonb"):
+            await connection.set_type_codec(
+                type_name,
+                encoder=json.dumps,
+                decoder=json.loads,
+                schema="pg_catalog",
+            )
+
+    @classmethod
+    async def get_pool(cls) -> asyncpg.Pool:
+        """Return the shared pool, creating it on first use."""
+        if AsyncPostgresDataBase._pool is not None:
+            return AsyncPostgresDataBase._pool
+
+        if AsyncPostgresDataBase._pool_lock is None:
+            AsyncPostgresDataBase._pool_lock = asyncio.Lock()
+
+        async with AsyncPostgresDataBase._pool_lock:
+            if AsyncPostgresDataBase._pool is None:
+                dsn = Config.get("SUPABASE_DB_URL")
+                if not dsn:
+                    raise DatabaseConnectionError("SUPABASE_DB_URL is not set; cannot use the asyncpg backend")
+                AsyncPostgresDataBase._pool = await asyncpg.create_pool(
+                    dsn,
+                    min_size=int(Config.get("DB_POOL_MIN_SIZE", DEFAULT_POOL_MIN_SIZE)),
+                    max_size=int(Config.get("DB_POOL_MAX_SIZE", DEFAULT_POOL_MAX_SIZE)),
+                    # Supabase's pooler runs in transaction mode, which breaks prepared statement caching
+                    statement_cache_size=0,
+                    init=cls._init_connection,
+                )
+                Logger.info("Created asyncpg connection pool")
+
+        return AsyncPostgresDataBase._pool
+
+    @classmethod
+    async def close_pool(cls):
+        """Close the shared pool (called on application shutdown)."""
+        pool = AsyncPostgresDataBase._pool
+        AsyncPostgresDataBase._pool = None
+        if pool is not None:
+            await pool.close()
+            Logger.info("Closed asyncpg connection pool")
+
+    async def _fetch_json_rows(self, query: str, *args) -> List[Dict[str, Any]]:
+        """Run a query whose single column is a jsonb row and return the rows as dicts."""
+        pool = await self.get_pool()
+        records = await pool.fetch(query, *args)
+        return [record[0] for record in records]
+
+    async def _fetch_json_row(self, query: str, *args) -> Optional[Dict[str, Any]]:
+        """Like _fetch_json_rows but return only the first row (or None)."""
+        pool = await self.get_pool()
+        return await pool.fetchval(query, *args)
+
+    @staticmethod
+    def _quote_columns(columns: List[str]) -> str:
+        """Quote trusted column names for use in dynamic SQL."""
+        return ", ".join(f'"{column}"' for column in columns)
@@ -0,0 +1,29 @@
+from typing import List, Optional
+from whatsapp_agent.database.postgres.base import AsyncPostgresDataBase
+from whatsapp_agent.schema.campaign import CampaignSchema
+
+class AsyncCampaignDataBase(AsyncPostgresDataBase):
+    """asyncpg implementation of the campaign reads used per message."""
+
+    TABLE_NAME = "campaigns"
+
+    async def get_campaign_by_id(self, campaign_id: str) -> Optional[CampaignSchema]:
+        """Fetch a campaign by its ID"""
+        row = await self._fetch_json_row(
+            f"SELECT to_jsonb(c) FROM {self.TABLE_NAME} c WHERE c.id = $1 LIMIT 1",
+            campaign_id,
+        )
+        if row:
+            return CampaignSchema(**row)
+        return None
+
+    async def list_campaigns(self) -> List[CampaignSchema]:
+        """List all campaigns"""
+        rows = await self._fetch_json_rows(f"SELECT to_jsonb(c) FROM {self.TABLE_NAME} c")
+        return [CampaignSchema(**row) for row in rows]
+
+    async def get_current_active_campaigns(self) -> List[CampaignSchema]:
+        """Get the currently active campaigns"""
+        # Filter in the database instead of listing every campaign
+        rows = await self._fetch_json_rows(f"SELECT to_jsonb(c) FROM {self.TABLE_NAME} c WHERE c.status")
+        return [CampaignSchema(**row) for row in rows]
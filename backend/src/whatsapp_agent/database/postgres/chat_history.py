@@ -0,0 +1,139 @@
+from typing import List
+import asyncpg
+from whatsapp_agent.database.postgres.base import AsyncPostgresDataBase
+from whatsapp_agent.database.postgres.message_stats import AsyncMessageStatsDatabase
+from whatsapp_agent.database.message_stats_aggregator import message_stats_aggregator
+from whatsapp_agent.database.chat_history import ChatHistoryDataBase
+from whatsapp_agent.schema.chat_history import MessageSchema
+from whatsapp_agent.utils.current_time import _get_current_karachi_time
+from whatsapp_agent._debug import Logger
+
+daily_stats_db = AsyncMessageStatsDatabase()
+
+class AsyncChatHistoryDataBase(AsyncPostgresDataBase):
+    """
+    asyncpg implementation of the chat history operations on the message hot path.
+    Honours CHAT_STORAGE_MODE exactly like ChatHistoryDataBase.
+    """
+
+    TABLE_NAME = ChatHistoryDataBase.TABLE_NAME
+    MESSAGES_TABLE_NAME = ChatHistoryDataBase.MESSAGES_TABLE_NAME
+
+    # Storage mode parsing is shared with the supabase implementation
+    storage_mode = ChatHistoryDataBase.storage_mode
+
+    async def record_message(self, phone_number: str, message: MessageSchema) -> bool:
+        """
+        Store a message, update its conversation summary and count it in the daily stats
+        with a single record_chat_message call.
+        Same contract as ChatHistoryDataBase.record_message: errors are logged and return
+        False, so callers check the result rather than catching exceptions.
+        """
+        try:
+            normalized_phone = ChatHistoryDataBase._normalize_phone(phone_number)
+        except Exception:
+            Logger.warning(f"Invalid phone number type: {type(phone_number)}")
+            return False
+        if not normalized_phone:
+            Logger.warning("Empty or invalid phone number after normalization")
+            return False
+
+        # While the aggregator runs the counts are buffered and flushed in batches instead
+        buffered_stats = message_stats_aggregator.running
+        pool = await self.get_pool()
+        try:
+            await pool.execute(
+                "SELECT record_chat_message($1, $2::timestamptz, $3, $4, $5, $6, $7)",
+                normalized_phone,
+                message.time_stamp,
+                message.content,
+                message.message_type,
+                message.sender,
+                self.storage_mode(),
+                None if buffered_stats else _get_current_karachi_time().date(),
+            )
+        except asyncpg.UndefinedFunctionError as e:
+            # Database function not installed yet; fall back to the separate writes
+            Logger.error(f"record_chat_message is missing, using separate writes: {e}")
+            try:
+                return await self._record_message_separately(normalized_phone, message)
+            except Exception as e:
+                Logger.error(f"Failed to store message for {normalized_phone}: {e}")
+                return False
+        except Exception as e:
+            # The call may have committed, so writing again could store and count it twice
+            Logger.error(f"record_chat_message failed for {normalized_phone}: {e}")
+            return False
+
+        if buffered_stats:
+            message_stats_aggregator.add(message.sender, message.message_type)
+        Logger.info(f"Stored message for {normalized_phone}")
+        return True
+
+    async def _record_message_separately(self, normalized_phone: str, message: MessageSchema) -> bool:
+        """Store a message in one transaction of per-table statements (before record_chat_message existed)."""
+        mode = self.storage_mode()
+        payload = ChatHistoryDataBase._convert_dt(message.dict())
+        success = False
+
+        pool = await self.get_pool()
+        async with pool.acquire() as connection:
+            # The message and its conversation summary are written together or not at all
+            async with connection.transaction():
+                if mode in ("json", "dual"):
+                    # Append in place instead of downloading and re-uploading the whole array
+                    await connection.execute(
+                        f"INSERT INTO {self.TABLE_NAME} (phone_number, messages) VALUES ($1, $2::jsonb) "
+                        f"ON CONFLICT (phone_number) DO UPDATE SET messages = "
+                        f"COALESCE({self.TABLE_NAME}.messages, '[]'::jsonb) || EXCLUDED.messages",
+                        normalized_phone,
+                        [payload],
+                    )
+
+                if mode in ("dual", "messages"):
+                    await connection.execute(
+                        f"INSERT INTO {self.MESSAGES_TABLE_NAME} (phone_number, time_stamp, content, message_type, sender) "
+                        f"VALUES ($1, $2::timestamptz, $3, $4, $5)",
+                        normalized_phone,
+                        message.time_stamp,
+                        message.content,
+                        message.message_type,
+                        message.sender,
+                    )
+
+                await connection.execute(
+                    "SELECT upsert_chat_conversation($1, $2, $3::timestamptz, $4, $5)",
+                    normalized_phone,
+                    message.content,
+                    message.time_stamp,
+                    message.sender,
+                    message.message_type,
+                )
+                success = True
+        Logger.info(f"Stored message for {normalized_phone}")
+
+        if not message_stats_aggregator.add(message.sender, message.message_type):
+            await daily_stats_db.increment_message_count(message.sender, message.message_type)
+        return success
+
+    async def get_recent_chat_history_by_phone(self, phone_number: str, limit: int = 10) -> List[MessageSchema]:
+        """Retrieve the most recent messages for a given phone number (newest last)."""
+        pool = await self.get_pool()
+
+        if self.storage_mode() == "messages":
+            rows = await pool.fetch(
+                f"SELECT time_stamp, content, message_type, sender FROM {self.MESSAGES_TABLE_NAME} "
+                f"WHERE phone_number = $1 ORDER BY seq DESC LIMIT $2",
+                phone_number,
+                limit,
+            )
+            messages = [ChatHistoryDataBase._message_from_row(dict(row)) for row in reversed(rows)]
+        else:
+            recent_messages = await pool.fetchval("SELECT get_recent_chat_history($1, $2)", phone_number, limit)
+            messages = [MessageSchema.model_validate(m) for m in recent_messages or []]
+
+        if not messages:
+            Logger.warning(f"No chat history found for phone {phone_number}")
+            return []
+        Logger.info(f"Fetched recent chat history for phone {phone_number}")
+        return messages
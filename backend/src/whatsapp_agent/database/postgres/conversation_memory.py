@@ -0,0 +1,34 @@
+from typing import Optional
+from whatsapp_agent.database.postgres.base import AsyncPostgresDataBase
+from whatsapp_agent.database.conversation_memory import ConversationMemoryDataBase
+from whatsapp_agent.schema.conversation_memory import ConversationMemorySchema
+from whatsapp_agent._debug import Logger
+
+class AsyncConversationMemoryDataBase(AsyncPostgresDataBase):
+    """asyncpg implementation of the rolling conversation summary."""
+
+    TABLE_NAME = ConversationMemoryDataBase.TABLE_NAME
+
+    async def get_memory(self, phone_number: str) -> Optional[ConversationMemorySchema]:
+        """Fetch the stored summary of a conversation."""
+        row = await self._fetch_json_row(
+            f"SELECT to_jsonb(m) FROM {self.TABLE_NAME} m WHERE m.phone_number = $1",
+            phone_number,
+        )
+        return ConversationMemorySchema.model_validate(row) if row else None
+
+    async def save_memory(self, memory: ConversationMemorySchema) -> None:
+        """Insert or replace the summary of a conversation."""
+        pool = await self.get_pool()
+        await pool.execute(
+            f"INSERT INTO {self.TABLE_NAME} (phone_number, summary, summarized_until, summarized_messages, updated_at) "
+            f"VALUES ($1, $2, $3, $4, NOW()) "
+            f"ON CONFLICT (phone_number) DO UPDATE SET summary = EXCLUDED.summary, "
+            f"summarized_until = EXCLUDED.summarized_until, "
+            f"summarized_messages = EXCLUDED.summarized_messages, updated_at = NOW()",
+            memory.phone_number,
+            memory.summary,
+            memory.summarized_until,
+            memory.summarized_messages,
+        )
+        Logger.info(f"Saved conversation summary for {memory.phone_number}")
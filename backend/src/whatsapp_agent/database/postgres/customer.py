@@ -0,0 +1,81 @@
+from typing import Optional, List, Dict, Any
+from whatsapp_agent._debug import Logger
+from whatsapp_agent.database.postgres.base import AsyncPostgresDataBase
+from whatsapp_agent.schema.customer_schema import CustomerSchema
+
+class AsyncCustomerDataBase(AsyncPostgresDataBase):
+    """asyncpg implementation of the CustomerDataBase operations used per message."""
+
+    TABLE_NAME = "customers"
+    # Only schema fields may be written; they double as the allow-list for dynamic SQL
+    WRITABLE_COLUMNS = set(CustomerSchema.model_fields)
+
+    async def add_customer(self, customer: CustomerSchema) -> Dict[str, Any]:
+        """Insert a new customer record."""
+        data = customer.dict()
+        columns = self._quote_columns([k for k in data if k in self.WRITABLE_COLUMNS])
+        # jsonb_populate_record converts every value to the table's own column type
+        row = await self._fetch_json_row(
+            f"INSERT INTO {self.TABLE_NAME} ({columns}) "
+            f"SELECT {columns} FROM jsonb_populate_record(NULL::{self.TABLE_NAME}, $1::jsonb) "
+            f"RETURNING to_jsonb({self.TABLE_NAME})",
+            data,
+        )
+        Logger.debug(f"Created new customer: {row}")
+        return row
+
+    async def get_customer_by_phone(self, phone_number: str) -> Optional[CustomerSchema]:
+        """Fetch a customer by phone number."""
+        row = await self._fetch_json_row(
+            f"SELECT to_jsonb(c) FROM {self.TABLE_NAME} c WHERE c.phone_number = $1 LIMIT 1",
+            phone_number,
+        )
+        if row:
+            Logger.debug(f"Fetched customer by phone: {row}")
+            return CustomerSchema.model_validate(row)
+        return None
+
+    async def update_customer(self, phone_number: str, updates: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Update customer details."""
+        # Validate and clean the updates
+        clean_updates = {
+            k: v for k, v in updates.items()
+            if v not in (None, [], "") and k in self.WRITABLE_COLUMNS
+        }
+        # Remove escalation_status if it is not provided
+        clean_updates.pop('escalation_status', None)
+        if not clean_updates:
+            return []
+
+        columns = self._quote_columns(list(clean_updates))
+        rows = await self._fetch_json_rows(
+            f"UPDATE {self.TABLE_NAME} SET ({columns}) = ("
+            f"SELECT {columns} FROM jsonb_populate_record(NULL::{self.TABLE_NAME}, $2::jsonb)"
+            f") WHERE phone_number = $1 RETURNING to_jsonb({self.TABLE_NAME})",
+            phone_number,
+            clean_updates,
+        )
+        Logger.info(f"Updated customer details for phone: {phone_number}")
+        return rows
+
+    async def is_escalated(self, phone_number: str) -> bool:
+        """Check if a customer has escalation_status=True."""
+        pool = await self.get_pool()
+        status = await pool.fetchval(
+            f"SELECT escalation_status FROM {self.TABLE_NAME} WHERE phone_number = $1 LIMIT 1",
+            phone_number,
+        )
+        if status is None:
+            Logger.warning(f"No escalation status found for customer: {phone_number}")
+            return False
+        return bool(status)
+
+    async def update_escalation_status(self, phone_number: str, status: bool) -> bool:
+        """Update a customer's escalation_status. Returns True if a customer was updated."""
+        pool = await self.get_pool()
+        result = await pool.execute(
+            f"UPDATE {self.TABLE_NAME} SET escalation_status = $2 WHERE phone_number = $1",
+            phone_number,
+            status,
+        )
+        return result != "UPDATE 0"
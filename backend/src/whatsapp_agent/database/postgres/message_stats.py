@@ -0,0 +1,40 @@
+from typing import Any, Dict, List, Literal
+from whatsapp_agent.utils.current_time import _get_current_karachi_time
+from whatsapp_agent.database.postgres.base import AsyncPostgresDataBase
+from whatsapp_agent.database.message_stats import MessageStatsDatabase
+from whatsapp_agent._debug import Logger
+
+class AsyncMessageStatsDatabase(AsyncPostgresDataBase):
+    """asyncpg implementation of the per-message daily stats counter."""
+
+    TABLE_NAME = "daily_message_stats"
+    MESSAGE_TYPE_COLUMNS = MessageStatsDatabase.MESSAGE_TYPE_COLUMNS
+    delta_rows = MessageStatsDatabase.delta_rows
+
+    async def apply_deltas(self, rows: List[Dict[str, Any]]) -> None:
+        """Add per-date column deltas to the stats in one atomic statement."""
+        if rows:
+            pool = await self.get_pool()
+            await pool.execute("SELECT increment_daily_message_stats($1::jsonb)", rows)
+
+    async def increment_message_count(
+        self,
+        sender: Literal["customer", "agent", "representative"],
+        message_type: str,
+    ) -> None:
+        """
+        Increment today's counters for a single message in one atomic statement.
+        The message hot path buffers counts in message_stats_aggregator instead.
+
+        Args:
+            sender: Who sent the message ("customer" or "agent" or "representative")
+            message_type: Type of message (text, image, audio, etc.)
+        """
+        try:
+            date = str(_get_current_karachi_time().date())
+            await self.apply_deltas(self.delta_rows({(date, sender, message_type): 1}))
+            Logger.info(f"Updated message stats for {date}")
+
+        except Exception as e:
+            Logger.error(f"Failed to increment message count: {e}")
+            # Don't raise the exception - stats tracking should not break core functionality
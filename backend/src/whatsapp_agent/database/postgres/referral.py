@@ -0,0 +1,142 @@
+from typing import Any, Dict, Optional
+import asyncpg
+from whatsapp_agent._debug import Logger
+from whatsapp_agent.database.postgres.base import AsyncPostgresDataBase
+from whatsapp_agent.schema.referrals import ReferralSchema, ReferredUserSchema
+
+class AsyncReferralDataBase(AsyncPostgresDataBase):
+    """asyncpg implementation of ReferralDataBase."""
+
+    TABLE_NAME = "referrals"
+    WRITABLE_COLUMNS = set(ReferralSchema.model_fields)
+
+    async def get_phone_number_by_referral_code(self, referral_code: str) -> Optional[str]:
+        """Given a referral code, return the referrer's phone number if found, else None."""
+        pool = await self.get_pool()
+        return await pool.fetchval(
+            f"SELECT referrer_phone FROM {self.TABLE_NAME} WHERE referral_code = $1 LIMIT 1",
+            referral_code,
+        )
+
+    async def add_referral(self, referral: ReferralSchema) -> Optional[Dict[str, Any]]:
+        """Insert a referral record"""
+        data = referral.dict()
+        columns = self._quote_columns([k for k in data if k in self.WRITABLE_COLUMNS])
+        return await self._fetch_json_row(
+            f"INSERT INTO {self.TABLE_NAME} ({columns}) "
+            f"SELECT {columns} FROM jsonb_populate_record(NULL::{self.TABLE_NAME}, $1::jsonb) "
+            f"RETURNING to_jsonb({self.TABLE_NAME})",
+            data,
+        )
+
+    async def get_referral_by_code(self, referral_code: str) -> Optional[Dict[str, Any]]:
+        """Fetch referral details by referral code"""
+        return await self._fetch_json_row(
+            f"SELECT to_jsonb(r) FROM {self.TABLE_NAME} r WHERE r.referral_code = $1 LIMIT 1",
+            referral_code,
+        )
+
+    async def get_referral_by_phone_number(self, phone_number: str) -> Optional[Dict[str, Any]]:
+        """Fetch referral details by phone number"""
+        return await self._fetch_json_row(
+            f"SELECT to_jsonb(r) FROM {self.TABLE_NAME} r WHERE r.referrer_phone = $1 LIMIT 1",
+            phone_number,
+        )
+
+    async def has_referred_user(self, referral_code: str, campaign_id: str, phone_number: str) -> bool:
+        """
+        Check (by primary key) whether a phone already joined a campaign through a referral code.
+        Until referred_users.sql is installed the referred_users JSON column is scanned instead.
+        """
+        pool = await self.get_pool()
+        try:
+            return await pool.fetchval(
+                "SELECT EXISTS (SELECT 1 FROM referred_users "
+                "WHERE referral_code = $1 AND campaign_id = $2 AND phone_number = $3)",
+                referral_code,
+                campaign_id,
+                phone_number,
+            )
+        except asyncpg.UndefinedTableError as e:
+            Logger.error(f"referred_users table is missing, scanning the JSON column: {e}")
+            # NULL (no such referral code) counts as already referred so no point is awarded
+            return await pool.fetchval(
+                f"SELECT bool_or(COALESCE(u.referred->>'phone_number' = $3 AND u.referred->>'campaign_id' = $2, FALSE)) "
+                f"FROM {self.TABLE_NAME} r "
+                f"LEFT JOIN LATERAL jsonb_array_elements(COALESCE(r.referred_users, '[]'::jsonb)) AS u(referred) ON TRUE "
+                f"WHERE r.referral_code = $1",
+                referral_code,
+                campaign_id,
+                phone_number,
+            ) is not False
+
+    async def record_referral(self, referral_code: str, referred_user: ReferredUserSchema) -> Optional[Dict[str, Any]]:
+        """Add a referred user and award the referrer one point in one idempotent transaction"""
+        pool = await self.get_pool()
+        try:
+            return await pool.fetchval(
+                "SELECT record_referral_join($1, $2, $3, $4)",
+                referral_code,
+                referred_user.campaign_id,
+                referred_user.phone_number,
+                referred_user.time_stamp,
+            )
+        except asyncpg.UndefinedFunctionError as e:
+            # Database function not installed yet; run migrate_referrals.py once it is
+            Logger.error(f"record_referral_join is missing, updating the JSON columns: {e}")
+            referral = await self.add_referred_user(referral_code, referred_user)
+            if not referral:
+                return None
+            await self._update_total_points(referral_code, referred_user.campaign_id)
+            return {"added": True, "referrer_phone": referral.get("referrer_phone")}
+
+    async def add_referred_user(self, referral_code: str, referred_user: ReferredUserSchema) -> Optional[Dict[str, Any]]:
+        """Append a referred user to the referred_users JSON column (before record_referral_join existed)"""
+        # Append in place so concurrent referrals cannot overwrite each other
+        return await self._fetch_json_row(
+            f"UPDATE {self.TABLE_NAME} "
+            f"SET referred_users = COALESCE(referred_users, '[]'::jsonb) || $2::jsonb "
+            f"WHERE referral_code = $1 RETURNING to_jsonb({self.TABLE_NAME})",
+            referral_code,
+            [referred_user.dict()],
+        )
+
+    async def update_referral(self, referral_code: str, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """Award one extra point for a campaign with an atomic upsert on campaign_leaderboard"""
+        pool = await self.get_pool()
+        try:
+            return await pool.fetchval("SELECT award_referral_point($1, $2)", referral_code, campaign_id)
+        except asyncpg.UndefinedFunctionError as e:
+            # Database function not installed yet; run migrate_referrals.py once it is
+            Logger.error(f"award_referral_point is missing, updating total_points only: {e}")
+            return await self._update_total_points(referral_code, campaign_id)
+
+    async def _update_total_points(self, referral_code: str, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """Locked read-modify-write of total_points (before award_referral_point existed)"""
+        pool = await self.get_pool()
+        async with pool.acquire() as connection:
+            async with connection.transaction():
+                # Lock the row so concurrent increments are applied one after another
+                referral = await connection.fetchval(
+                    f"SELECT to_jsonb(r) FROM {self.TABLE_NAME} r WHERE r.referral_code = $1 FOR UPDATE",
+                    referral_code,
+                )
+                if not referral:
+                    return None
+
+                total_points = referral.get("total_points") or []
+                for point in total_points:
+                    if point["campaign_id"] == campaign_id:
+                        point["points"] += 1
+                        break
+                else:
+                    Logger.info("Adding new campaign points entry")
+                    total_points.append({"campaign_id": campaign_id, "points": 1})
+
+                await connection.execute(
+                    f"UPDATE {self.TABLE_NAME} SET total_points = $2::jsonb WHERE referral_code = $1",
+                    referral_code,
+                    total_points,
+                )
+                referral["total_points"] = total_points
+                return referral
@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from whatsapp_agent._debug import Logger
-from whatsapp_agent.database.base import DataBase
+from whatsapp_agent.database.base import DataBase, is_missing_object_error
 
 from whatsapp_agent.schema.referrals import ReferralSchema, ReferredUserSchema
 
@@ -41,9 +41,69 @@ class ReferralDataBase(DataBase):
         )
         return response.data[0] if response.data else None
 
+    def has_referred_user(self, referral_code: str, campaign_id: str, phone_number: str) -> bool:
+        """
+        Check (by primary key) whether a phone already joined a campaign through a referral code.
+        Until referred_users.sql is installed the referred_users JSON column is scanned instead.
+        """
+        try:
+            response = (
+                self.supabase.table("referred_users")
+                .select("phone_number")
+                .eq("referral_code", referral_code)
+                .eq("campaign_id", campaign_id)
+                .eq("phone_number", phone_number)
+                .limit(1)
+                .execute()
+            )
+            return bool(response.data)
+        except Exception as e:
+            if not is_missing_object_error(e):
+                raise
+            Logger.error(f"referred_users table is missing, scanning the JSON column: {e}")
+            return self._has_referred_user_in_json(referral_code, campaign_id, phone_number)
+
+    def _has_referred_user_in_json(self, referral_code: str, campaign_id: str, phone_number: str) -> bool:
+        """List scan of the referred_users JSON column (before the referred_users table existed)."""
+        referral = self.get_referral_by_code(referral_code)
+        if not referral:
+            return True  # Unknown code: treat as already referred so no point is awarded
+        return any(
+            user.get("phone_number") == phone_number and user.get("campaign_id") == campaign_id
+            for user in referral.get("referred_users") or []
+        )
+
+    def record_referral(self, referral_code: str, referred_user: ReferredUserSchema) -> Optional[Dict[str, Any]]:
+        """
+        Add a referred user and award the referrer one point for the campaign.
+        record_referral_join inserts idempotently and increments in the same transaction, so
+        concurrent joins through one link never lose points. Returns {added, referrer_phone, points},
+        or None if the referral code does not exist.
+        """
+        try:
+            response = self.supabase.rpc("record_referral_join", {
+                "p_referral_code": referral_code,
+                "p_campaign_id": referred_user.campaign_id,
+                "p_phone_number": referred_user.phone_number,
+                "p_time_stamp": referred_user.time_stamp,
+            }).execute()
+            return response.data or None
+        except Exception as e:
+            # Only a missing function falls back; after other errors the join may have committed
+            if not is_missing_object_error(e):
+                raise
+            Logger.error(f"record_referral_join is missing, updating the JSON columns for {referral_code}: {e}")
+            referral = self.add_referred_user(referral_code, referred_user)
+            if not referral:
+                return None
+            self._update_total_points(referral_code, referred_user.campaign_id)
+            return {"added": True, "referrer_phone": referral.get("referrer_phone")}
+
     def add_referred_user(self, referral_code: str, referred_user: ReferredUserSchema):
-        """Add a referred user to an existing referral"""
+        """Append a referred user to the referred_users JSON column (before record_referral_join existed)"""
         referral = self.get_referral_by_code(referral_code)
+        if not referral:
+            return None
         referral.get("referred_users", []).append(referred_user.dict())
         response = (
             self.supabase.table("referrals")
@@ -54,7 +114,25 @@ class ReferralDataBase(DataBase):
         return response.data[0] if response.data else None
 
     def update_referral(self, referral_code: str, campaign_id: str):
-        """Update an existing referral"""
+        """
+        Award one extra point for a campaign to an existing referral.
+        award_referral_point is a single atomic upsert on campaign_leaderboard.
+        """
+        try:
+            response = self.supabase.rpc("award_referral_point", {
+                "p_referral_code": referral_code,
+                "p_campaign_id": campaign_id,
+            }).execute()
+            return response.data or None
+        except Exception as e:
+            # Only a missing function falls back; after other errors the point may have been awarded
+            if not is_missing_object_error(e):
+                raise
+            Logger.error(f"award_referral_point is missing, updating total_points only for {referral_code}: {e}")
+            return self._update_total_points(referral_code, campaign_id)
+
+    def _update_total_points(self, referral_code: str, campaign_id: str):
+        """Read-modify-write of total_points (before award_referral_point existed)."""
         referral = self.get_referral_by_code(referral_code)
         existance: bool = False
         if not referral:
@@ -75,3 +153,31 @@ class ReferralDataBase(DataBase):
         .execute())
 
         return referral
+
+    def get_leaderboard_page(self, campaign_id: str, limit: int, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Return one page of a campaign leaderboard (with global ranks) and the number of ranked referrers."""
+        response = self.supabase.rpc("get_campaign_leaderboard_page", {
+            "p_campaign_id": campaign_id,
+            "p_limit": limit,
+            "p_offset": offset,
+        }).execute()
+        page = response.data or {}
+        return page.get("entries", []), page.get("total", 0)
+
+    def get_leaderboard_rank(self, campaign_id: str, referrer_phone: str) -> Optional[Dict[str, Any]]:
+        """Return a referrer's leaderboard entry and rank in a campaign, or None without points."""
+        response = self.supabase.rpc("get_campaign_leaderboard_rank", {
+            "p_campaign_id": campaign_id,
+            "p_referrer_phone": referrer_phone,
+        }).execute()
+        return response.data or None
+
+    def rebuild_leaderboard(self, campaign_id: Optional[str] = None) -> int:
+        """Recount the referrals of one campaign (or all) from the referred_users table."""
+        response = self.supabase.rpc("rebuild_campaign_leaderboard", {"p_campaign_id": campaign_id}).execute()
+        return response.data or 0
+
+    def migrate_to_tables(self) -> Dict[str, int]:
+        """Copy the referred_users / total_points JSON columns into the normalized tables (idempotent)."""
+        response = self.supabase.rpc("migrate_referrals_to_tables", {}).execute()
+        return response.data or {}
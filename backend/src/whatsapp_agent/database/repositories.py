@@ -0,0 +1,125 @@
+import asyncio
+import functools
+from typing import Any, Dict
+from whatsapp_agent.database.chat_history import ChatHistoryDataBase
+from whatsapp_agent.database.customer import CustomerDataBase
+from whatsapp_agent.database.message_stats import MessageStatsDatabase
+from whatsapp_agent.database.campaign import CampaignDataBase
+from whatsapp_agent.database.referral import ReferralDataBase
+from whatsapp_agent.database.conversation_memory import ConversationMemoryDataBase
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent._debug import Logger
+
+DEFAULT_DATABASE_BACKEND = "supabase"
+DATABASE_BACKENDS = ("supabase", "asyncpg")
+
+
+class ThreadedRepository:
+    """
+    Async facade over a synchronous supabase DataBase.
+    Every method call runs in a worker thread so it never blocks the event loop.
+    """
+
+    def __init__(self, database):
+        self._database = database
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._database, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(attribute, *args, **kwargs)
+
+        return call
+
+
+class Repositories:
+    """
+    Async repositories used on the message hot path.
+
+    The backend is chosen with the DATABASE_BACKEND config key:
+      "supabase" - the existing supabase-py classes, run in worker threads (default)
+      "asyncpg"  - native async queries over a pooled connection to SUPABASE_DB_URL
+    """
+
+    def __init__(self):
+        self._cache: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def backend() -> str:
+        """Return the configured database backend."""
+        backend = str(Config.get("DATABASE_BACKEND", DEFAULT_DATABASE_BACKEND) or "").strip().lower()
+        if backend not in DATABASE_BACKENDS:
+            Logger.warning(f"Unknown DATABASE_BACKEND '{backend}', falling back to '{DEFAULT_DATABASE_BACKEND}'")
+            return DEFAULT_DATABASE_BACKEND
+        return backend
+
+    @staticmethod
+    def _build(backend: str) -> Dict[str, Any]:
+        if backend == "asyncpg":
+            # Imported lazily so asyncpg is only required when the backend is enabled
+            from whatsapp_agent.database.postgres.customer import AsyncCustomerDataBase
+            from whatsapp_agent.database.postgres.chat_history import AsyncChatHistoryDataBase
+            from whatsapp_agent.database.postgres.message_stats import AsyncMessageStatsDatabase
+            from whatsapp_agent.database.postgres.campaign import AsyncCampaignDataBase
+            from whatsapp_agent.database.postgres.referral import AsyncReferralDataBase
+            from whatsapp_agent.database.postgres.conversation_memory import AsyncConversationMemoryDataBase
+            return {
+                "customers": AsyncCustomerDataBase(),
+                "chat_history": AsyncChatHistoryDataBase(),
+                "message_stats": AsyncMessageStatsDatabase(),
+                "campaigns": AsyncCampaignDataBase(),
+                "referrals": AsyncReferralDataBase(),
+                "conversation_memory": AsyncConversationMemoryDataBase(),
+            }
+
+        return {
+            "customers": ThreadedRepository(CustomerDataBase()),
+            "chat_history": ThreadedRepository(ChatHistoryDataBase()),
+            "message_stats": ThreadedRepository(MessageStatsDatabase()),
+            "campaigns": ThreadedRepository(CampaignDataBase()),
+            "referrals": ThreadedRepository(ReferralDataBase()),
+            "conversation_memory": ThreadedRepository(ConversationMemoryDataBase()),
+        }
+
+    def _get(self, name: str):
+        backend = self.backend()
+        if backend not in self._cache:
+            Logger.info(f"Using '{backend}' database backend")
+            self._cache[backend] = self._build(backend)
+        return self._cache[backend][name]
+
+    @property
+    def customers(self):
+        return self._get("customers")
+
+    @property
+    def chat_history(self):
+        return self._get("chat_history")
+
+    @property
+    def message_stats(self):
+        return self._get("message_stats")
+
+    @property
+    def campaigns(self):
+        return self._get("campaigns")
+
+    @property
+    def referrals(self):
+        return self._get("referrals")
+
+    @property
+    def conversation_memory(self):
+        return self._get("conversation_memory")
+
+    async def close(self):
+        """Release connections held by the async backend."""
+        if "asyncpg" in self._cache:
+            from whatsapp_agent.database.postgres.base import AsyncPostgresDataBase
+            await AsyncPostgresDataBase.close_pool()
+
+
+repositories = Repositories()
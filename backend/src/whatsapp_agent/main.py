@@ -21,6 +21,21 @@ from whatsapp_agent.routes.referral import router as referral_router
 from whatsapp_agent.routes.warranty_claims import warranty_claims_router
 from whatsapp_agent._debug import enable_verbose_logging, Logger
 from whatsapp_agent.utils.config import Config
+from whatsapp_agent.database.repositories import repositories
+from whatsapp_agent.utils.message_dispatcher import message_dispatcher
+from whatsapp_agent.utils.message_coalescer import message_coalescer
+from whatsapp_agent.utils.webhook_queue import webhook_workers, fast_ack_webhook
+from whatsapp_agent.mcp.boost_mcp import boost_mcp_pool
+from whatsapp_agent.utils.vector_store import vector_store_registry
+from whatsapp_agent.agents.registry import agent_registry
+from whatsapp_agent.agents.conversation_intent_router.fast_path import intent_fast_path
+from whatsapp_agent.agents.cascade import cascade_metrics
+from whatsapp_agent.agents.usage import usage_metrics
+from whatsapp_agent.utils.semantic_cache import semantic_answer_cache
+from whatsapp_agent.context.conversation_memory import conversation_memory
+from whatsapp_agent.database.boost_buddy_persona import persona_cache
+from whatsapp_agent.utils.openai_clients import openai_client_pool
+from whatsapp_agent.database.message_stats_aggregator import message_stats_aggregator
 from whatsapp_agent.utils.app_instance import app
 from whatsapp_agent.utils.wa_instance import wa
 
@@ -61,6 +76,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Store WhatsApp webhook updates and answer immediately; workers process them afterwards
+app.middleware("http")(fast_ack_webhook)
+
 
 # Health check endpoint
 @app.get("/ping", tags=["Health"])
@@ -74,6 +92,59 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/metrics/message-queue", tags=["Health"], dependencies=[Depends(get_api_key)])
+async def message_queue_metrics():
+    """
+    Queue depth, wait time and throughput of the inbound message dispatcher,
+    how many messages were merged by the coalescing window and the state of
+    the durable webhook queue, and the message stats still waiting to be flushed.
+    """
+    return {
+        **message_dispatcher.metrics(),
+        "coalescing": message_coalescer.metrics(),
+        "webhook_queue": await webhook_workers.metrics(),
+        "message_stats": message_stats_aggregator.metrics(),
+    }
+
+@app.get("/metrics/agents", tags=["Health"], dependencies=[Depends(get_api_key)])
+async def agent_metrics():
+    """Routing, caching, model and token usage metrics of the agents."""
+    return {
+        "intent_fast_path": intent_fast_path.metrics(),
+        "agent_registry": agent_registry.metrics(),
+        "model_cascade": cascade_metrics(),
+        "semantic_answer_cache": semantic_answer_cache.metrics(),
+        "prompt_usage": usage_metrics(),
+        "conversation_memory": conversation_memory.metrics(),
+        "openai_clients": openai_client_pool.metrics(),
+    }
+
+@app.on_event("startup")
+async def startup_event():
+    """Warm up shared connections and start draining the durable webhook queue."""
+    await boost_mcp_pool.warm_up()
+    try:
+        await vector_store_registry.refresh()
+    except Exception as e:
+        Logger.error(f"Failed to load vector store IDs at startup: {e}")
+    await persona_cache.start()
+    await semantic_answer_cache.start()
+    await message_stats_aggregator.start()
+    await webhook_workers.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Finish queued messages, then release pooled database connections on shutdown."""
+    message_coalescer.flush_all()
+    await webhook_workers.stop()
+    await message_dispatcher.shutdown()
+    await message_stats_aggregator.stop()
+    await boost_mcp_pool.stop()
+    await persona_cache.stop()
+    await semantic_answer_cache.stop()
+    await openai_client_pool.close()
+    await repositories.close()
+
 # Include routers
 app.include_router(callback, tags=["Callback"])
 app.include_router(chat_router, dependencies=[Depends(get_api_key)])
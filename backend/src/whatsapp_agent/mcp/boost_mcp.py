@@ -1,54 +1,306 @@
-from agents.mcp import MCPServerStreamableHttp, create_static_tool_filter
+import asyncio
+import itertools
+from typing import Any, List, Optional
+from agents.mcp import MCPServer, MCPServerStreamableHttp
+from mcp import Tool as MCPTool
+from mcp.types import CallToolResult, GetPromptResult, ListPromptsResult
 from whatsapp_agent._debug import Logger
-from typing import List
 
 from whatsapp_agent.utils.config import Config
 
+DEFAULT_POOL_SIZE = 1
+DEFAULT_HEALTH_CHECK_SECONDS = 60
 
-async def get_boost_mcp_server(allowed_tool_names: List[str] | None = None, blocked_tool_names: List[str] | None = None):
-    SHOPIFY_STORE_URL = Config.get("SHOPIFY_SHOP_DOMAIN")
+
+def _config_int(key: str, default: int) -> int:
     try:
-        boost_shopify_mcp = MCPServerStreamableHttp(
+        return max(1, int(Config.get(key, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+class _MCPConnection:
+    """
+    One long-lived MCP session.
+    The session is opened and closed by a dedicated owner task, because the MCP client's
+    anyio task groups must be exited from the task that entered them.
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.server: Optional[MCPServerStreamableHttp] = None
+        self.generation = 0
+        self.reconnect_lock = asyncio.Lock()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.server is not None and self.server.session is not None
+
+    async def open(self, url: str):
+        self._stop = asyncio.Event()
+        self.generation += 1
+        connected = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._own(url, connected))
+        await connected
+
+    async def _own(self, url: str, connected: asyncio.Future):
+        server = MCPServerStreamableHttp(
             name="Boost MCP Server",
             params={
-                "url": f"https://{SHOPIFY_STORE_URL}/api/mcp",
+                "url": url,
                 "terminate_on_close": True,
                 "timeout": 20,
             },
             cache_tools_list=True,
-            tool_filter=create_static_tool_filter(allowed_tool_names, blocked_tool_names)
         )
-        await boost_shopify_mcp.connect()
-        Logger.info(f"Successfully connected to {SHOPIFY_STORE_URL} MCP Server")
+        try:
+            await server.connect()
+            self.server = server
+            connected.set_result(None)
+            await self._stop.wait()
+        except Exception as e:
+            if not connected.done():
+                connected.set_exception(e)
+        finally:
+            self.server = None
+            try:
+                await server.cleanup()
+            except Exception as cleanup_error:
+                Logger.error(f"{__name__}: _own -> Error closing MCP connection {self.index}: {cleanup_error}")
 
-        # Test if tools are working
-        if not await _test_mcp_tools(boost_shopify_mcp):
-            Logger.warning("Problem in MCP tools, but connection is established")
+    async def close(self):
+        self._stop.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
 
-        return boost_shopify_mcp
 
-    except Exception as e:
-        Logger.error(f"{__name__}: get_boost_mcp_server -> Failed to connect to MCP server: {e}")
-        if boost_shopify_mcp:
+class BoostMCPPool:
+    """
+    Shared, long-lived connections to the Shopify MCP server.
+
+    Connections are opened at startup (MCP_POOL_SIZE, default 1; one MCP session already
+    multiplexes concurrent calls), pinged every MCP_HEALTH_CHECK_SECONDS and reopened when
+    they fail or when the shop domain changes. The tool list is fetched once and filtered
+    locally for each agent, so no MCP round trip happens while building an agent.
+    """
+
+    def __init__(self):
+        self._connections: List[_MCPConnection] = []
+        self._tools: Optional[List[MCPTool]] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._round_robin = itertools.count()
+        # URL the current connections were opened with
+        self._connected_url: Optional[str] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @staticmethod
+    def _url() -> str:
+        return f"https://{Config.get('SHOPIFY_SHOP_DOMAIN')}/api/mcp"
+
+    @property
+    def started(self) -> bool:
+        return bool(self._connections)
+
+    def url_changed(self) -> bool:
+        """True when the configured MCP URL differs from the one the pool is connected to."""
+        return self._connected_url != self._url()
+
+    async def start(self):
+        """Open the connections, cache the tool list and start the health check."""
+        async with self._get_lock():
+            if self.started:
+                return
+            await self._open_all()
+        self._start_health_check()
+
+    def _start_health_check(self):
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def warm_up(self):
+        """Connect at application startup; if that fails the health check keeps retrying."""
+        try:
+            await self.start()
+        except Exception as e:
+            Logger.error(f"{__name__}: warm_up -> MCP server not reachable at startup: {e}")
+        self._start_health_check()
+
+    async def _open_all(self):
+        url = self._url()
+        connections = [_MCPConnection(i) for i in range(_config_int("MCP_POOL_SIZE", DEFAULT_POOL_SIZE))]
+        results = await asyncio.gather(*(c.open(url) for c in connections), return_exceptions=True)
+        opened = [c for c, result in zip(connections, results) if not isinstance(result, Exception)]
+        if not opened:
+            raise ConnectionError(f"Failed to connect to MCP server at {url}: {results[0]}")
+
+        self._connections = connections
+        self._connected_url = url
+        self._tools = await opened[0].server.list_tools()
+        Logger.info(f"Connected {len(opened)}/{len(connections)} MCP connections to {url}")
+        Logger.info(f"Tool Names: {[t.name for t in self._tools]}")
+        if not self._tools:
+            Logger.warning("No tools available from MCP server")
+
+    async def _reopen(self, connection: _MCPConnection):
+        generation = connection.generation
+        async with connection.reconnect_lock:
+            if connection.generation != generation and connection.healthy:
+                # Someone else already reconnected it while we waited
+                return
+            await connection.close()
             try:
-                await boost_shopify_mcp.cleanup()
-                Logger.info("MCP server cleaned up after connection failure")
-            except Exception as cleanup_error:
-                Logger.error(f"{__name__}: get_boost_mcp_server -> Error during cleanup after connection failure: {cleanup_error}")
-        raise  # Re-raise the exception to be handled by caller
+                await connection.open(self._url())
+                Logger.info(f"Reconnected MCP connection {connection.index}")
+            except Exception as e:
+                Logger.error(f"{__name__}: _reopen -> Failed to reconnect MCP connection {connection.index}: {e}")
+
+    async def restart(self):
+        """Close every connection and reconnect (used when the shop domain changes)."""
+        async with self._get_lock():
+            connections, self._connections = self._connections, []
+            await asyncio.gather(*(c.close() for c in connections))
+            self._tools = None
+            await self._open_all()
 
+    async def stop(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        connections, self._connections = self._connections, []
+        await asyncio.gather(*(c.close() for c in connections))
+        self._tools = None
+        self._connected_url = None
 
-async def _test_mcp_tools(mcp_server:MCPServerStreamableHttp):
-    """Test if MCP is working properly"""
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(_config_int("MCP_HEALTH_CHECK_SECONDS", DEFAULT_HEALTH_CHECK_SECONDS))
+            try:
+                if not self.started:
+                    await self.start()
+                    continue
+                for connection in list(self._connections):
+                    try:
+                        if not connection.healthy:
+                            raise ConnectionError("session closed")
+                        await asyncio.wait_for(connection.server.session.send_ping(), timeout=10)
+                    except Exception as e:
+                        Logger.warning(f"MCP connection {connection.index} failed health check: {e}")
+                        await self._reopen(connection)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                Logger.error(f"{__name__}: _health_loop -> MCP health check error: {e}")
+
+    async def _acquire(self) -> _MCPConnection:
+        if not self.started:
+            await self.start()
+        healthy = [c for c in self._connections if c.healthy]
+        if not healthy:
+            # Every connection dropped; reconnect one in line with the request
+            connection = self._connections[0]
+            await self._reopen(connection)
+            if not connection.healthy:
+                raise ConnectionError("No healthy MCP connection available")
+            return connection
+        return healthy[next(self._round_robin) % len(healthy)]
+
+    async def list_tools(self) -> List[MCPTool]:
+        if self._tools is None:
+            await self.start()
+        return self._tools or []
+
+    async def call_tool(self, tool_name: str, arguments: dict[str, Any] | None) -> CallToolResult:
+        connection = await self._acquire()
+        try:
+            return await connection.server.call_tool(tool_name, arguments)
+        except Exception as e:
+            # Tool errors come back as results; an exception means the session broke
+            Logger.warning(f"MCP call '{tool_name}' failed on connection {connection.index}, retrying: {e}")
+            await self._reopen(connection)
+            connection = await self._acquire()
+            return await connection.server.call_tool(tool_name, arguments)
+
+    async def list_prompts(self) -> ListPromptsResult:
+        connection = await self._acquire()
+        return await connection.server.list_prompts()
+
+    async def get_prompt(self, name: str, arguments: dict[str, Any] | None = None) -> GetPromptResult:
+        connection = await self._acquire()
+        return await connection.server.get_prompt(name, arguments)
+
+
+class FilteredMCPServer(MCPServer):
+    """
+    Per-agent view of the shared pool with its own allow/block list.
+    connect() and cleanup() are no-ops: the pool owns the connections.
+    """
+
+    def __init__(self, pool: BoostMCPPool, allowed_tool_names: List[str] | None = None, blocked_tool_names: List[str] | None = None):
+        super().__init__()
+        self._pool = pool
+        self._allowed = set(allowed_tool_names) if allowed_tool_names is not None else None
+        self._blocked = set(blocked_tool_names or [])
+
+    @property
+    def name(self) -> str:
+        return "Boost MCP Server"
+
+    async def connect(self):
+        pass
+
+    async def cleanup(self):
+        pass
+
+    async def list_tools(self, run_context=None, agent=None) -> List[MCPTool]:
+        tools = await self._pool.list_tools()
+        return [
+            tool for tool in tools
+            if (self._allowed is None or tool.name in self._allowed) and tool.name not in self._blocked
+        ]
+
+    async def call_tool(self, tool_name: str, arguments: dict[str, Any] | None) -> CallToolResult:
+        return await self._pool.call_tool(tool_name, arguments)
+
+    async def list_prompts(self) -> ListPromptsResult:
+        return await self._pool.list_prompts()
+
+    async def get_prompt(self, name: str, arguments: dict[str, Any] | None = None) -> GetPromptResult:
+        return await self._pool.get_prompt(name, arguments)
+
+
+boost_mcp_pool = BoostMCPPool()
+
+
+def _on_mcp_config_change(new_version: int):
+    """
+    Reconnect the running pool when the shop domain changed. Other config changes
+    (API keys, poll intervals, ...) leave the open MCP sessions alone.
+    """
+    if not boost_mcp_pool.started or not boost_mcp_pool.url_changed():
+        return
     try:
-        tools = await mcp_server.list_tools()
-        Logger.info(f"Available MCP tools: {len(tools) if tools else 0}")
-        Logger.info(f"Tool Names: {[t.name for t in tools]}")
-        if tools:
-            return True
-        else:
-            Logger.warning("No tools available from MCP server")
-            return False
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    Logger.info(f"Config changed to version {new_version}: reconnecting MCP pool")
+    loop.create_task(boost_mcp_pool.restart())
+
+Config.add_listener(_on_mcp_config_change)
+
+
+async def get_boost_mcp_server(allowed_tool_names: List[str] | None = None, blocked_tool_names: List[str] | None = None):
+    """Return a filtered view of the shared MCP connection pool, connecting it on first use."""
+    try:
+        await boost_mcp_pool.start()
     except Exception as e:
-        Logger.error(f"{__name__}: _test_mcp_tools -> Error testing MCP: {e}")
-        return False
+        Logger.error(f"{__name__}: get_boost_mcp_server -> Failed to connect to MCP server: {e}")
+        raise  # Re-raise the exception to be handled by caller
+    return FilteredMCPServer(boost_mcp_pool, allowed_tool_names, blocked_tool_names)
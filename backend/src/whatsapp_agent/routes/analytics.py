@@ -1,14 +1,17 @@
+import asyncio
 import datetime
+import time
 from math import ceil
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from typing import Dict, List, Any
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 from whatsapp_agent.database.customer import CustomerDataBase
 from whatsapp_agent.database.referral import ReferralDataBase
 from whatsapp_agent.database.message_stats import MessageStatsDatabase
 from whatsapp_agent.database.escalation_stats import EscalationStatsDatabase
 from whatsapp_agent.utils.current_time import _get_current_karachi_time
+from whatsapp_agent.utils.config import Config
 from whatsapp_agent._debug import Logger
 
 analytics_router = APIRouter(prefix="/analytics",tags=["analytics"])
@@ -94,91 +97,112 @@ customer_db = CustomerDataBase()
 message_stats = MessageStatsDatabase()
 escalation_stats = EscalationStatsDatabase()
 
+HIGH_VALUE_SPEND = 10000
+DEFAULT_CACHE_SECONDS = 30
+
+# Dashboard responses are shared for a short TTL; each key is computed by one request at a time
+_analytics_cache: Dict[Tuple, Tuple[float, Any]] = {}
+_analytics_locks: Dict[Tuple, asyncio.Lock] = {}
+
+
+def _cache_seconds() -> float:
+    try:
+        return float(Config.get("ANALYTICS_CACHE_SECONDS", DEFAULT_CACHE_SECONDS))
+    except (TypeError, ValueError):
+        return DEFAULT_CACHE_SECONDS
+
+
+async def _cached(key: Tuple, load: Callable[[], Awaitable[Any]]) -> Any:
+    """Return the cached value of `key`, or compute it with `load` when missing or expired."""
+    ttl = _cache_seconds()
+    entry = _analytics_cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+
+    lock = _analytics_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        entry = _analytics_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        value = await load()
+        now = time.monotonic()
+        # Date-filtered requests create many keys; drop the expired ones
+        for stale in [k for k, (expires, _) in _analytics_cache.items() if expires <= now]:
+            del _analytics_cache[stale]
+            if stale != key and not _analytics_locks[stale].locked():
+                del _analytics_locks[stale]
+        if ttl > 0:
+            _analytics_cache[key] = (now + ttl, value)
+        return value
+
+
+async def _customer_analytics() -> Dict[str, Any]:
+    return await _cached(
+        ("customer_analytics",),
+        lambda: asyncio.to_thread(customer_db.get_customer_analytics, HIGH_VALUE_SPEND),
+    )
+
+
+async def _build_analytics_overview() -> AnalyticsOverviewResponse:
+    # Get message and escalation analytics (last 30 days by default)
+    current_date = _get_current_karachi_time().date()
+    start_date = str(current_date - datetime.timedelta(days=30))
+
+    customer_analytics, stats_data, escalation_data = await asyncio.gather(
+        _customer_analytics(),
+        asyncio.to_thread(message_stats.get_stats_in_range, start_date=start_date),
+        asyncio.to_thread(escalation_stats.get_stats_in_range, start_date=start_date),
+    )
+
+    total_customers = customer_analytics.get("total", 0)
+    if not total_customers:
+        Logger.warning("No customers found in the database")
+    Logger.info(f"Processing analytics for {total_customers} customers")
+
+    customer_stats = CustomerStatsResponse(
+        total_customers=total_customers,
+        active_customers=customer_analytics.get("active", 0),
+        escalated_customers=customer_analytics.get("escalated", 0),
+        b2b_customers=customer_analytics.get("b2b", 0),
+        d2c_customers=customer_analytics.get("d2c", 0),
+        avg_total_spend=round(customer_analytics.get("total_spend", 0) / total_customers if total_customers > 0 else 0, 2)
+    )
+
+    if not stats_data:
+        Logger.warning(f"No message stats found for date range starting {start_date}")
+        stats_data = []
+
+    # Create message stats response with enhanced metrics
+    message_stats_response = MessageStatsResponse.from_summary(
+        total_customers,
+        {},  # Empty dict as we're not using this parameter anymore
+        stats_data
+    )
+
+    if not escalation_data:
+        Logger.warning(f"No escalation stats found for date range starting {start_date}")
+        escalation_data = []
+
+    # Create escalation stats response
+    escalation_stats_response = EscalationStatsResponse.from_summary(escalation_data)
+
+    return AnalyticsOverviewResponse(
+        customer_stats=customer_stats,
+        message_stats=message_stats_response,
+        escalation_stats=escalation_stats_response,
+        top_customers_by_spend=customer_analytics.get("top_customers", [])
+    )
+
+
 @analytics_router.get("/overview")
 async def get_analytics_overview():
     """Get comprehensive analytics overview including customer stats, message stats, and engagement metrics.
     
     Message stats are for the last 30 days by default. This provides a consistent and relevant
-    window for analysis while maintaining good performance."""
+    window for analysis while maintaining good performance. Customer figures are aggregated
+    in the database and the response is cached for ANALYTICS_CACHE_SECONDS."""
     try:
-        # Get total customer count first for validation
-        total_customers = customer_db.count_customers()
-        
-        # Get all customers for accurate analytics
-        customers = customer_db.list_customers()  # No limit = fetch all
-        if not customers:
-            Logger.warning("No customers found in the database")
-            customers = []
-            total_customers = 0
-        
-        Logger.info(f"Processing analytics for {len(customers)} customers")
-        
-        # Basic customer metrics
-        active_customers = sum(1 for c in customers if c.get("is_active", False))
-        escalated_customers = sum(1 for c in customers if c.get("escalation_status", False))
-        b2b_customers = sum(1 for c in customers if c.get("customer_type") == "B2B")
-        d2c_customers = sum(1 for c in customers if c.get("customer_type") == "D2C")
-        
-        # Financial metrics
-        total_spend = sum(c.get("total_spend", 0) or 0 for c in customers)
-        avg_total_spend = total_spend / total_customers if total_customers > 0 else 0
-        high_value_customers = sum(1 for c in customers if (c.get("total_spend", 0) or 0) > 10000)
-        
-        # Top customers by spend with more details
-        top_customers = sorted([
-            {
-                "phone_number": c.get("phone_number"),
-                "name": c.get("customer_name"),
-                "company": c.get("company_name"),
-                "customer_type": c.get("customer_type"),
-                "spend": c.get("total_spend", 0) or 0,
-                "is_active": c.get("is_active", False),
-                "escalation_status": c.get("escalation_status", False)
-            } 
-            for c in customers
-            if c.get("total_spend", 0) or 0 > 0  # Only include customers with some spend
-        ], key=lambda x: x["spend"], reverse=True)[:5]
-        
-        customer_stats = CustomerStatsResponse(
-            total_customers=total_customers,
-            active_customers=active_customers,
-            escalated_customers=escalated_customers,
-            b2b_customers=b2b_customers,
-            d2c_customers=d2c_customers,
-            avg_total_spend=round(avg_total_spend, 2)
-        )
-        
-        # Get message analytics (last 30 days by default)
-        current_date = _get_current_karachi_time().date()
-        start_date = str(current_date - datetime.timedelta(days=30))
-        stats_data = message_stats.get_stats_in_range(start_date=start_date)
-        
-        if not stats_data:
-            Logger.warning(f"No message stats found for date range starting {start_date}")
-            stats_data = []
-            
-        # Create message stats response with enhanced metrics
-        message_stats_response = MessageStatsResponse.from_summary(
-            total_customers,
-            {},  # Empty dict as we're not using this parameter anymore
-            stats_data
-        )
-        
-        # Get escalation analytics (last 30 days)
-        escalation_data = escalation_stats.get_stats_in_range(start_date=start_date)
-        if not escalation_data:
-            Logger.warning(f"No escalation stats found for date range starting {start_date}")
-            escalation_data = []
-        
-        # Create escalation stats response
-        escalation_stats_response = EscalationStatsResponse.from_summary(escalation_data)
-        
-        return AnalyticsOverviewResponse(
-            customer_stats=customer_stats,
-            message_stats=message_stats_response,
-            escalation_stats=escalation_stats_response,
-            top_customers_by_spend=top_customers
-        )
+        return await _cached(("overview",), _build_analytics_overview)
         
     except Exception as e:
         Logger.error(f"Failed to generate analytics overview: {str(e)}")
@@ -186,29 +210,28 @@ async def get_analytics_overview():
             status_code=500,
             detail=f"Failed to generate analytics overview: {str(e)}"
         )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to generate analytics: {str(e)}")
 
 @analytics_router.get("/customers/stats")
 async def get_customers_stats():
     """Get detailed customer statistics."""
     try:
-        customers = customer_db.list_customers()
+        customers = await _customer_analytics()
+        total = customers.get("total", 0)
+        total_spend = customers.get("total_spend", 0)
         
         stats = {
-            "total": len(customers),
-            "active": sum(1 for c in customers if c.get("is_active", False)),
-            "inactive": sum(1 for c in customers if not c.get("is_active", False)),
-            "escalated": sum(1 for c in customers if c.get("escalation_status", False)),
+            "total": total,
+            "active": customers.get("active", 0),
+            "inactive": total - customers.get("active", 0),
+            "escalated": customers.get("escalated", 0),
             "by_type": {
-                "B2B": sum(1 for c in customers if c.get("customer_type") == "B2B"),
-                "D2C": sum(1 for c in customers if c.get("customer_type") == "D2C")
+                "B2B": customers.get("b2b", 0),
+                "D2C": customers.get("d2c", 0)
             },
             "spend_analysis": {
-                "total_spend": sum(c.get("total_spend", 0) or 0 for c in customers),
-                "avg_spend": sum(c.get("total_spend", 0) or 0 for c in customers) / len(customers) if customers else 0,
-                "high_value_customers": sum(1 for c in customers if (c.get("total_spend", 0) or 0) > 10000)
+                "total_spend": total_spend,
+                "avg_spend": total_spend / total if total else 0,
+                "high_value_customers": customers.get("high_value", 0)
             }
         }
         
@@ -217,49 +240,59 @@ async def get_customers_stats():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate customer stats: {str(e)}")
 
+
+async def _build_escalation_stats(start_date: Optional[str], end_date: Optional[str]) -> Dict[str, Any]:
+    # Get current customer escalation status
+    customers, escalated, stats_data = await asyncio.gather(
+        _customer_analytics(),
+        asyncio.to_thread(customer_db.list_escalated_customers),
+        asyncio.to_thread(escalation_stats.get_stats_in_range, start_date, end_date),
+    )
+    total = customers.get("total", 0)
+
+    current_stats = {
+        "current_total_escalations": len(escalated),
+        "current_escalation_rate": round(len(escalated) / total * 100 if total else 0, 2),
+        "current_escalated_by_type": {
+            "B2B": sum(1 for c in escalated if c.get("customer_type") == "B2B"),
+            "D2C": sum(1 for c in escalated if c.get("customer_type") == "D2C")
+        },
+        "escalated_customers": [
+            {
+                "phone_number": c.get("phone_number"), 
+                "customer_name": c.get("customer_name"),
+                "customer_type": c.get("customer_type"),
+                "total_spend": c.get("total_spend", 0) or 0,
+                "company_name": c.get("company_name")
+            }
+            for c in escalated
+        ]
+    }
+    
+    # Get historical escalation stats
+    if not stats_data:
+        Logger.warning(f"No historical escalation stats found for the specified date range")
+        stats_data = []
+        
+    historical_stats = EscalationStatsResponse.from_summary(stats_data)
+    
+    return {
+        **current_stats,
+        "historical_stats": {
+            **historical_stats.dict(),
+            "daily_breakdown": stats_data
+        }
+    }
+
 @analytics_router.get("/escalations")
 async def get_escalation_stats(start_date: str = None, end_date: str = None):
     """Get comprehensive escalation analytics including both current status and historical stats.
     If no dates are specified for historical stats, returns stats for the last 30 days."""
     try:
-        # Get current customer escalation status
-        customers = customer_db.list_customers()
-        escalated = [c for c in customers if c.get("escalation_status", False)]
-        
-        current_stats = {
-            "current_total_escalations": len(escalated),
-            "current_escalation_rate": round(len(escalated) / len(customers) * 100 if customers else 0, 2),
-            "current_escalated_by_type": {
-                "B2B": sum(1 for c in escalated if c.get("customer_type") == "B2B"),
-                "D2C": sum(1 for c in escalated if c.get("customer_type") == "D2C")
-            },
-            "escalated_customers": [
-                {
-                    "phone_number": c.get("phone_number"), 
-                    "customer_name": c.get("customer_name"),
-                    "customer_type": c.get("customer_type"),
-                    "total_spend": c.get("total_spend", 0) or 0,
-                    "company_name": c.get("company_name")
-                }
-                for c in escalated
-            ]
-        }
-        
-        # Get historical escalation stats
-        stats_data = escalation_stats.get_stats_in_range(start_date, end_date)
-        if not stats_data:
-            Logger.warning(f"No historical escalation stats found for the specified date range")
-            stats_data = []
-            
-        historical_stats = EscalationStatsResponse.from_summary(stats_data)
-        
-        return {
-            **current_stats,
-            "historical_stats": {
-                **historical_stats.dict(),
-                "daily_breakdown": stats_data
-            }
-        }
+        return await _cached(
+            ("escalations", start_date, end_date),
+            lambda: _build_escalation_stats(start_date, end_date),
+        )
         
     except Exception as e:
         Logger.error(f"Failed to get escalation stats: {str(e)}")
@@ -324,6 +357,7 @@ async def get_campaign_leaderboard(
     """
     Get the paginated leaderboard for a specific campaign.
     Returns top referrers sorted by their points for the given campaign.
+    Pages are read from the campaign_leaderboard table, which is updated on every awarded point.
     
     Parameters:
     - campaign_code: The campaign ID to get leaderboard for
@@ -332,35 +366,9 @@ async def get_campaign_leaderboard(
     """
     try:
         referral_db = ReferralDataBase()
-        # Get all referrals from the database
-        response = referral_db.supabase.table("referrals").select("*").execute()
-        referrals = response.data
-
-        # Process referrals to create leaderboard entries
-        leaderboard_entries = []
-        for referral in referrals:
-            # Find points for the specific campaign
-            campaign_points = 0
-            for points in referral.get('total_points', []):
-                if points.get('campaign_id') == campaign_code:
-                    campaign_points = points.get('points', 0)
-                    break
-            
-            # Only include users who have points in this campaign
-            if campaign_points > 0:
-                leaderboard_entries.append({
-                    "referrer_name": referral.get('referrer_name', 'Anonymous'),
-                    "referrer_phone": referral.get('referrer_phone', ''),
-                    "points": campaign_points,
-                    "total_referrals": len([user for user in referral.get('referred_users', []) 
-                                         if user.get('campaign_id') == campaign_code])
-                })
-
-        # Sort entries by points in descending order
-        leaderboard_entries.sort(key=lambda x: x['points'], reverse=True)
-
-        # Calculate total entries and pagination metadata
-        total_entries = len(leaderboard_entries)
+        paginated_entries, total_entries = await asyncio.to_thread(
+            referral_db.get_leaderboard_page, campaign_code, page_size, (page - 1) * page_size
+        )
         total_pages = ceil(total_entries / page_size)
         
         # Validate page number
@@ -370,17 +378,6 @@ async def get_campaign_leaderboard(
                 detail=f"Page {page} does not exist. Total pages: {total_pages}"
             )
 
-        # Calculate slice indices for pagination
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-
-        # Get paginated entries
-        paginated_entries = leaderboard_entries[start_idx:end_idx]
-
-        # Add rank to each entry (rank is global, not just for current page)
-        for entry in paginated_entries:
-            entry['rank'] = leaderboard_entries.index(entry) + 1
-
         return {
             "campaign_id": campaign_code,
             "pagination": {
@@ -392,9 +389,36 @@ async def get_campaign_leaderboard(
             "leaderboard": paginated_entries
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         Logger.error(f"Error getting leaderboard for campaign {campaign_code}: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to get leaderboard: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@analytics_router.get("/leaderboard/{campaign_code}/rank/{phone_number}")
+async def get_campaign_leaderboard_rank(campaign_code: str, phone_number: str):
+    """
+    Get one referrer's leaderboard entry and global rank for a campaign.
+    Returns 404 when the referrer has no points in the campaign.
+    """
+    try:
+        referral_db = ReferralDataBase()
+        entry = await asyncio.to_thread(referral_db.get_leaderboard_rank, campaign_code, phone_number)
+        if not entry:
+            raise HTTPException(
+                status_code=404,
+                detail=f"{phone_number} has no points in campaign {campaign_code}"
+            )
+        return {"campaign_id": campaign_code, **entry}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        Logger.error(f"Error getting leaderboard rank of {phone_number} for campaign {campaign_code}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get leaderboard rank: {str(e)}"
+        )
@@ -75,7 +75,7 @@ Boost - Up Your Lifestyle"""
     )
 
     # Save the message to chat history
-    WhatsappBot._save_agent_message(phone_number, template_message)
+    await WhatsappBot._save_agent_message(phone_number, template_message)
 
 
 @broadcast_router.post("/broadcasts")
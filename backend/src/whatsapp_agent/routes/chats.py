@@ -1,12 +1,15 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Query, Path, UploadFile, File, Form, Body
 from pydantic import BaseModel, Field
 from typing import List, Literal, Optional
-from datetime import datetime, timezone
+from datetime import datetime
 import math
 import os
 import tempfile
 
 from whatsapp_agent.database.chat_history import ChatHistoryDataBase
+from whatsapp_agent.database.repositories import repositories
+from whatsapp_agent.database.chat_conversation import ChatConversationDataBase
 from whatsapp_agent.database.customer import CustomerDataBase
 from whatsapp_agent.schema.chat_history import MessageSchema
 from whatsapp_agent.schema.customer_schema import CustomerSchema
@@ -62,6 +65,18 @@ class ChatMessagesResponse(BaseModel):
     pagination: dict
     total_messages: int
 
+class CursorMessage(MessageSchema):
+    seq: int
+
+class ChatMessagesCursorResponse(BaseModel):
+    phone_number: str
+    messages: List[CursorMessage]
+    next_cursor: Optional[int] = None
+    prev_cursor: Optional[int] = None
+    has_older: bool
+    has_newer: bool
+    total_messages: Optional[int] = None
+
 class SendMessageResponse(BaseModel):
     success: bool
     message: str
@@ -72,6 +87,8 @@ class CustomerWithLastMessage(CustomerSchema):
     last_message_time: Optional[datetime] = None
     last_message_sender: Optional[Literal["customer", "agent", "representative"]] = None
     last_message_type: Optional[Literal["audio", "text", "image", "document", "video"]] = None
+    message_count: int = 0
+    unread_count: int = 0
 
 class PhoneNumbersResponse(BaseModel):
     customers: List[CustomerWithLastMessage]
@@ -85,6 +102,7 @@ class PhoneNumbersResponse(BaseModel):
 
 
 chat_db = ChatHistoryDataBase()
+conversation_db = ChatConversationDataBase()
 customer_db = CustomerDataBase()
 storage_manager = SupabaseStorageManager()
 
@@ -129,333 +147,59 @@ async def list_chat_phone_numbers(
                 detail="min_spend cannot be greater than max_spend"
             )
         
-        # We must get chats first, then join with customers
-        if sort_by in ["updated_at", "last_message_time"]:
-            # Get all chats sorted by updated_at
-            chats_query = (
-                chat_db.supabase
-                .table(chat_db.TABLE_NAME)
-                .select("phone_number, messages, updated_at")
-                .order("updated_at", desc=(sort_order == "desc"))
-            )
-            
-            all_chats_response = chats_query.execute()
-            all_chats = all_chats_response.data or []
-            
-            # Extract all phone numbers from chats
-            chat_phone_numbers = [chat["phone_number"] for chat in all_chats if chat.get("phone_number")]
-            
-            if not chat_phone_numbers:
-                return PhoneNumbersResponse(
-                    customers=[],
-                    total=0,
-                    total_escalated=0,
-                    page=page,
-                    limit=limit,
-                    total_pages=0,
-                    has_next=False,
-                    has_previous=False
-                )
-            
-            # Build customer query with filters
-            customer_query = customer_db.supabase.table(customer_db.TABLE_NAME).select("*")
-            
-            # Filter customers who have chats
-            customer_query = customer_query.in_("phone_number", chat_phone_numbers)
-            
-            # Apply search filter
-            if search:
-                search_trimmed = search.strip()
-                if search_trimmed:
-                    search_pattern = f"%{search_trimmed}%"
-                    customer_query = customer_query.or_(
-                        f"phone_number.ilike.{search_pattern},"
-                        f"customer_name.ilike.{search_pattern},"
-                        f"email.ilike.{search_pattern},"
-                        f"company_name.ilike.{search_pattern}"
-                    )
-            
-            # Apply customer type filter
-            if customer_type:
-                customer_query = customer_query.eq("customer_type", customer_type)
-            
-            # Apply escalation status filter
-            if escalation_status is not None:
-                customer_query = customer_query.eq("escalation_status", escalation_status)
-            
-            # Apply active status filter
-            if is_active is not None:
-                customer_query = customer_query.eq("is_active", is_active)
-            
-            # Apply spend range filters
-            if min_spend is not None:
-                customer_query = customer_query.gte("total_spend", min_spend)
-            
-            if max_spend is not None:
-                customer_query = customer_query.lte("total_spend", max_spend)
-            
-            # Apply tags filter
-            if tags:
-                tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
-                if tag_list:
-                    customer_query = customer_query.overlaps("tags", tag_list)
-            
-            # Get all matching customers
-            customers_response = customer_query.execute()
-            customers_data = customers_response.data or []
-            
-            # Create lookup for customers
-            customers_lookup = {c["phone_number"]: c for c in customers_data}
-            
-            # Create lookup for chats
-            chats_lookup = {chat["phone_number"]: chat for chat in all_chats}
-            
-            # Build customer list in chat sort order
-            all_matched_customers = []
-            for chat in all_chats:
-                phone_number = chat["phone_number"]
-                customer_data = customers_lookup.get(phone_number)
-                
-                if not customer_data:
-                    continue
-                
-                messages = chat.get("messages", [])
-                if not messages:
-                    continue
-                
-                last_message = messages[-1]
-                
-                customer_with_message = CustomerWithLastMessage(
-                    **customer_data,
-                    last_message=last_message.get("content") if last_message else None,
-                    last_message_time=last_message.get("time_stamp") if last_message else None,
-                    last_message_sender=last_message.get("sender") if last_message else None,
-                    last_message_type=last_message.get("message_type") if last_message else None
-                )
-                all_matched_customers.append(customer_with_message)
-            
-            # If sorting by last_message_time, re-sort
-            if sort_by == "last_message_time":
-                def get_sort_key(customer):
-                    # If no last message time, use min datetime with UTC timezone
-                    if not customer.last_message_time:
-                        return datetime.min.replace(tzinfo=timezone.utc)
-                    
-                    # If last message time has no timezone, assume UTC
-                    if customer.last_message_time.tzinfo is None:
-                        return customer.last_message_time.replace(tzinfo=timezone.utc)
-                    
-                    return customer.last_message_time
-
-                all_matched_customers.sort(
-                    key=get_sort_key,
-                    reverse=(sort_order == "desc")
-                )
-            
-            # Calculate total and pagination
-            total_customers = len(all_matched_customers)
-            total_pages = math.ceil(total_customers / limit) if total_customers > 0 else 0
-            
-            # Validate page number
-            if page > total_pages and total_pages > 0:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Page {page} does not exist. Total pages: {total_pages}"
-                )
-            
-            # Apply pagination
-            start_index = (page - 1) * limit
-            end_index = start_index + limit
-            paginated_customers = all_matched_customers[start_index:end_index]
-            
-            # Calculate total escalated
-            total_escalated = sum(1 for c in all_matched_customers if c.escalation_status)
-            
-            return PhoneNumbersResponse(
-                customers=paginated_customers,
-                total=total_customers,
-                total_escalated=total_escalated,
-                page=page,
-                limit=limit,
-                total_pages=total_pages,
-                has_next=page < total_pages,
-                has_previous=page > 1
-            )
+        search_trimmed = search.strip() if search else None
+        tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()] if tags else []
+        filters = dict(
+            search=search_trimmed or None,
+            tags=tag_list or None,
+            customer_type=customer_type,
+            escalation_status=escalation_status,
+            is_active=is_active,
+            min_spend=min_spend,
+            max_spend=max_spend,
+        )
+        
+        # The page is an indexed top-N read; the totals of the filtered set are counted separately
+        offset = (page - 1) * limit
+        rows, (total_customers, total_escalated) = await asyncio.gather(
+            asyncio.to_thread(
+                conversation_db.list_conversations,
+                limit=limit, offset=offset, sort_by=sort_by, sort_order=sort_order, **filters
+            ),
+            asyncio.to_thread(conversation_db.count_conversations, **filters),
+        )
+        total_pages = math.ceil(total_customers / limit) if total_customers > 0 else 0
         
-        else:
-            # For other sorting (customer fields), use customer-first approach
-            # Build customer query with filters
-            customer_query = customer_db.supabase.table(customer_db.TABLE_NAME).select("*", count="exact")
-            
-            # Apply search filter
-            if search:
-                search_trimmed = search.strip()
-                if search_trimmed:
-                    search_pattern = f"%{search_trimmed}%"
-                    customer_query = customer_query.or_(
-                        f"phone_number.ilike.{search_pattern},"
-                        f"customer_name.ilike.{search_pattern},"
-                        f"email.ilike.{search_pattern},"
-                        f"company_name.ilike.{search_pattern}"
-                    )
-            
-            # Apply customer type filter
-            if customer_type:
-                customer_query = customer_query.eq("customer_type", customer_type)
-            
-            # Apply escalation status filter
-            if escalation_status is not None:
-                customer_query = customer_query.eq("escalation_status", escalation_status)
-            
-            # Apply active status filter
-            if is_active is not None:
-                customer_query = customer_query.eq("is_active", is_active)
-            
-            # Apply spend range filters
-            if min_spend is not None:
-                customer_query = customer_query.gte("total_spend", min_spend)
-            
-            if max_spend is not None:
-                customer_query = customer_query.lte("total_spend", max_spend)
-            
-            # Apply tags filter
-            if tags:
-                tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
-                if tag_list:
-                    customer_query = customer_query.overlaps("tags", tag_list)
-            
-            # Apply sorting at DB level
-            if sort_by == "customer_name":
-                customer_query = customer_query.order("customer_name", desc=(sort_order == "desc"))
-            elif sort_by == "total_spend":
-                customer_query = customer_query.order("total_spend", desc=(sort_order == "desc"))
-            elif sort_by == "phone_number":
-                customer_query = customer_query.order("phone_number", desc=(sort_order == "desc"))
-            
-            # Get total count before pagination
-            count_response = customer_query.execute()
-            total_customers = count_response.count or 0
-            
-            # Get total escalated customers count with the same filters
-            escalated_query = customer_db.supabase.table(customer_db.TABLE_NAME).select("*", count="exact")
-            
-            # Apply the same filters as main query
-            if search:
-                search_trimmed = search.strip()
-                if search_trimmed:
-                    search_pattern = f"%{search_trimmed}%"
-                    escalated_query = escalated_query.or_(
-                        f"phone_number.ilike.{search_pattern},"
-                        f"customer_name.ilike.{search_pattern},"
-                        f"email.ilike.{search_pattern},"
-                        f"company_name.ilike.{search_pattern}"
-                    )
-            
-            if customer_type:
-                escalated_query = escalated_query.eq("customer_type", customer_type)
-            
-            if escalation_status is not None:
-                escalated_query = escalated_query.eq("escalation_status", escalation_status)
-            
-            if is_active is not None:
-                escalated_query = escalated_query.eq("is_active", is_active)
-            
-            if min_spend is not None:
-                escalated_query = escalated_query.gte("total_spend", min_spend)
-            
-            if max_spend is not None:
-                escalated_query = escalated_query.lte("total_spend", max_spend)
-            
-            if tags:
-                tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
-                if tag_list:
-                    escalated_query = escalated_query.overlaps("tags", tag_list)
-            
-            # Add escalation filter
-            escalated_query = escalated_query.eq("escalation_status", True)
-            escalated_response = escalated_query.execute()
-            total_escalated = escalated_response.count or 0
-            
-            # Calculate pagination
-            total_pages = math.ceil(total_customers / limit) if total_customers > 0 else 0
-            
-            # Validate page number
-            if page > total_pages and total_pages > 0:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Page {page} does not exist. Total pages: {total_pages}"
-                )
-            
-            offset = (page - 1) * limit
-            
-            # Apply pagination to customer query
-            customer_query = customer_query.range(offset, offset + limit - 1)
-            
-            # Execute customer query
-            customers_response = customer_query.execute()
-            customers_data = customers_response.data or []
-            
-            if not customers_data:
-                return PhoneNumbersResponse(
-                    customers=[],
-                    total=total_customers,
-                    total_escalated=total_escalated,
-                    page=page,
-                    limit=limit,
-                    total_pages=total_pages,
-                    has_next=False,
-                    has_previous=page > 1
-                )
-            
-            # Extract phone numbers for chat lookup
-            phone_numbers = [customer["phone_number"] for customer in customers_data]
-            
-            # Batch fetch chat data for these customers
-            chats_response = (
-                chat_db.supabase
-                .table(chat_db.TABLE_NAME)
-                .select("phone_number, messages, updated_at")
-                .in_("phone_number", phone_numbers)
-                .execute()
+        # Validate page number
+        if page > total_pages and total_pages > 0:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Page {page} does not exist. Total pages: {total_pages}"
             )
-            
-            # Create a lookup dictionary for chats
-            chats_data = {chat["phone_number"]: chat for chat in chats_response.data or []}
-            
-            # Build response with customer and chat data
-            customers = []
-            for customer_data in customers_data:
-                phone_number = customer_data["phone_number"]
-                chat_data = chats_data.get(phone_number)
-                
-                # Skip if no chat data exists
-                if not chat_data or not chat_data.get("messages"):
-                    Logger.warning(f"Customer {phone_number} has no chat history, skipping")
-                    continue
-                
-                messages = chat_data.get("messages", [])
-                last_message = messages[-1] if messages else None
-                
-                # Create customer with last message info
-                customer_with_message = CustomerWithLastMessage(
-                    **customer_data,
-                    last_message=last_message.get("content") if last_message else None,
-                    last_message_time=last_message.get("time_stamp") if last_message else None,
-                    last_message_sender=last_message.get("sender") if last_message else None,
-                    last_message_type=last_message.get("message_type") if last_message else None
-                )
-                customers.append(customer_with_message)
-            
-            return PhoneNumbersResponse(
-                customers=customers,
-                total=total_customers,
-                total_escalated=total_escalated,
-                page=page,
-                limit=limit,
-                total_pages=total_pages,
-                has_next=page < total_pages,
-                has_previous=page > 1
+        
+        customers = [
+            CustomerWithLastMessage(
+                **row["customer"],
+                last_message=row.get("last_message"),
+                last_message_time=row.get("last_message_time"),
+                last_message_sender=row.get("last_message_sender"),
+                last_message_type=row.get("last_message_type"),
+                message_count=row.get("message_count") or 0,
+                unread_count=row.get("unread_count") or 0
             )
+            for row in rows
+        ]
+        
+        return PhoneNumbersResponse(
+            customers=customers,
+            total=total_customers,
+            total_escalated=total_escalated,
+            page=page,
+            limit=limit,
+            total_pages=total_pages,
+            has_next=page < total_pages,
+            has_previous=page > 1
+        )
         
     except HTTPException:
         raise
@@ -477,24 +221,15 @@ async def get_chat_messages(
     - **messages_count**: Number of messages per page (1-100)
     """
     try:
-        # Get chat data from database
-        chat_data = chat_db._get_chat_by_phone(phone_number)
+        # Get one page of messages (newest first) from the database
+        start_index = (page - 1) * messages_count
+        paginated_messages, total_messages = chat_db.get_messages_page(phone_number, start_index, messages_count)
         
-        if not chat_data or "messages" not in chat_data:
+        if total_messages == 0:
             raise HTTPException(status_code=404, detail="No chat history found for this phone number")
         
-        # Convert raw message data to MessageSchema objects
-        messages = [MessageSchema.model_validate(msg) for msg in chat_data["messages"]]
-        total_messages = len(messages)
-        
         # Calculate pagination
         total_pages = math.ceil(total_messages / messages_count)
-        start_index = (page - 1) * messages_count
-        end_index = start_index + messages_count
-        
-        # Get paginated messages (reverse order to show newest first)
-        reversed_messages = list(reversed(messages))
-        paginated_messages = reversed_messages[start_index:end_index]
         pagination_info = {
             "current_page": page,
             "total_pages": total_pages,
@@ -521,6 +256,78 @@ async def get_chat_messages(
             )
         raise HTTPException(status_code=500, detail=f"Internal server error: {error_msg}")
 
+@chat_router.get("/{phone_number}/messages")
+async def get_chat_messages_by_cursor(
+    phone_number: str = Path(..., description="Phone number to get messages for", example="923001234567"),
+    limit: int = Query(20, ge=1, le=100, description="Number of messages to return"),
+    before: Optional[int] = Query(None, ge=1, description="Return messages older than this cursor"),
+    after: Optional[int] = Query(None, ge=0, description="Return messages newer than this cursor"),
+    include_total: bool = Query(False, description="Also return the total message count")
+):
+    """
+    Get WhatsApp chat messages for a specific phone number with keyset (cursor) pagination.
+    Messages are returned newest first; each message carries its `seq` cursor.
+    
+    - **phone_number**: The phone number to retrieve messages for
+    - **limit**: Number of messages to return (1-100)
+    - **before**: Pass `next_cursor` here to load older messages
+    - **after**: Pass `prev_cursor` here to load newer messages
+    - **include_total**: Set to true to also count all messages (costs an extra count)
+    """
+    try:
+        if before is not None and after is not None:
+            raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both")
+
+        rows, has_more, total_messages = chat_db.get_messages_by_cursor(
+            phone_number,
+            limit,
+            before=before,
+            after=after,
+            include_total=include_total
+        )
+
+        messages = [CursorMessage(seq=seq, **message.model_dump()) for seq, message in rows]
+        has_older = has_more if after is None else after > 0
+        has_newer = has_more if after is not None else before is not None
+
+        return ChatMessagesCursorResponse(
+            phone_number=phone_number,
+            messages=messages,
+            next_cursor=messages[-1].seq if messages and has_older else None,
+            prev_cursor=messages[0].seq if messages and has_newer else None,
+            has_older=has_older,
+            has_newer=has_newer,
+            total_messages=total_messages
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        error_msg = str(e)
+        if "relation" in error_msg and "does not exist" in error_msg:
+            raise HTTPException(
+                status_code=500, 
+                detail="Database table not found. Please run the database setup first."
+            )
+        raise HTTPException(status_code=500, detail=f"Internal server error: {error_msg}")
+
+@chat_router.post("/{phone_number}/read")
+async def mark_chat_read(
+    phone_number: str = Path(..., description="Phone number of the conversation", example="923001234567")
+):
+    """
+    Reset the unread message counter of a conversation.
+    """
+    try:
+        if not conversation_db.mark_read(phone_number):
+            raise HTTPException(status_code=404, detail="No conversation found for this phone number")
+        return {"success": True, "message": "Conversation marked as read"}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to mark conversation as read: {e}")
+
 @chat_router.delete("/{phone_number}")
 async def delete_chat_history(
     phone_number: str = Path(..., description="Phone number to clear chat for", example="923001234567")
@@ -530,8 +337,7 @@ async def delete_chat_history(
     """
     try:
         # Ensure chat exists before attempting deletion
-        existing_chat = chat_db._get_chat_by_phone(phone_number)
-        if not existing_chat:
+        if not chat_db.has_chat(phone_number):
             raise HTTPException(status_code=404, detail="No chat history found for this phone number")
 
         success = chat_db.delete_chat(phone_number)
@@ -583,7 +389,7 @@ async def send_message(
         
         # Store message in database and track stats
         try:
-            db_success = chat_db.add_or_create_message(phone_number, new_message)
+            db_success = await repositories.chat_history.record_message(phone_number, new_message)
             if db_success:
                 Logger.info(f"✅ Text message stored in database")
                 # Stream to WebSocket for real-time updates
@@ -672,7 +478,7 @@ async def send_image_message(
         
         # Store message in database
         try:
-            db_success = chat_db.add_or_create_message(phone_number, new_message)
+            db_success = await repositories.chat_history.record_message(phone_number, new_message)
             if db_success:
                 await websocket_manager.send_to_phone(phone_number, new_message)
             if db_success:
@@ -778,7 +584,7 @@ async def send_audio_message(
         
         # Store message in database
         try:
-            db_success = chat_db.add_or_create_message(phone_number, new_message)
+            db_success = await repositories.chat_history.record_message(phone_number, new_message)
             if db_success:
                 Logger.info(f"✅ Audio message stored in database")
                 await websocket_manager.send_to_phone(phone_number, new_message)
@@ -905,7 +711,7 @@ async def send_document_message(
         
         # Store message in database
         try:
-            db_success = chat_db.add_or_create_message(phone_number, new_message)
+            db_success = await repositories.chat_history.record_message(phone_number, new_message)
             if db_success:
                 Logger.info(f"✅ Document message stored in database")
                 await websocket_manager.send_to_phone(phone_number, new_message)
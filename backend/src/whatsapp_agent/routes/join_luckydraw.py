@@ -64,7 +64,7 @@ async def join_lucky_draw_giveaway(
         try:
             if user_phone_number:
                 await wa.send_message(user_phone_number, static_message)
-                wa_func_class._save_agent_message(user_phone_number, static_message)
+                await wa_func_class._save_agent_message(user_phone_number, static_message)
         except Exception as send_exc:
             Logger.error(f"Failed to send referral message to user: {send_exc}")
 
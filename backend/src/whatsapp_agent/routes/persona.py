@@ -1,6 +1,8 @@
+import asyncio
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from whatsapp_agent.database.boost_buddy_persona import PersonaDB
+from whatsapp_agent.database.boost_buddy_persona import PersonaDB, persona_cache
+from whatsapp_agent.utils.semantic_cache import semantic_answer_cache
 
 persona_router = APIRouter(prefix="/persona")
 
@@ -21,7 +23,9 @@ async def get_personas():
 
 @persona_router.patch("/")
 async def update_persona(request: PersonaUpdateRequest):
-    success = db.update_persona(request.agent_name, request.new_persona)
+    success = await asyncio.to_thread(persona_cache.update, request.agent_name, request.new_persona)
     if not success:
         raise HTTPException(status_code=400, detail="Failed to update persona.")
+    # Cached answers were written in the old persona's voice
+    semantic_answer_cache.invalidate("persona updated")
     return {"message": "Persona updated successfully."}
\ No newline at end of file
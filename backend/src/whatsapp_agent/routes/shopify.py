@@ -4,14 +4,13 @@ from whatsapp_agent.shopify.base import ShopifyBase
 from whatsapp_agent.utils.config import Config
 from whatsapp_agent.utils.wa_instance import wa
 from whatsapp_agent._debug import Logger
-from whatsapp_agent.database.chat_history import ChatHistoryDataBase
+from whatsapp_agent.database.repositories import repositories
 from whatsapp_agent.schema.chat_history import MessageSchema
 from datetime import datetime
 import hmac
 import hashlib
 import base64
 
-chat_db = ChatHistoryDataBase()
 
 shopifyRouter = APIRouter(prefix="/shopify", tags=["shopify"])
 shopifyBase = ShopifyBase()
@@ -90,7 +89,7 @@ async def shopify_webhook(
             message_type="image",
             sender="agent"
         )
-        chat_db.add_or_create_message(to_phone, message)
+        await repositories.chat_history.record_message(to_phone, message)
         Logger.info(f"Sent order confirmation template to {to_phone}")
     else:
         Logger.info("No valid phone number found for WhatsApp notification.")
@@ -141,7 +140,7 @@ async def fulfilment_webhook(
             message_type="image",
             sender="agent"
         )
-        chat_db.add_or_create_message(phone, message)
+        await repositories.chat_history.record_message(phone, message)
         Logger.info(f"Sent fulfillment template and saved agent message for {phone}")
     else:
         Logger.info("No valid phone number found for WhatsApp notification.")
@@ -1,5 +1,5 @@
 from fastapi import UploadFile, APIRouter, HTTPException, Form, Query, Body
-from whatsapp_agent.utils.vector_store import VectorStoreManager
+from whatsapp_agent.utils.vector_store import VectorStoreManager, vector_store_registry
 from whatsapp_agent.database.vector_storage import VectorStoreDB
 from whatsapp_agent.schema.vectore_store import VectorStore, FAQVector, KnowledgeVector
 from whatsapp_agent.utils.current_time import _get_current_karachi_time_str
@@ -7,6 +7,7 @@ from whatsapp_agent.utils._text_extractor import convert_file_content
 from whatsapp_agent.database.faq_vector_storage import FAQVectorDB
 from whatsapp_agent.database.knowledge_vector_storage import KnowledgeVectorDB
 from whatsapp_agent.utils.background_tasks import background_processor
+from whatsapp_agent.utils.semantic_cache import semantic_answer_cache
 from typing import Dict, List
 from pydantic import BaseModel
 import asyncio
@@ -24,12 +25,19 @@ manager = VectorStoreManager()
 faq_db = FAQVectorDB()
 knowledge_db = KnowledgeVectorDB()
 
+# Store names already known to have a Supabase record in this process
+_recorded_stores = set()
+
 def _get_or_create_store(name: str) -> str:
     """
-    Fetch a vector store ID by name from Supabase,
+    Fetch a vector store ID by name from the registry,
     or create it if it doesn't exist.
+    Blocking; the registry must be loaded (see _ensure_store).
     """
     store_id = manager.get_vector_store_id(name)
+    if store_id and name in _recorded_stores:
+        return store_id
+
     vector_store_id = vector_db.get_vector_store_by_name(name)
 
     if not store_id:
@@ -44,9 +52,22 @@ def _get_or_create_store(name: str) -> str:
         )
         vector_db.create_vector_store(vector_store)
 
+    _recorded_stores.add(name)
     return store_id
 
 
+async def _ensure_store(name: str) -> str:
+    """Get or create a store off the event loop, once the registry is loaded."""
+    await vector_store_registry.ensure_loaded()
+    return await asyncio.to_thread(_get_or_create_store, name)
+
+
+async def _get_store_id(name: str):
+    """Store ID by name; None only when the loaded registry does not know the store."""
+    await vector_store_registry.ensure_loaded()
+    return manager.get_vector_store_id(name)
+
+
 class FAQUploadRequest(BaseModel):
     question: str
     answer: str
@@ -54,7 +75,7 @@ class FAQUploadRequest(BaseModel):
 
 @upload_router.post("/faq")
 async def upload_single_faq(faq: FAQUploadRequest = Body(...)):
-    faq_store_id = _get_or_create_store("FAQ-Vector-Store")
+    faq_store_id = await _ensure_store("FAQ-Vector-Store")
     content = f"Question: {faq.question}\nAnswer: {faq.answer}"
     file_data = await asyncio.to_thread(
         manager.upload_file,
@@ -74,6 +95,7 @@ async def upload_single_faq(faq: FAQUploadRequest = Body(...)):
         author=faq.author
     )
     faq_db.add_faq(faq_obj)
+    await semantic_answer_cache.knowledge_base_changed("FAQ added")
     return {
         "message": "FAQ uploaded successfully",
         "file": file_data,
@@ -174,7 +196,7 @@ async def edit_faq(
     faq: dict = Body(...)
 ):
     """Edit a file in the FAQ vector store."""
-    faq_store_id = manager.get_vector_store_id("FAQ-Vector-Store")
+    faq_store_id = await _get_store_id("FAQ-Vector-Store")
     if not faq_store_id:
         raise HTTPException(status_code=404, detail=f"Store 'FAQ-Vector-Store' not found")
     await asyncio.to_thread(manager.remove_file_from_vector_store, faq_store_id, file_id)
@@ -202,6 +224,7 @@ async def edit_faq(
     )
     faq_db.delete_faq(file_id)
     faq_db.add_faq(faq_obj)
+    await semantic_answer_cache.knowledge_base_changed("FAQ edited")
     return {
         "message": "FAQ updated successfully",
         "file": file_data,
@@ -213,18 +236,19 @@ async def edit_faq(
 @upload_router.delete("/faqs/delete/{file_id}")
 async def delete_faq(file_id: str):
     """Delete a file from a vector store."""
-    store_id = manager.get_vector_store_id("FAQ-Vector-Store")
+    store_id = await _get_store_id("FAQ-Vector-Store")
     if not store_id:
         raise HTTPException(status_code=404, detail=f"Store 'FAQ-Vector-Store' not found")
     removed = await asyncio.to_thread(manager.remove_file_from_vector_store, store_id, file_id)
     faq_db.delete_faq(file_id)
+    await semantic_answer_cache.knowledge_base_changed("FAQ deleted")
     await asyncio.to_thread(manager.delete_file, file_id)
     return {"message": f"File {file_id} removed from FAQ-Vector-Store", "removed": removed}
 
 @upload_router.post("/documents")
 async def upload_document(file: UploadFile, filename: str = Form(...), author: str = Form(...)):
     """Upload file into Company Docs vector store."""
-    doc_store_id = _get_or_create_store("Company-Docs-Vector-Store")
+    doc_store_id = await _ensure_store("Company-Docs-Vector-Store")
     content = await file.read()
     file_data = await asyncio.to_thread(
         manager.upload_file,
@@ -244,6 +268,7 @@ async def upload_document(file: UploadFile, filename: str = Form(...), author: s
         author=author
     )
     knowledge_db.add_knowledge_vector(knowledge_vector)
+    await semantic_answer_cache.knowledge_base_changed("document added")
     return {
         "message": "Document uploaded successfully",
         "file": file_data,
@@ -255,7 +280,7 @@ async def upload_document(file: UploadFile, filename: str = Form(...), author: s
 @upload_router.get("/documents/list")
 async def list_documents():
     """List all files in the Document vector store."""
-    store_id = manager.get_vector_store_id("Company-Docs-Vector-Store")
+    store_id = await _get_store_id("Company-Docs-Vector-Store")
     file_names = knowledge_db.list_knowledge_vectors()
     files = await asyncio.to_thread(manager.list_vector_store_files, store_id)
     for file in files:
@@ -269,8 +294,9 @@ async def list_documents():
 @upload_router.delete("/documents/delete/{file_id}")
 async def delete_document(file_id: str):
     """Delete a file from a vector store."""
-    store_id = manager.get_vector_store_id("Company-Docs-Vector-Store")
+    store_id = await _get_store_id("Company-Docs-Vector-Store")
     removed = await asyncio.to_thread(manager.remove_file_from_vector_store, store_id, file_id)
     await asyncio.to_thread(manager.delete_file, file_id)
     knowledge_db.delete_knowledge_vector(file_id)
+    await semantic_answer_cache.knowledge_base_changed("document deleted")
     return {"message": f"File {file_id} removed from Company-Docs-Vector-Store", "removed": removed}
@@ -4,11 +4,10 @@ from whatsapp_agent.utils.wa_instance import wa
 from whatsapp_agent.utils.websocket import websocket_manager
 from whatsapp_agent.schema.chat_history import MessageSchema
 from whatsapp_agent.utils.current_time import _get_current_karachi_time_str
-from whatsapp_agent.database.chat_history import ChatHistoryDataBase
+from whatsapp_agent.database.repositories import repositories
 
 chat_ws_router = APIRouter(prefix="/ws")
     
-chat_history_db = ChatHistoryDataBase()
 
 @chat_ws_router.websocket("/{phone_number}")
 async def chat_websocket_endpoint(websocket: WebSocket, phone_number: str):
@@ -25,7 +24,7 @@ async def chat_websocket_endpoint(websocket: WebSocket, phone_number: str):
                 time_stamp=_get_current_karachi_time_str(),
             )
 
-            chat_history_db.add_or_create_message(phone_number, msg_schema)
+            await repositories.chat_history.record_message(phone_number, msg_schema)
 
             # send to WhatsApp API
             await wa.send_message(phone_number, msg, preview_url=True)
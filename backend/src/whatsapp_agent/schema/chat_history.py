@@ -25,3 +25,12 @@ class HumanMessageSchema(BaseModel):
     phone_number: str
     text: str
     representative_id: Optional[str] = None  # tracking ke liye
+
+class AgentStreamFrame(BaseModel):
+    """Incremental frame of an agent reply pushed to the dashboard while it is generated."""
+    stream_id: str
+    event: Literal["start", "delta", "tool_call", "tool_output", "reset", "done"]
+    delta: str = ""
+    tool_name: Optional[str] = None
+    sender: Literal["agent"] = "agent"
+    time_stamp: datetime
@@ -0,0 +1,9 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+class ConversationMemorySchema(BaseModel):
+    phone_number: str
+    summary: str = ""
+    summarized_until: Optional[datetime] = None  # Newest message already folded into the summary
+    summarized_messages: int = 0
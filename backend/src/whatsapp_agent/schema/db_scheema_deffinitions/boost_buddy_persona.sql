@@ -0,0 +1,26 @@
+-- Persona text injected into each agent's instructions, one row per agent.
+CREATE TABLE IF NOT EXISTS boost_buddy_persona (
+    agent_name TEXT PRIMARY KEY,
+    persona TEXT NOT NULL DEFAULT '',
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Existing installs: workers poll MAX(updated_at) to notice persona edits made through another worker
+ALTER TABLE boost_buddy_persona ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+CREATE INDEX IF NOT EXISTS boost_buddy_persona_updated_at_idx ON boost_buddy_persona (updated_at DESC);
+
+-- Keep updated_at current for edits made outside the API (e.g. the Supabase table editor)
+CREATE OR REPLACE FUNCTION touch_boost_buddy_persona()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS boost_buddy_persona_touch ON boost_buddy_persona;
+CREATE TRIGGER boost_buddy_persona_touch
+    BEFORE INSERT OR UPDATE ON boost_buddy_persona
+    FOR EACH ROW EXECUTE FUNCTION touch_boost_buddy_persona();
@@ -0,0 +1,121 @@
+-- Per-campaign referral points and leaderboard.
+-- One row per (campaign, referrer), incremented in place by record_referral_join (referred_users.sql)
+-- and award_referral_point, so top-N pages and a referrer's rank are index range reads instead
+-- of a scan of every referral. This table replaces the referrals.total_points JSON array.
+
+CREATE TABLE IF NOT EXISTS campaign_leaderboard (
+    campaign_id TEXT NOT NULL,
+    referral_code TEXT NOT NULL,
+    referrer_name TEXT,
+    referrer_phone TEXT,
+    points INTEGER NOT NULL DEFAULT 0,
+    referrals INTEGER NOT NULL DEFAULT 0, -- Referred users counted for this campaign
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (campaign_id, referral_code)
+);
+
+-- Leaderboard order; referral_code breaks ties so ranks are stable across pages
+CREATE INDEX IF NOT EXISTS idx_campaign_leaderboard_rank
+    ON campaign_leaderboard (campaign_id, points DESC, referral_code);
+CREATE INDEX IF NOT EXISTS idx_campaign_leaderboard_phone
+    ON campaign_leaderboard (campaign_id, referrer_phone);
+
+-- Award one extra point for a campaign as a single atomic upsert.
+-- Returns the referral's campaign entry, or NULL if the code does not exist.
+CREATE OR REPLACE FUNCTION award_referral_point(p_referral_code TEXT, p_campaign_id TEXT)
+RETURNS JSONB AS $$
+    INSERT INTO campaign_leaderboard AS lb (campaign_id, referral_code, referrer_name, referrer_phone, points, updated_at)
+    SELECT p_campaign_id, r.referral_code, r.referrer_name, r.referrer_phone, 1, NOW()
+    FROM referrals r
+    WHERE r.referral_code = p_referral_code
+    ON CONFLICT (campaign_id, referral_code) DO UPDATE SET
+        points = lb.points + 1,
+        updated_at = NOW()
+    RETURNING jsonb_build_object(
+        'referral_code', lb.referral_code,
+        'referrer_phone', lb.referrer_phone,
+        'campaign_id', lb.campaign_id,
+        'points', lb.points,
+        'referrals', lb.referrals
+    );
+$$ LANGUAGE sql;
+
+-- One leaderboard page with global ranks and the number of ranked referrers
+CREATE OR REPLACE FUNCTION get_campaign_leaderboard_page(p_campaign_id TEXT, p_limit INTEGER, p_offset INTEGER DEFAULT 0)
+RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'total', (SELECT COUNT(*) FROM campaign_leaderboard WHERE campaign_id = p_campaign_id AND points > 0),
+        'entries', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'referrer_name', COALESCE(page.referrer_name, 'Anonymous'),
+                'referrer_phone', COALESCE(page.referrer_phone, ''),
+                'points', page.points,
+                'total_referrals', page.referrals,
+                'rank', p_offset + page.position
+            ) ORDER BY page.position)
+            FROM (
+                SELECT lb.*, ROW_NUMBER() OVER (ORDER BY lb.points DESC, lb.referral_code) AS position
+                FROM (
+                    SELECT * FROM campaign_leaderboard
+                    WHERE campaign_id = p_campaign_id AND points > 0
+                    ORDER BY points DESC, referral_code
+                    LIMIT p_limit OFFSET p_offset
+                ) AS lb
+            ) AS page
+        ), '[]'::jsonb)
+    );
+$$ LANGUAGE sql STABLE;
+
+-- Rank of one referrer in a campaign (NULL when they have no points there)
+CREATE OR REPLACE FUNCTION get_campaign_leaderboard_rank(p_campaign_id TEXT, p_referrer_phone TEXT)
+RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'referrer_name', COALESCE(me.referrer_name, 'Anonymous'),
+        'referrer_phone', me.referrer_phone,
+        'points', me.points,
+        'total_referrals', me.referrals,
+        'rank', 1 + (
+            SELECT COUNT(*) FROM campaign_leaderboard other
+            WHERE other.campaign_id = p_campaign_id
+              AND (other.points > me.points OR (other.points = me.points AND other.referral_code < me.referral_code))
+        )
+    )
+    FROM campaign_leaderboard me
+    WHERE me.campaign_id = p_campaign_id AND me.referrer_phone = p_referrer_phone AND me.points > 0
+    ORDER BY me.points DESC
+    LIMIT 1;
+$$ LANGUAGE sql STABLE;
+
+-- Recount referrals of one campaign (or all when NULL) from the referred_users table.
+-- Points never drop below the referral count; extra points from award_referral_point are kept.
+-- Run whenever the two may have drifted.
+CREATE OR REPLACE FUNCTION rebuild_campaign_leaderboard(p_campaign_id TEXT DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    rebuilt_count INTEGER;
+BEGIN
+    UPDATE campaign_leaderboard lb
+    SET referrals = 0, updated_at = NOW()
+    WHERE (p_campaign_id IS NULL OR lb.campaign_id = p_campaign_id)
+      AND NOT EXISTS (
+          SELECT 1 FROM referred_users ru
+          WHERE ru.referral_code = lb.referral_code AND ru.campaign_id = lb.campaign_id
+      );
+
+    INSERT INTO campaign_leaderboard AS lb (campaign_id, referral_code, referrer_name, referrer_phone, points, referrals)
+    SELECT ru.campaign_id, r.referral_code, r.referrer_name, r.referrer_phone, COUNT(*), COUNT(*)
+    FROM referred_users ru
+    JOIN referrals r ON r.referral_code = ru.referral_code
+    WHERE p_campaign_id IS NULL OR ru.campaign_id = p_campaign_id
+    GROUP BY ru.campaign_id, r.referral_code, r.referrer_name, r.referrer_phone
+    ON CONFLICT (campaign_id, referral_code) DO UPDATE SET
+        referrer_name = EXCLUDED.referrer_name,
+        referrer_phone = EXCLUDED.referrer_phone,
+        points = GREATEST(lb.points, EXCLUDED.referrals),
+        referrals = EXCLUDED.referrals,
+        updated_at = NOW();
+
+    GET DIAGNOSTICS rebuilt_count = ROW_COUNT;
+    RETURN rebuilt_count;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,213 @@
+-- Denormalized conversation summary: one row per phone number with its last message.
+-- Updated on every message write so /chats/list-chats never reads message bodies.
+
+CREATE TABLE IF NOT EXISTS chat_conversations (
+    phone_number TEXT PRIMARY KEY,
+    last_message TEXT,
+    last_message_time TIMESTAMP WITH TIME ZONE,
+    last_message_sender TEXT CHECK (last_message_sender IN ('customer', 'agent', 'representative')),
+    last_message_type TEXT CHECK (last_message_type IN ('audio', 'text', 'image', 'document', 'video')),
+    message_count INTEGER NOT NULL DEFAULT 0,
+    unread_count INTEGER NOT NULL DEFAULT 0, -- Customer messages since the last agent/representative reply
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Matches the default chat list order exactly (a backward scan serves ascending order)
+DROP INDEX IF EXISTS idx_chat_conversations_last_message_time;
+CREATE INDEX IF NOT EXISTS idx_chat_conversations_recent
+    ON chat_conversations (last_message_time DESC NULLS LAST, phone_number);
+-- Chat list sorted by customer name
+CREATE INDEX IF NOT EXISTS idx_customers_name ON customers (customer_name, phone_number);
+
+-- Atomically record one new message in the summary.
+-- Messages are saved in the background and can arrive out of order, so the preview and the
+-- unread counter only change when the message is not older than the current last message.
+CREATE OR REPLACE FUNCTION upsert_chat_conversation(
+    p_phone_number TEXT,
+    p_content TEXT,
+    p_time_stamp TIMESTAMPTZ,
+    p_sender TEXT,
+    p_message_type TEXT
+)
+RETURNS VOID AS $$
+    INSERT INTO chat_conversations AS cv (
+        phone_number, last_message, last_message_time, last_message_sender, last_message_type,
+        message_count, unread_count, updated_at
+    )
+    VALUES (
+        p_phone_number, p_content, p_time_stamp, p_sender, p_message_type,
+        1, CASE WHEN p_sender = 'customer' THEN 1 ELSE 0 END, NOW()
+    )
+    ON CONFLICT (phone_number) DO UPDATE SET
+        last_message = CASE WHEN cv.last_message_time IS NULL OR EXCLUDED.last_message_time >= cv.last_message_time
+            THEN EXCLUDED.last_message ELSE cv.last_message END,
+        last_message_time = CASE WHEN cv.last_message_time IS NULL OR EXCLUDED.last_message_time >= cv.last_message_time
+            THEN EXCLUDED.last_message_time ELSE cv.last_message_time END,
+        last_message_sender = CASE WHEN cv.last_message_time IS NULL OR EXCLUDED.last_message_time >= cv.last_message_time
+            THEN EXCLUDED.last_message_sender ELSE cv.last_message_sender END,
+        last_message_type = CASE WHEN cv.last_message_time IS NULL OR EXCLUDED.last_message_time >= cv.last_message_time
+            THEN EXCLUDED.last_message_type ELSE cv.last_message_type END,
+        message_count = cv.message_count + 1,
+        unread_count = CASE
+            WHEN NOT (cv.last_message_time IS NULL OR EXCLUDED.last_message_time >= cv.last_message_time) THEN cv.unread_count
+            WHEN EXCLUDED.last_message_sender = 'customer' THEN cv.unread_count + 1
+            ELSE 0
+        END,
+        updated_at = NOW();
+$$ LANGUAGE sql;
+
+-- One page of conversations joined to customers.
+-- The ORDER BY is a plain column list per sort (built from a whitelist, never from input) so
+-- the default order walks idx_chat_conversations_recent and stops after p_offset + p_limit rows.
+-- Totals are computed separately by count_chat_conversations.
+DROP FUNCTION IF EXISTS list_chat_conversations(INTEGER, INTEGER, TEXT, TEXT[], TEXT, BOOLEAN, BOOLEAN, INTEGER, INTEGER, TEXT, TEXT);
+CREATE OR REPLACE FUNCTION list_chat_conversations(
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0,
+    p_search TEXT DEFAULT NULL,
+    p_tags TEXT[] DEFAULT NULL,
+    p_customer_type TEXT DEFAULT NULL,
+    p_escalation_status BOOLEAN DEFAULT NULL,
+    p_is_active BOOLEAN DEFAULT NULL,
+    p_min_spend NUMERIC DEFAULT NULL,
+    p_max_spend NUMERIC DEFAULT NULL,
+    p_sort_by TEXT DEFAULT 'updated_at',
+    p_sort_order TEXT DEFAULT 'desc'
+)
+RETURNS TABLE (
+    customer JSONB,
+    last_message TEXT,
+    last_message_time TIMESTAMPTZ,
+    last_message_sender TEXT,
+    last_message_type TEXT,
+    message_count INTEGER,
+    unread_count INTEGER
+) AS $$
+DECLARE
+    v_ascending BOOLEAN := lower(COALESCE(p_sort_order, 'desc')) = 'asc';
+    v_order TEXT;
+BEGIN
+    v_order := CASE p_sort_by
+        WHEN 'customer_name' THEN 'c.customer_name'
+        WHEN 'total_spend' THEN 'c.total_spend'
+        WHEN 'phone_number' THEN 'cv.phone_number'
+        ELSE 'cv.last_message_time'
+    END;
+    v_order := CASE
+        WHEN v_order = 'cv.phone_number' AND v_ascending THEN 'cv.phone_number ASC'
+        WHEN v_order = 'cv.phone_number' THEN 'cv.phone_number DESC'
+        WHEN v_ascending THEN v_order || ' ASC NULLS FIRST, cv.phone_number DESC'
+        ELSE v_order || ' DESC NULLS LAST, cv.phone_number'
+    END;
+
+    -- EXECUTE plans with the actual arguments, so unused filters fold away
+    RETURN QUERY EXECUTE format($query$
+        SELECT
+            to_jsonb(c),
+            cv.last_message,
+            cv.last_message_time,
+            cv.last_message_sender,
+            cv.last_message_type,
+            cv.message_count,
+            cv.unread_count
+        FROM chat_conversations cv
+        JOIN customers c ON c.phone_number = cv.phone_number
+        WHERE cv.message_count > 0
+          AND (
+              $1::TEXT IS NULL
+              OR c.phone_number ILIKE '%%' || $1 || '%%'
+              OR c.customer_name ILIKE '%%' || $1 || '%%'
+              OR c.email ILIKE '%%' || $1 || '%%'
+              OR c.company_name ILIKE '%%' || $1 || '%%'
+          )
+          AND ($2::TEXT[] IS NULL OR c.tags && $2)
+          AND ($3::TEXT IS NULL OR c.customer_type = $3)
+          AND ($4::BOOLEAN IS NULL OR c.escalation_status = $4)
+          AND ($5::BOOLEAN IS NULL OR c.is_active = $5)
+          AND ($6::NUMERIC IS NULL OR c.total_spend >= $6)
+          AND ($7::NUMERIC IS NULL OR c.total_spend <= $7)
+        ORDER BY %s
+        LIMIT $8
+        OFFSET $9
+    $query$, v_order)
+    USING p_search, p_tags, p_customer_type, p_escalation_status, p_is_active,
+          p_min_spend, p_max_spend, p_limit, p_offset;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Total and escalated conversation counts for the same filters as list_chat_conversations
+CREATE OR REPLACE FUNCTION count_chat_conversations(
+    p_search TEXT DEFAULT NULL,
+    p_tags TEXT[] DEFAULT NULL,
+    p_customer_type TEXT DEFAULT NULL,
+    p_escalation_status BOOLEAN DEFAULT NULL,
+    p_is_active BOOLEAN DEFAULT NULL,
+    p_min_spend NUMERIC DEFAULT NULL,
+    p_max_spend NUMERIC DEFAULT NULL
+)
+RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'total', COUNT(*),
+        'escalated', COUNT(*) FILTER (WHERE c.escalation_status)
+    )
+    FROM chat_conversations cv
+    JOIN customers c ON c.phone_number = cv.phone_number
+    WHERE cv.message_count > 0
+      AND (
+          p_search IS NULL
+          OR c.phone_number ILIKE '%' || p_search || '%'
+          OR c.customer_name ILIKE '%' || p_search || '%'
+          OR c.email ILIKE '%' || p_search || '%'
+          OR c.company_name ILIKE '%' || p_search || '%'
+      )
+      AND (p_tags IS NULL OR c.tags && p_tags)
+      AND (p_customer_type IS NULL OR c.customer_type = p_customer_type)
+      AND (p_escalation_status IS NULL OR c.escalation_status = p_escalation_status)
+      AND (p_is_active IS NULL OR c.is_active = p_is_active)
+      AND (p_min_spend IS NULL OR c.total_spend >= p_min_spend)
+      AND (p_max_spend IS NULL OR c.total_spend <= p_max_spend);
+$$ LANGUAGE sql STABLE;
+
+-- One-time backfill from the legacy JSON store (run after creating the table)
+INSERT INTO chat_conversations (
+    phone_number, last_message, last_message_time, last_message_sender, last_message_type, message_count, unread_count
+)
+SELECT
+    ch.phone_number,
+    ch.messages->-1->>'content',
+    (ch.messages->-1->>'time_stamp')::timestamptz,
+    ch.messages->-1->>'sender',
+    ch.messages->-1->>'message_type',
+    jsonb_array_length(ch.messages),
+    0
+FROM chat_history ch
+WHERE jsonb_array_length(COALESCE(ch.messages, '[]'::jsonb)) > 0
+ON CONFLICT (phone_number) DO NOTHING;
+
+-- ...and from chat_messages for phones that only exist there
+INSERT INTO chat_conversations (
+    phone_number, last_message, last_message_time, last_message_sender, last_message_type, message_count, unread_count
+)
+SELECT
+    latest.phone_number,
+    latest.content,
+    latest.time_stamp,
+    latest.sender,
+    latest.message_type,
+    counts.message_count,
+    0
+FROM (
+    SELECT DISTINCT ON (phone_number) phone_number, content, time_stamp, sender, message_type
+    FROM chat_messages
+    ORDER BY phone_number, seq DESC
+) AS latest
+JOIN (
+    SELECT phone_number, COUNT(*)::INTEGER AS message_count
+    FROM chat_messages
+    GROUP BY phone_number
+) AS counts ON counts.phone_number = latest.phone_number
+ON CONFLICT (phone_number) DO NOTHING;
+
+COMMENT ON TABLE chat_conversations IS 'Per-conversation summary (last message, counts) maintained on every message write';
+COMMENT ON COLUMN chat_conversations.unread_count IS 'Customer messages received since the last agent or representative reply';
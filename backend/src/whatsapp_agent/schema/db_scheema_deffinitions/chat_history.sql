@@ -20,3 +20,45 @@ CREATE TRIGGER update_chat_trigger
 BEFORE UPDATE ON chat_history
 FOR EACH ROW
 EXECUTE PROCEDURE update_chat_updated_at();
+
+-- Tail read: return only the last p_limit messages of a chat, oldest first.
+-- The slicing and sorting happen in the database so only p_limit messages cross the wire.
+CREATE OR REPLACE FUNCTION get_recent_chat_history(p_phone_number TEXT, p_limit INTEGER DEFAULT 10)
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_agg(recent.msg ORDER BY recent.ts, recent.ord), '[]'::jsonb)
+    FROM (
+        SELECT m.msg, m.ord, (m.msg->>'time_stamp')::timestamptz AS ts
+        FROM chat_history ch
+        CROSS JOIN LATERAL jsonb_array_elements(COALESCE(ch.messages, '[]'::jsonb)) WITH ORDINALITY AS m(msg, ord)
+        WHERE ch.phone_number = p_phone_number
+        ORDER BY ts DESC, m.ord DESC
+        LIMIT p_limit
+    ) AS recent;
+$$ LANGUAGE sql STABLE;
+
+-- Keyset page: messages strictly before/after a cursor, newest first.
+-- The cursor ("seq") of a legacy JSON message is its 1-based position in the array.
+CREATE OR REPLACE FUNCTION get_chat_history_page(
+    p_phone_number TEXT,
+    p_limit INTEGER,
+    p_before BIGINT DEFAULT NULL,
+    p_after BIGINT DEFAULT NULL
+)
+RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'total', jsonb_array_length(COALESCE(ch.messages, '[]'::jsonb)),
+        'messages', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object('seq', page.ord, 'message', page.msg) ORDER BY page.ord DESC)
+            FROM (
+                SELECT m.msg, m.ord
+                FROM jsonb_array_elements(COALESCE(ch.messages, '[]'::jsonb)) WITH ORDINALITY AS m(msg, ord)
+                WHERE (p_before IS NULL OR m.ord < p_before)
+                  AND (p_after IS NULL OR m.ord > p_after)
+                ORDER BY CASE WHEN p_after IS NULL THEN -m.ord ELSE m.ord END
+                LIMIT p_limit
+            ) AS page
+        ), '[]'::jsonb)
+    )
+    FROM chat_history ch
+    WHERE ch.phone_number = p_phone_number;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,90 @@
+-- Append-only chat message log
+-- One row per message, replacing the per-phone JSON array in chat_history.
+-- Appending a message is a single INSERT instead of a read-modify-write of the whole history.
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    seq BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY, -- Monotonic sequence, orders messages of a phone
+    phone_number TEXT NOT NULL,
+    time_stamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    content TEXT NOT NULL DEFAULT '',
+    message_type TEXT NOT NULL CHECK (message_type IN ('audio', 'text', 'image', 'document', 'video')),
+    sender TEXT NOT NULL CHECK (sender IN ('customer', 'agent', 'representative')),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Every read is "messages of one phone ordered by seq"
+CREATE INDEX IF NOT EXISTS idx_chat_messages_phone_seq ON chat_messages (phone_number, seq DESC);
+
+-- Migration: copy the JSON messages of one chat_history row into chat_messages.
+-- Locks the chat_history row so dual writes for that phone wait until the copy is done,
+-- and replaces any rows already dual-written for it, so it is safe to re-run.
+CREATE OR REPLACE FUNCTION backfill_chat_messages(p_phone_number TEXT)
+RETURNS INTEGER AS $$
+DECLARE
+    inserted_count INTEGER;
+BEGIN
+    PERFORM 1 FROM chat_history WHERE phone_number = p_phone_number FOR UPDATE;
+
+    DELETE FROM chat_messages WHERE phone_number = p_phone_number;
+
+    INSERT INTO chat_messages (phone_number, time_stamp, content, message_type, sender)
+    SELECT
+        ch.phone_number,
+        COALESCE((m.msg->>'time_stamp')::timestamptz, ch.created_at, NOW()),
+        COALESCE(m.msg->>'content', ''),
+        COALESCE(m.msg->>'message_type', 'text'),
+        COALESCE(m.msg->>'sender', 'agent')
+    FROM chat_history ch
+    CROSS JOIN LATERAL jsonb_array_elements(COALESCE(ch.messages, '[]'::jsonb)) WITH ORDINALITY AS m(msg, ord)
+    WHERE ch.phone_number = p_phone_number
+    ORDER BY m.ord;
+
+    GET DIAGNOSTICS inserted_count = ROW_COUNT;
+    RETURN inserted_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Dual-mode write: append a message to the chat_history JSON array and insert its chat_messages
+-- row in one transaction. The append locks the chat_history row, so a concurrent backfill either
+-- copies the message and the insert waits for it, or runs after both writes; neither duplicates it.
+-- With p_create = FALSE a missing chat_history row is not created and FALSE is returned.
+CREATE OR REPLACE FUNCTION dual_write_chat_message(
+    p_phone_number TEXT,
+    p_time_stamp TIMESTAMPTZ,
+    p_content TEXT,
+    p_message_type TEXT,
+    p_sender TEXT,
+    p_create BOOLEAN DEFAULT TRUE
+)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_message JSONB := jsonb_build_array(jsonb_build_object(
+        'time_stamp', p_time_stamp,
+        'content', p_content,
+        'message_type', p_message_type,
+        'sender', p_sender
+    ));
+BEGIN
+    IF p_create THEN
+        INSERT INTO chat_history AS ch (phone_number, messages)
+        VALUES (p_phone_number, v_message)
+        ON CONFLICT (phone_number) DO UPDATE SET
+            messages = COALESCE(ch.messages, '[]'::jsonb) || EXCLUDED.messages;
+    ELSE
+        UPDATE chat_history
+        SET messages = COALESCE(messages, '[]'::jsonb) || v_message
+        WHERE phone_number = p_phone_number;
+        IF NOT FOUND THEN
+            RETURN FALSE;
+        END IF;
+    END IF;
+
+    INSERT INTO chat_messages (phone_number, time_stamp, content, message_type, sender)
+    VALUES (p_phone_number, p_time_stamp, p_content, p_message_type, p_sender);
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE chat_messages IS 'Append-only WhatsApp message log, one row per message';
+COMMENT ON COLUMN chat_messages.seq IS 'Monotonic sequence; ordering key for messages of a phone number';
+COMMENT ON COLUMN chat_messages.time_stamp IS 'Time the message was sent or received';
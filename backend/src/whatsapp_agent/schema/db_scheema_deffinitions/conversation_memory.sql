@@ -0,0 +1,11 @@
+-- Rolling conversation summary: one row per phone number.
+-- Messages that drop out of the raw history tail shown to the agents are folded into
+-- `summary` after each agent reply, so long-term context survives in a bounded prompt.
+
+CREATE TABLE IF NOT EXISTS conversation_memory (
+    phone_number TEXT PRIMARY KEY,
+    summary TEXT NOT NULL DEFAULT '',
+    summarized_until TIMESTAMP WITH TIME ZONE, -- time_stamp of the newest message folded into the summary
+    summarized_messages INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
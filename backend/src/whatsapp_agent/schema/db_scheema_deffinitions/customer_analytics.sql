@@ -0,0 +1,43 @@
+-- Dashboard customer analytics computed in the database.
+-- One aggregate scan replaces downloading every customer row for /analytics/overview,
+-- /analytics/customers/stats and /analytics/escalations.
+
+-- Top customers by spend and the escalated list are index reads
+CREATE INDEX IF NOT EXISTS idx_customers_total_spend ON customers (total_spend DESC);
+CREATE INDEX IF NOT EXISTS idx_customers_escalated ON customers (phone_number) WHERE escalation_status;
+
+CREATE OR REPLACE FUNCTION get_customer_analytics(
+    p_high_value_spend INTEGER DEFAULT 10000,
+    p_top_limit INTEGER DEFAULT 5
+)
+RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'total', COUNT(*),
+        'active', COUNT(*) FILTER (WHERE c.is_active),
+        'escalated', COUNT(*) FILTER (WHERE c.escalation_status),
+        'b2b', COUNT(*) FILTER (WHERE c.customer_type = 'B2B'),
+        'd2c', COUNT(*) FILTER (WHERE c.customer_type = 'D2C'),
+        'escalated_b2b', COUNT(*) FILTER (WHERE c.escalation_status AND c.customer_type = 'B2B'),
+        'escalated_d2c', COUNT(*) FILTER (WHERE c.escalation_status AND c.customer_type = 'D2C'),
+        'total_spend', COALESCE(SUM(c.total_spend), 0),
+        'high_value', COUNT(*) FILTER (WHERE c.total_spend > p_high_value_spend),
+        'top_customers', (
+            SELECT COALESCE(jsonb_agg(top ORDER BY top.spend DESC), '[]'::jsonb)
+            FROM (
+                SELECT
+                    t.phone_number,
+                    t.customer_name AS name,
+                    t.company_name AS company,
+                    t.customer_type,
+                    t.total_spend AS spend,
+                    t.is_active,
+                    t.escalation_status
+                FROM customers t
+                WHERE t.total_spend > 0
+                ORDER BY t.total_spend DESC
+                LIMIT p_top_limit
+            ) AS top
+        )
+    )
+    FROM customers c;
+$$ LANGUAGE sql STABLE;
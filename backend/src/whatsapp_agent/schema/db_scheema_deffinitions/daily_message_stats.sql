@@ -57,3 +57,51 @@ COMMENT ON COLUMN daily_message_stats.total_representative_messages IS 'Total nu
 -- Timestamp columns
 COMMENT ON COLUMN daily_message_stats.created_at IS 'Timestamp when this record was created';
 COMMENT ON COLUMN daily_message_stats.updated_at IS 'Timestamp when this record was last updated';
+
+-- 6. Apply buffered counter deltas atomically.
+-- p_deltas is a JSON array with one object per date, e.g.
+--   [{"date": "2025-01-31", "total_messages": 12, "text_messages": 10, "image_messages": 2, "total_customer_messages": 7, "total_agent_messages": 5}]
+-- Missing columns count as 0. Every column is incremented in place (col = col + delta), so concurrent
+-- writers never overwrite each other's counts. Each date may appear only once per call.
+CREATE OR REPLACE FUNCTION increment_daily_message_stats(p_deltas JSONB)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+  INSERT INTO daily_message_stats AS s (
+    date, total_messages, text_messages, image_messages, video_messages, audio_messages, document_messages,
+    total_customer_messages, total_agent_messages, total_representative_messages
+  )
+  SELECT
+    d.date,
+    COALESCE(d.total_messages, 0),
+    COALESCE(d.text_messages, 0),
+    COALESCE(d.image_messages, 0),
+    COALESCE(d.video_messages, 0),
+    COALESCE(d.audio_messages, 0),
+    COALESCE(d.document_messages, 0),
+    COALESCE(d.total_customer_messages, 0),
+    COALESCE(d.total_agent_messages, 0),
+    COALESCE(d.total_representative_messages, 0)
+  FROM jsonb_to_recordset(p_deltas) AS d(
+    date DATE,
+    total_messages INTEGER,
+    text_messages INTEGER,
+    image_messages INTEGER,
+    video_messages INTEGER,
+    audio_messages INTEGER,
+    document_messages INTEGER,
+    total_customer_messages INTEGER,
+    total_agent_messages INTEGER,
+    total_representative_messages INTEGER
+  )
+  ON CONFLICT (date) DO UPDATE SET
+    total_messages = COALESCE(s.total_messages, 0) + EXCLUDED.total_messages,
+    text_messages = COALESCE(s.text_messages, 0) + EXCLUDED.text_messages,
+    image_messages = COALESCE(s.image_messages, 0) + EXCLUDED.image_messages,
+    video_messages = COALESCE(s.video_messages, 0) + EXCLUDED.video_messages,
+    audio_messages = COALESCE(s.audio_messages, 0) + EXCLUDED.audio_messages,
+    document_messages = COALESCE(s.document_messages, 0) + EXCLUDED.document_messages,
+    total_customer_messages = COALESCE(s.total_customer_messages, 0) + EXCLUDED.total_customer_messages,
+    total_agent_messages = COALESCE(s.total_agent_messages, 0) + EXCLUDED.total_agent_messages,
+    total_representative_messages = COALESCE(s.total_representative_messages, 0) + EXCLUDED.total_representative_messages;
+$$;
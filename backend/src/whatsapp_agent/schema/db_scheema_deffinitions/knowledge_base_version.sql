@@ -0,0 +1,22 @@
+-- Single-row counter bumped whenever FAQs or knowledge base documents change.
+-- Every worker polls it, so answers cached by one worker are dropped after an upload
+-- handled by another.
+CREATE TABLE IF NOT EXISTS knowledge_base_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+INSERT INTO knowledge_base_version (id, version) VALUES (TRUE, 0)
+ON CONFLICT (id) DO NOTHING;
+
+-- Increment the counter and return the new version
+CREATE OR REPLACE FUNCTION bump_knowledge_base_version()
+RETURNS BIGINT AS $$
+    INSERT INTO knowledge_base_version AS kb (id, version, updated_at)
+    VALUES (TRUE, 1, NOW())
+    ON CONFLICT (id) DO UPDATE SET
+        version = kb.version + 1,
+        updated_at = NOW()
+    RETURNING kb.version;
+$$ LANGUAGE sql;
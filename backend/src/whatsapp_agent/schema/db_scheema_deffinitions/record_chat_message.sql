@@ -0,0 +1,63 @@
+-- Persist one chat message in a single round trip.
+-- Appends the message to the store(s) of the given CHAT_STORAGE_MODE, updates the conversation
+-- summary and, when p_stats_date is given, bumps the daily message counters, all in one transaction.
+-- Pass p_stats_date = NULL when the application buffers the counters itself.
+-- Requires chat_history.sql, chat_messages.sql, chat_conversations.sql and daily_message_stats.sql.
+CREATE OR REPLACE FUNCTION record_chat_message(
+    p_phone_number TEXT,
+    p_time_stamp TIMESTAMPTZ,
+    p_content TEXT,
+    p_message_type TEXT,
+    p_sender TEXT,
+    p_storage_mode TEXT DEFAULT 'json',
+    p_stats_date DATE DEFAULT NULL
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+    IF p_storage_mode IN ('json', 'dual') THEN
+        -- Append in place instead of downloading and re-uploading the whole array
+        INSERT INTO chat_history AS ch (phone_number, messages)
+        VALUES (
+            p_phone_number,
+            jsonb_build_array(jsonb_build_object(
+                'time_stamp', p_time_stamp,
+                'content', p_content,
+                'message_type', p_message_type,
+                'sender', p_sender
+            ))
+        )
+        ON CONFLICT (phone_number) DO UPDATE SET
+            messages = COALESCE(ch.messages, '[]'::jsonb) || EXCLUDED.messages;
+    END IF;
+
+    IF p_storage_mode IN ('dual', 'messages') THEN
+        INSERT INTO chat_messages (phone_number, time_stamp, content, message_type, sender)
+        VALUES (p_phone_number, p_time_stamp, p_content, p_message_type, p_sender);
+    END IF;
+
+    PERFORM upsert_chat_conversation(p_phone_number, p_content, p_time_stamp, p_sender, p_message_type);
+
+    IF p_stats_date IS NOT NULL THEN
+        PERFORM increment_daily_message_stats(jsonb_build_array(
+            jsonb_build_object(
+                'date', p_stats_date,
+                'total_messages', 1,
+                CASE p_message_type
+                    WHEN 'image' THEN 'image_messages'
+                    WHEN 'video' THEN 'video_messages'
+                    WHEN 'audio' THEN 'audio_messages'
+                    WHEN 'document' THEN 'document_messages'
+                    ELSE 'text_messages'
+                END, 1,
+                CASE p_sender
+                    WHEN 'customer' THEN 'total_customer_messages'
+                    WHEN 'representative' THEN 'total_representative_messages'
+                    ELSE 'total_agent_messages'
+                END, 1
+            )
+        ));
+    END IF;
+
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,103 @@
+-- Users who joined through a referral link, one row per (referral, campaign, phone).
+-- Replaces the referrals.referred_users JSON array; the primary key makes every join idempotent
+-- and turns "was this phone already referred?" into an index lookup.
+-- Requires referrals.sql and campaign_leaderboard.sql.
+
+CREATE TABLE IF NOT EXISTS referred_users (
+    referral_code TEXT NOT NULL REFERENCES referrals (referral_code) ON DELETE CASCADE,
+    campaign_id TEXT NOT NULL,
+    phone_number TEXT NOT NULL,
+    time_stamp TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (referral_code, campaign_id, phone_number)
+);
+
+-- Who referred a given customer
+CREATE INDEX IF NOT EXISTS idx_referred_users_phone
+    ON referred_users (phone_number, campaign_id);
+
+-- Record a referred user and award the referrer one point, in one transaction.
+-- A repeated join inserts nothing and awards nothing.
+-- Returns {added, referrer_phone, points}, or NULL if the referral code does not exist.
+CREATE OR REPLACE FUNCTION record_referral_join(
+    p_referral_code TEXT,
+    p_campaign_id TEXT,
+    p_phone_number TEXT,
+    p_time_stamp TEXT
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_referral referrals%ROWTYPE;
+    v_points INTEGER;
+BEGIN
+    SELECT * INTO v_referral FROM referrals WHERE referral_code = p_referral_code;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO referred_users (referral_code, campaign_id, phone_number, time_stamp)
+    VALUES (p_referral_code, p_campaign_id, p_phone_number, p_time_stamp)
+    ON CONFLICT (referral_code, campaign_id, phone_number) DO NOTHING;
+
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('added', FALSE, 'referrer_phone', v_referral.referrer_phone);
+    END IF;
+
+    INSERT INTO campaign_leaderboard AS lb (campaign_id, referral_code, referrer_name, referrer_phone, points, referrals, updated_at)
+    VALUES (p_campaign_id, p_referral_code, v_referral.referrer_name, v_referral.referrer_phone, 1, 1, NOW())
+    ON CONFLICT (campaign_id, referral_code) DO UPDATE SET
+        points = lb.points + 1,
+        referrals = lb.referrals + 1,
+        updated_at = NOW()
+    RETURNING lb.points INTO v_points;
+
+    RETURN jsonb_build_object('added', TRUE, 'referrer_phone', v_referral.referrer_phone, 'points', v_points);
+END;
+$$ LANGUAGE plpgsql;
+
+-- One-off migration from the referrals JSON columns (safe to re-run).
+-- Copies referred_users entries, then seeds campaign points from total_points, keeping
+-- whichever is higher of the stored points and the number of referred users.
+CREATE OR REPLACE FUNCTION migrate_referrals_to_tables()
+RETURNS JSONB AS $$
+DECLARE
+    v_referred INTEGER;
+    v_points INTEGER;
+BEGIN
+    INSERT INTO referred_users (referral_code, campaign_id, phone_number, time_stamp)
+    SELECT DISTINCT ON (r.referral_code, u.referred->>'campaign_id', u.referred->>'phone_number')
+        r.referral_code,
+        u.referred->>'campaign_id',
+        u.referred->>'phone_number',
+        u.referred->>'time_stamp'
+    FROM referrals r
+    CROSS JOIN LATERAL jsonb_array_elements(COALESCE(r.referred_users, '[]'::jsonb)) AS u(referred)
+    WHERE r.referral_code IS NOT NULL
+      AND u.referred->>'campaign_id' IS NOT NULL
+      AND u.referred->>'phone_number' IS NOT NULL
+    ORDER BY r.referral_code, u.referred->>'campaign_id', u.referred->>'phone_number', u.referred->>'time_stamp'
+    ON CONFLICT (referral_code, campaign_id, phone_number) DO NOTHING;
+    GET DIAGNOSTICS v_referred = ROW_COUNT;
+
+    INSERT INTO campaign_leaderboard AS lb (campaign_id, referral_code, referrer_name, referrer_phone, points)
+    SELECT
+        p.point->>'campaign_id',
+        r.referral_code,
+        r.referrer_name,
+        r.referrer_phone,
+        SUM(COALESCE((p.point->>'points')::INTEGER, 0))
+    FROM referrals r
+    CROSS JOIN LATERAL jsonb_array_elements(COALESCE(r.total_points, '[]'::jsonb)) AS p(point)
+    WHERE r.referral_code IS NOT NULL AND p.point->>'campaign_id' IS NOT NULL
+    GROUP BY p.point->>'campaign_id', r.referral_code, r.referrer_name, r.referrer_phone
+    ON CONFLICT (campaign_id, referral_code) DO UPDATE SET
+        points = GREATEST(lb.points, EXCLUDED.points),
+        updated_at = NOW();
+    GET DIAGNOSTICS v_points = ROW_COUNT;
+
+    -- Referral counts (and points below them) come from the copied rows
+    PERFORM rebuild_campaign_leaderboard(NULL);
+
+    RETURN jsonb_build_object('referred_users', v_referred, 'campaign_points', v_points);
+END;
+$$ LANGUAGE plpgsql;
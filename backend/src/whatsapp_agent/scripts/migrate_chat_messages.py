@@ -0,0 +1,56 @@
+"""Migration script to copy chat_history JSON messages into the chat_messages table.
+
+Usage: run this script from the project root in the same Python env used by the project.
+
+Steps:
+1. Create the table and function from schema/db_scheema_deffinitions/chat_messages.sql
+2. Set CHAT_STORAGE_MODE to "dual" so new messages are written to both stores
+3. Run this script (it is safe to re-run; each phone is copied atomically)
+4. Set CHAT_STORAGE_MODE to "messages" to read and write only chat_messages
+"""
+from whatsapp_agent.database.chat_history import ChatHistoryDataBase
+from whatsapp_agent._debug import Logger, enable_verbose_logging
+
+PAGE_SIZE = 500
+
+
+def migrate():
+    chat_db = ChatHistoryDataBase()
+
+    mode = chat_db.storage_mode()
+    if mode != "dual":
+        Logger.warning(f"CHAT_STORAGE_MODE is '{mode}'; messages received during the migration may be missed unless it is 'dual'")
+
+    migrated_chats = 0
+    migrated_messages = 0
+    offset = 0
+
+    while True:
+        # Only fetch phone numbers; the copy itself happens inside the database
+        rows = chat_db.supabase.table(chat_db.TABLE_NAME) \
+            .select("phone_number") \
+            .order("phone_number") \
+            .range(offset, offset + PAGE_SIZE - 1) \
+            .execute().data or []
+
+        if not rows:
+            break
+
+        for row in rows:
+            phone_number = row["phone_number"]
+            try:
+                copied = chat_db.backfill_messages_table(phone_number)
+                migrated_chats += 1
+                migrated_messages += copied
+                Logger.info(f"Migrated {copied} messages for {phone_number}")
+            except Exception as e:
+                Logger.error(f"Failed to migrate chat history for {phone_number}: {e}")
+
+        offset += PAGE_SIZE
+
+    Logger.info(f"Migration completed: {migrated_messages} messages from {migrated_chats} chats")
+
+
+if __name__ == '__main__':
+    enable_verbose_logging()
+    migrate()
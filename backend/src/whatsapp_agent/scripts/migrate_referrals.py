@@ -0,0 +1,28 @@
+"""Migration script to copy the referrals JSON columns into the referred_users and campaign_leaderboard tables.
+
+Usage: run this script from the project root in the same Python env used by the project.
+
+Steps:
+1. Create the tables and functions from schema/db_scheema_deffinitions/campaign_leaderboard.sql
+   and referred_users.sql
+2. Deploy the code that records joins with record_referral_join
+3. Run this script (it is safe to re-run; already copied users and points are kept)
+
+The JSON columns are left in place but are no longer written to.
+"""
+from whatsapp_agent.database.referral import ReferralDataBase
+from whatsapp_agent._debug import Logger, enable_verbose_logging
+
+
+def migrate():
+    referral_db = ReferralDataBase()
+    result = referral_db.migrate_to_tables()
+    Logger.info(
+        f"Migration completed: {result.get('referred_users', 0)} referred users and "
+        f"{result.get('campaign_points', 0)} campaign point entries copied"
+    )
+
+
+if __name__ == '__main__':
+    enable_verbose_logging()
+    migrate()
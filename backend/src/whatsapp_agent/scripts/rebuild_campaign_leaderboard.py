@@ -0,0 +1,26 @@
+"""Rebuild script to recount campaign_leaderboard referrals from the referred_users table.
+
+Usage: run this script from the project root in the same Python env used by the project.
+    python -m whatsapp_agent.scripts.rebuild_campaign_leaderboard [campaign_id]
+
+Steps:
+1. Create the tables and functions from schema/db_scheema_deffinitions/campaign_leaderboard.sql
+   and referred_users.sql, and run migrate_referrals.py once
+2. Run this script whenever the counts may have drifted (it is safe to re-run)
+
+Without a campaign_id every campaign is rebuilt.
+"""
+import sys
+from whatsapp_agent.database.referral import ReferralDataBase
+from whatsapp_agent._debug import Logger, enable_verbose_logging
+
+
+def rebuild(campaign_id: str = None):
+    referral_db = ReferralDataBase()
+    rebuilt = referral_db.rebuild_leaderboard(campaign_id)
+    Logger.info(f"Rebuilt {rebuilt} leaderboard entries for {campaign_id or 'all campaigns'}")
+
+
+if __name__ == '__main__':
+    enable_verbose_logging()
+    rebuild(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,144 @@
+"""Train and evaluate the local intent fast path from logged router decisions.
+
+Usage: run from the project root in the same Python env used by the project.
+
+1. Set INTENT_ROUTER_LOG_PATH so routing decisions are appended to a JSONL file. Rule
+   decisions are used for training; agreement is only measured against the LLM router
+2. Train:     python -m whatsapp_agent.scripts.train_intent_classifier train decisions.jsonl intent_model.json
+3. Evaluate:  python -m whatsapp_agent.scripts.train_intent_classifier evaluate intent_model.json holdout.jsonl
+4. Point INTENT_FAST_PATH_MODEL_PATH at the model; the fast path runs in shadow mode
+   (INTENT_FAST_PATH_COMPARE) until INTENT_FAST_PATH_ENABLED is set after reviewing agreement
+"""
+import random
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import typer
+from rich.console import Console
+from rich.table import Table
+from whatsapp_agent.agents.conversation_intent_router.fast_path import (
+    AGENTS,
+    DEFAULT_THRESHOLD,
+    MIN_MODEL_TOKENS,
+    RULES,
+    HashedNGramModel,
+    _agent_for,
+    is_router_label,
+    load_samples,
+    tokenize,
+)
+
+app = typer.Typer(
+    name="intent-classifier",
+    help="Train and evaluate the local intent fast path",
+    add_completion=False,
+)
+console = Console()
+
+
+def _rule_decision(sample: Dict[str, Any]) -> Optional[str]:
+    for name, pattern, intent in RULES:
+        if pattern.search(sample["text"] or ""):
+            return _agent_for(intent, sample.get("customer_type"))
+    return None
+
+
+def _evaluate(model: Optional[HashedNGramModel], samples: List[Dict[str, Any]], threshold: float):
+    """Print coverage and accuracy of the rules, the model, and the combined fast path."""
+    confusion = Counter()
+    stats = Counter()
+    for sample in samples:
+        expected = sample["next_agent"]
+        predicted = _rule_decision(sample)
+        source = "rule"
+        if predicted is None and model is not None and len(tokenize(sample["text"])) >= MIN_MODEL_TOKENS:
+            label, confidence = model.predict(sample["text"], sample.get("customer_type"))
+            if confidence >= threshold:
+                predicted = _agent_for(label, sample.get("customer_type"))
+                source = "model"
+        if predicted is None:
+            stats["fallback"] += 1
+            continue
+        stats[source] += 1
+        stats[f"{source}_correct"] += predicted == expected
+        confusion[(expected, predicted)] += 1
+
+    total = len(samples) or 1
+    summary = Table(title=f"Fast path at threshold {threshold}")
+    summary.add_column("Stage")
+    summary.add_column("Coverage", justify="right")
+    summary.add_column("Agreement with router", justify="right")
+    for source in ("rule", "model"):
+        covered = stats[source]
+        summary.add_row(
+            source,
+            f"{covered / total:.1%}",
+            f"{stats[f'{source}_correct'] / covered:.1%}" if covered else "-",
+        )
+    covered = stats["rule"] + stats["model"]
+    correct = stats["rule_correct"] + stats["model_correct"]
+    summary.add_row("combined", f"{covered / total:.1%}", f"{correct / covered:.1%}" if covered else "-")
+    summary.add_row("LLM fallback", f"{stats['fallback'] / total:.1%}", "-")
+    console.print(summary)
+
+    matrix = Table(title="Router decision (rows) vs fast path (columns)")
+    matrix.add_column("")
+    for agent in AGENTS:
+        matrix.add_column(agent, justify="right")
+    for expected in AGENTS:
+        matrix.add_row(expected, *(str(confusion[(expected, predicted)]) for predicted in AGENTS))
+    console.print(matrix)
+
+
+@app.command()
+def train(
+    data: str = typer.Argument(..., help="JSONL decision log written by the router"),
+    output: str = typer.Argument(..., help="Where to write the model JSON"),
+    epochs: int = typer.Option(10, help="Training epochs"),
+    learning_rate: float = typer.Option(0.5, help="Initial SGD learning rate"),
+    holdout: float = typer.Option(0.2, help="Fraction of samples kept back for evaluation"),
+    threshold: float = typer.Option(DEFAULT_THRESHOLD, help="Confidence threshold used for the evaluation"),
+    seed: int = typer.Option(13, help="Random seed for the split and shuffling"),
+):
+    """Train the hashed n-gram model and report held-out agreement."""
+    samples = [s for s in load_samples(data) if s.get("next_agent") in AGENTS and s.get("text")]
+    # Model-routed samples are the model's own output; rule-routed ones only train
+    router_samples = [s for s in samples if is_router_label(s)]
+    rule_samples = [s for s in samples if s.get("source") == "rule"]
+    if not router_samples and not rule_samples:
+        console.print(f"[red]No usable samples in {data}[/red]")
+        raise typer.Exit(1)
+
+    random.Random(seed).shuffle(router_samples)
+    split = int(len(router_samples) * (1 - holdout))
+    train_set, test_set = router_samples[:split] + rule_samples, router_samples[split:]
+    console.print(f"Training on {len(train_set)} samples, evaluating on {len(test_set)}")
+    console.print(f"Label counts: {dict(Counter(s['next_agent'] for s in train_set))}")
+
+    model = HashedNGramModel().fit(train_set, epochs=epochs, learning_rate=learning_rate, seed=seed)
+    model.save(output)
+    console.print(f"[green]Saved model to {output}[/green]")
+
+    if test_set:
+        _evaluate(model, test_set, threshold)
+
+
+@app.command()
+def evaluate(
+    model_path: str = typer.Argument(..., help="Model JSON produced by train"),
+    data: str = typer.Argument(..., help="JSONL decision log to evaluate against"),
+    threshold: float = typer.Option(DEFAULT_THRESHOLD, help="Confidence threshold"),
+):
+    """Measure how often the fast path would decide, and how often it agrees with the router."""
+    samples = [
+        s for s in load_samples(data)
+        if s.get("next_agent") in AGENTS and s.get("text") and is_router_label(s)
+    ]
+    _evaluate(HashedNGramModel.load(model_path), samples, threshold)
+
+
+def main():
+    app()
+
+
+if __name__ == "__main__":
+    main()
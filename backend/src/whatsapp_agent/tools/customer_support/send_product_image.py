@@ -1,6 +1,6 @@
 from agents import function_tool
 from whatsapp_agent.utils.wa_instance import wa
-from whatsapp_agent.database.chat_history import ChatHistoryDataBase
+from whatsapp_agent.database.repositories import repositories
 from whatsapp_agent.schema.chat_history import MessageSchema
 from whatsapp_agent.utils.current_time import _get_current_karachi_time_str
 from whatsapp_agent.utils.websocket import websocket_manager
@@ -27,14 +27,13 @@ async def send_product_image_tool(phone_no:str, caption: str, product_image_url:
         content_text = f"![{caption}]({product_image_url})"
         
         # Store in chat history
-        chat_history_db = ChatHistoryDataBase()
         message = MessageSchema(
             time_stamp=_get_current_karachi_time_str(),
             content=content_text,
             message_type="image",
             sender="agent"
         )
-        chat_history_db.add_or_create_message(phone_no, message)
+        await repositories.chat_history.record_message(phone_no, message)
         Logger.info(f"Image message stored in chat history for {phone_no}")
         
         # Stream to dashboard
@@ -7,6 +7,7 @@ from enum import Enum
 from whatsapp_agent.utils.vector_store import VectorStoreManager
 from whatsapp_agent.database.faq_vector_storage import FAQVectorDB
 from whatsapp_agent.schema.vectore_store import FAQVector
+from whatsapp_agent.utils.semantic_cache import semantic_answer_cache
 from whatsapp_agent._debug import Logger
 
 
@@ -74,8 +75,8 @@ class BackgroundProcessor:
             Logger.info(f"Starting FAQ processing for task {task_id}")
 
             # Get or create vector store
-            from whatsapp_agent.routes.upload import _get_or_create_store
-            faq_store_id = _get_or_create_store("FAQ-Vector-Store")
+            from whatsapp_agent.routes.upload import _ensure_store
+            faq_store_id = await _ensure_store("FAQ-Vector-Store")
 
             for i, data in enumerate(faq_data):
                 try:
@@ -122,6 +123,9 @@ class BackgroundProcessor:
                 # Update progress
                 task.processed_items = i + 1
 
+            # Answers cached before the upload may be outdated now
+            await semantic_answer_cache.knowledge_base_changed("FAQs uploaded")
+
             # Mark as completed
             task.status = TaskStatus.COMPLETED
             task.completed_at = datetime.now()
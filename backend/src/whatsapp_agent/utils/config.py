@@ -1,7 +1,6 @@
 import os
 from dotenv import load_dotenv
 from whatsapp_agent._debug import Logger
-from openai import AsyncOpenAI
 
 load_dotenv()
 
@@ -10,6 +9,7 @@ class Config:
     
     _supabase_url = os.environ.get("SUPABASE_URL")
     _supabase_service_role_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    _supabase_db_url = os.environ.get("SUPABASE_DB_URL")  # Direct Postgres DSN used by the asyncpg backend
     
     _credentials_manager = None
     _version = 0
@@ -18,21 +18,23 @@ class Config:
 
     @classmethod
     def get_openai_client(cls,sync:bool=False):
+        """
+        Return the process-wide OpenAI client (AsyncOpenAI, or OpenAI when sync=True).
+        Clients are shared so their HTTP connections are reused; see OpenAIClientPool.
+        """
+        from whatsapp_agent.utils.openai_clients import openai_client_pool
+
+        client = openai_client_pool.cached(cls._version, sync)
+        if client is not None:
+            return client
+
         api_key = cls.get("OPENAI_API_KEY")
         
         if not api_key:
             Logger.warning("OPENAI_API_KEY missing; skipping OpenAI client setup")
             return None
-        
-        if sync:
-            from openai import OpenAI
-            Logger.info("Using OpenAI API key for sync client")
-            return OpenAI(api_key=api_key)
-        else:    
-            return AsyncOpenAI(
-                api_key=api_key,
-                base_url="https://api.openai.com/v1"
-            )
+
+        return openai_client_pool.get(cls._version, api_key, sync)
 
     @classmethod
     def _get_credentials_manager(cls):
@@ -61,6 +63,8 @@ class Config:
             return cls._supabase_url
         elif key == "SUPABASE_SERVICE_ROLE_KEY":
             return cls._supabase_service_role_key
+        elif key == "SUPABASE_DB_URL":
+            return cls._supabase_db_url or default
         
         # For all other credentials, use the credentials manager
         credentials_manager = cls._get_credentials_manager()
@@ -70,7 +74,7 @@ class Config:
     @classmethod
     def set(cls, key, value):
         """Set a configuration value and update it in the database"""
-        if key == "SUPABASE_URL" or key == "SUPABASE_SERVICE_ROLE_KEY":
+        if key in ("SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", "SUPABASE_DB_URL"):
             raise ValueError(f"Cannot set {key} - Read Only environment variable")
         
         # For all other credentials, use the credentials manager
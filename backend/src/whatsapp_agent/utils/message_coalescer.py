@@ -0,0 +1,134 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent._debug import Logger
+
+# 0 disables coalescing: every message is flushed on its own straight away
+DEFAULT_WINDOW_SECONDS = 0.0
+DEFAULT_MAX_WAIT_SECONDS = 6.0
+
+
+@dataclass
+class _PendingBatch:
+    flush: Callable[[List[Any]], Optional[asyncio.Future]]
+    future: asyncio.Future
+    items: List[Any] = field(default_factory=list)
+    first_at: float = field(default_factory=time.monotonic)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class MessageCoalescer:
+    """
+    Debounces bursts of messages from the same phone number into one batch.
+
+    Each new message restarts a MESSAGE_COALESCE_WINDOW_SECONDS timer; when it expires
+    (or MESSAGE_COALESCE_MAX_WAIT_SECONDS has passed since the first message) the batch
+    is handed to its flush callback in arrival order.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, _PendingBatch] = {}
+        self._batches = 0
+        self._messages = 0
+
+    @staticmethod
+    def _seconds(key: str, default: float) -> float:
+        try:
+            return max(0.0, float(Config.get(key, default)))
+        except (TypeError, ValueError):
+            return default
+
+    def window(self) -> float:
+        return self._seconds("MESSAGE_COALESCE_WINDOW_SECONDS", DEFAULT_WINDOW_SECONDS)
+
+    def max_wait(self) -> float:
+        return self._seconds("MESSAGE_COALESCE_MAX_WAIT_SECONDS", DEFAULT_MAX_WAIT_SECONDS)
+
+    def add(self, phone_number: str, item: Any, flush: Callable[[List[Any]], Optional[asyncio.Future]]) -> asyncio.Future:
+        """
+        Add a message to the phone's pending batch, flushing it when the window closes.
+        Returns a future that settles like the future returned by `flush` for its batch.
+        """
+        loop = asyncio.get_running_loop()
+        window = self.window()
+        if window <= 0 and phone_number not in self._pending:
+            batch = _PendingBatch(flush=flush, future=loop.create_future(), items=[item])
+            self._flush_batch(phone_number, batch)
+            return batch.future
+
+        batch = self._pending.get(phone_number)
+        if batch is None:
+            batch = self._pending[phone_number] = _PendingBatch(flush=flush, future=loop.create_future())
+        batch.items.append(item)
+
+        if batch.timer is not None:
+            batch.timer.cancel()
+
+        remaining = self.max_wait() - (time.monotonic() - batch.first_at)
+        delay = min(window, remaining)
+        if delay <= 0:
+            self.flush(phone_number)
+        else:
+            batch.timer = loop.call_later(delay, self.flush, phone_number)
+        return batch.future
+
+    def flush(self, phone_number: str):
+        """Hand the pending batch of a phone number to its flush callback."""
+        batch = self._pending.pop(phone_number, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        self._flush_batch(phone_number, batch)
+
+    def _flush_batch(self, phone_number: str, batch: _PendingBatch):
+        self._batches += 1
+        self._messages += len(batch.items)
+        if len(batch.items) > 1:
+            Logger.info(f"Coalesced {len(batch.items)} messages from {phone_number}")
+        try:
+            result = batch.flush(batch.items)
+        except Exception as e:
+            Logger.error(f"{__name__}: flush -> Failed to flush messages for {phone_number}: {e}")
+            batch.future.set_exception(e)
+            batch.future.exception()
+            return
+
+        if isinstance(result, asyncio.Future):
+            result.add_done_callback(lambda done: self._settle(batch.future, done))
+        else:
+            batch.future.set_result(result)
+
+    @staticmethod
+    def _settle(target: asyncio.Future, source: asyncio.Future):
+        """Copy the outcome of `source` onto `target`."""
+        if target.done():
+            return
+        if source.cancelled():
+            target.cancel()
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+            # Mark the exception as retrieved for callers that never await it
+            target.exception()
+        else:
+            target.set_result(source.result())
+
+    def flush_all(self):
+        """Flush every pending batch (used on shutdown)."""
+        for phone_number in list(self._pending):
+            self.flush(phone_number)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of coalescing metrics."""
+        return {
+            "window_seconds": self.window(),
+            "pending_conversations": len(self._pending),
+            "batches": self._batches,
+            "messages": self._messages,
+            "merged_messages": self._messages - self._batches,
+        }
+
+
+message_coalescer = MessageCoalescer()
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent._debug import Logger
+
+DEFAULT_MAX_CONCURRENCY = 10
+
+# When set to a list, handlers append the futures of the jobs they queue so the
+# caller (e.g. the webhook queue worker) can tell when an update was fully handled
+dispatched_jobs: ContextVar[Optional[List[asyncio.Future]]] = ContextVar("dispatched_jobs", default=None)
+
+
+@dataclass
+class _Job:
+    run: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class MessageDispatcher:
+    """
+    Runs inbound message work with one serial queue per phone number.
+
+    Messages from the same customer are processed strictly in arrival order, while
+    different customers run in parallel up to MESSAGE_MAX_CONCURRENCY (read from Config
+    on every acquisition, so changes apply without a restart). A phone's worker task is
+    created on its first message and exits once its queue is empty.
+    """
+
+    def __init__(self):
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._slots: Optional[asyncio.Condition] = None
+        self._running = 0
+
+        # Metrics
+        self._enqueued = 0
+        self._processed = 0
+        self._failed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._max_depth = 0
+
+    @staticmethod
+    def _max_concurrency() -> int:
+        try:
+            return max(1, int(Config.get("MESSAGE_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)))
+        except (TypeError, ValueError):
+            return DEFAULT_MAX_CONCURRENCY
+
+    def _get_slots(self) -> asyncio.Condition:
+        # Created lazily so it binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Condition()
+        return self._slots
+
+    async def _acquire_slot(self):
+        slots = self._get_slots()
+        async with slots:
+            await slots.wait_for(lambda: self._running < self._max_concurrency())
+            self._running += 1
+
+    async def _release_slot(self):
+        slots = self._get_slots()
+        async with slots:
+            self._running -= 1
+            slots.notify()
+
+    def submit(self, phone_number: str, run: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """
+        Queue `run` behind earlier work for the same phone number.
+        Returns a future with the result; callers may await it or fire and forget.
+        """
+        loop = asyncio.get_running_loop()
+        job = _Job(run=run, future=loop.create_future())
+
+        queue = self._queues.get(phone_number)
+        if queue is None:
+            queue = self._queues[phone_number] = asyncio.Queue()
+        queue.put_nowait(job)
+
+        self._enqueued += 1
+        self._max_depth = max(self._max_depth, self.queue_depth())
+
+        if phone_number not in self._workers:
+            self._workers[phone_number] = asyncio.create_task(self._worker(phone_number, queue))
+        return job.future
+
+    async def _worker(self, phone_number: str, queue: asyncio.Queue):
+        try:
+            while not queue.empty():
+                job: _Job = queue.get_nowait()
+                await self._acquire_slot()
+                try:
+                    wait = time.monotonic() - job.enqueued_at
+                    self._total_wait += wait
+                    self._max_wait = max(self._max_wait, wait)
+                    Logger.debug(f"Dispatching message for {phone_number} after waiting {wait:.3f}s")
+
+                    result = await job.run()
+                    if not job.future.done():
+                        job.future.set_result(result)
+                    self._processed += 1
+                except Exception as e:
+                    self._failed += 1
+                    Logger.error(f"{__name__}: _worker -> Message processing failed for {phone_number}: {e}")
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                        # Mark the exception as retrieved for fire-and-forget callers
+                        job.future.exception()
+                finally:
+                    queue.task_done()
+                    await self._release_slot()
+        finally:
+            # No await between the empty check and removal, so no job can be stranded
+            self._workers.pop(phone_number, None)
+            self._queues.pop(phone_number, None)
+
+    def queue_depth(self, phone_number: Optional[str] = None) -> int:
+        """Number of queued (not yet started) jobs, for one phone or overall."""
+        if phone_number is not None:
+            queue = self._queues.get(phone_number)
+            return queue.qsize() if queue else 0
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of dispatcher metrics."""
+        started = self._processed + self._failed
+        return {
+            "max_concurrency": self._max_concurrency(),
+            "running": self._running,
+            "active_conversations": len(self._workers),
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self._max_depth,
+            "enqueued": self._enqueued,
+            "processed": self._processed,
+            "failed": self._failed,
+            "avg_wait_seconds": round(self._total_wait / started, 4) if started else 0.0,
+            "max_wait_seconds": round(self._max_wait, 4),
+        }
+
+    async def shutdown(self, timeout: float = 30.0):
+        """Wait for queued work to finish, then cancel whatever is left."""
+        workers = list(self._workers.values())
+        if not workers:
+            return
+        Logger.info(f"Waiting for {len(workers)} conversation queues to drain")
+        done, pending = await asyncio.wait(workers, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            Logger.warning(f"Cancelled {len(pending)} conversation queues on shutdown")
+
+
+message_dispatcher = MessageDispatcher()
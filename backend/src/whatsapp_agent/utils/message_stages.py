@@ -0,0 +1,144 @@
+"""
+Which steps of answering a WhatsApp message already finished, keyed by its message ID (wamid).
+
+The webhook queue replays an update when one of its message jobs failed, and again on the
+next start for updates left in flight. Answering a message is not idempotent (history rows,
+message stats, an LLM run and a WhatsApp send), so the bot records each step here and a
+replay only redoes the steps that did not finish.
+
+Stages, in order:
+- customer_saved: the customer message is stored in chat history
+- reply: the reply text, recorded before it is stored so a replay does not run the agent again
+- reply_saved: the reply is stored in chat history and pushed to the dashboard
+- reply_sent: the reply was sent on WhatsApp
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent._debug import Logger
+
+DEFAULT_DB_PATH = "webhook_queue.db"
+
+CUSTOMER_SAVED = "customer_saved"
+REPLY = "reply"
+REPLY_SAVED = "reply_saved"
+REPLY_SENT = "reply_sent"
+
+
+class MessageStageLog:
+    """SQLite-backed record of finished stages. Methods are blocking; call them in a thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS message_stages (
+                wamid TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                value TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (wamid, stage)
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_message_stages_updated_at ON message_stages (updated_at)"
+        )
+
+    def get(self, wamids: list) -> Dict[str, Dict[str, Optional[str]]]:
+        """Finished stages (and their values) per wamid."""
+        if not wamids:
+            return {}
+        placeholders = ", ".join("?" for _ in wamids)
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT wamid, stage, value FROM message_stages WHERE wamid IN ({placeholders})",
+                list(wamids),
+            ).fetchall()
+        stages: Dict[str, Dict[str, Optional[str]]] = {}
+        for wamid, stage, value in rows:
+            stages.setdefault(wamid, {})[stage] = value
+        return stages
+
+    def mark(self, wamid: str, stage: str, value: Optional[str] = None):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO message_stages (wamid, stage, value, updated_at) VALUES (?, ?, ?, ?)",
+                (wamid, stage, value, time.time()),
+            )
+
+    def purge(self, older_than: float) -> int:
+        """Forget messages last touched more than `older_than` seconds ago."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM message_stages WHERE updated_at < ?",
+                (time.time() - older_than,),
+            )
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class MessageStages:
+    """
+    Async access to the MessageStageLog.
+
+    Only the webhook queue replays messages, so nothing is recorded while it is disabled.
+    Storage errors are logged and read as "not done": a replay may then repeat a step,
+    but a message is never skipped.
+    """
+
+    def __init__(self):
+        self._log: Optional[MessageStageLog] = None
+
+    @staticmethod
+    def enabled() -> bool:
+        value = Config.get("WEBHOOK_QUEUE_ENABLED", True)
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        return bool(value)
+
+    def _get_log(self) -> MessageStageLog:
+        if self._log is None:
+            self._log = MessageStageLog(Config.get("WEBHOOK_QUEUE_PATH", DEFAULT_DB_PATH) or DEFAULT_DB_PATH)
+        return self._log
+
+    async def get(self, *wamids: Optional[str]) -> Dict[str, Dict[str, Optional[str]]]:
+        wamids = [wamid for wamid in wamids if wamid]
+        if not wamids or not self.enabled():
+            return {}
+        try:
+            return await asyncio.to_thread(self._get_log().get, wamids)
+        except Exception as e:
+            Logger.warning(f"{__name__}: get -> Failed to read message stages: {e}")
+            return {}
+
+    async def mark(self, wamid: Optional[str], stage: str, value: Optional[str] = None):
+        if not wamid or not self.enabled():
+            return
+        try:
+            await asyncio.to_thread(self._get_log().mark, wamid, stage, value)
+        except Exception as e:
+            Logger.warning(f"{__name__}: mark -> Failed to record stage {stage} of {wamid}: {e}")
+
+    async def purge(self, older_than: float) -> int:
+        if not self.enabled():
+            return 0
+        return await asyncio.to_thread(self._get_log().purge, older_than)
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+message_stages = MessageStages()
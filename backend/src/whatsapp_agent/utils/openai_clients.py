@@ -0,0 +1,190 @@
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Tuple
+import httpx
+from openai import AsyncOpenAI, OpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient
+from whatsapp_agent._debug import Logger
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+# OpenAI's edge closes idle connections after a few minutes; stay below that
+DEFAULT_KEEPALIVE_EXPIRY_SECONDS = 120
+# Requests started on a replaced client are given this long to finish before it is closed
+DEFAULT_CLOSE_GRACE_SECONDS = 60
+
+
+def _config_float(key: str, default: float) -> float:
+    # Imported here because Config itself delegates to this module
+    from whatsapp_agent.utils.config import Config
+    try:
+        return float(Config.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class ConnectionStats:
+    requests: int = 0
+    connections_opened: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        reused = max(0, self.requests - self.connections_opened)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "reused_connection_ratio": round(reused / self.requests, 4) if self.requests else None,
+        }
+
+
+@dataclass
+class _PooledClient:
+    client: Any
+    version: int
+    api_key: str
+    stats: ConnectionStats = field(default_factory=ConnectionStats)
+
+
+class OpenAIClientPool:
+    """
+    Long-lived OpenAI clients shared by the whole process, one async and one sync.
+
+    Every client owns an httpx connection pool, so building a client per call (as agents,
+    transcription and vector store code used to) paid TCP/TLS setup on every request.
+    Clients are keyed by Config.get_version() and rebuilt only when the config changes and
+    the API key actually differs; the replaced client is closed after OPENAI_CLIENT_CLOSE_GRACE_SECONDS
+    so requests already in flight can finish. Keep-alive is tuned with OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS and OPENAI_KEEPALIVE_EXPIRY_SECONDS.
+
+    New connections are counted through httpcore's trace extension, so the metrics show
+    how many requests rode on an already open connection.
+    """
+
+    def __init__(self):
+        self._clients: Dict[bool, _PooledClient] = {}
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "reused": 0, "kept_on_config_change": 0, "replaced": 0, "closed": 0}
+        # Totals of clients that have been replaced, so metrics survive key rotation
+        self._retired = ConnectionStats()
+
+    @staticmethod
+    def _limits() -> Tuple[httpx.Limits, httpx.Timeout]:
+        limits = httpx.Limits(
+            max_connections=int(_config_float("OPENAI_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+            max_keepalive_connections=int(_config_float("OPENAI_MAX_KEEPALIVE_CONNECTIONS", DEFAULT_MAX_KEEPALIVE_CONNECTIONS)),
+            keepalive_expiry=_config_float("OPENAI_KEEPALIVE_EXPIRY_SECONDS", DEFAULT_KEEPALIVE_EXPIRY_SECONDS),
+        )
+        # Long reads for streamed responses, but fail fast when the API is unreachable
+        return limits, httpx.Timeout(600.0, connect=5.0)
+
+    def _build(self, api_key: str, sync: bool, stats: ConnectionStats):
+        limits, timeout = self._limits()
+
+        if sync:
+            def trace(event_name: str, info: Dict[str, Any]):
+                if event_name == "connection.connect_tcp.complete":
+                    stats.connections_opened += 1
+
+            def on_request(request: httpx.Request):
+                stats.requests += 1
+                request.extensions["trace"] = trace
+
+            http_client = DefaultHttpxClient(limits=limits, timeout=timeout, event_hooks={"request": [on_request]})
+            return OpenAI(api_key=api_key, base_url=OPENAI_BASE_URL, http_client=http_client)
+
+        async def async_trace(event_name: str, info: Dict[str, Any]):
+            if event_name == "connection.connect_tcp.complete":
+                stats.connections_opened += 1
+
+        async def async_on_request(request: httpx.Request):
+            stats.requests += 1
+            request.extensions["trace"] = async_trace
+
+        http_client = DefaultAsyncHttpxClient(limits=limits, timeout=timeout, event_hooks={"request": [async_on_request]})
+        return AsyncOpenAI(api_key=api_key, base_url=OPENAI_BASE_URL, http_client=http_client)
+
+    def get(self, version: int, api_key: str, sync: bool = False):
+        """Return the shared client for `version`, replacing it if the API key changed."""
+        with self._lock:
+            pooled = self._clients.get(sync)
+            if pooled is not None and pooled.api_key == api_key:
+                # A config change that did not touch the key keeps the warm connections
+                pooled.version = version
+                self._stats["kept_on_config_change"] += 1
+                return pooled.client
+
+            stats = ConnectionStats()
+            self._clients[sync] = _PooledClient(self._build(api_key, sync, stats), version, api_key, stats)
+            self._stats["created"] += 1
+            Logger.info(f"Created shared {'sync' if sync else 'async'} OpenAI client for config version {version}")
+
+        if pooled is not None:
+            self._stats["replaced"] += 1
+            self._retire(pooled, sync)
+        return self._clients[sync].client
+
+    def cached(self, version: int, sync: bool = False):
+        """Return the shared client if it was checked against `version`, without reading the key."""
+        pooled = self._clients.get(sync)
+        if pooled is None or pooled.version != version:
+            return None
+        self._stats["reused"] += 1
+        return pooled.client
+
+    def _retire(self, pooled: _PooledClient, sync: bool):
+        grace = _config_float("OPENAI_CLIENT_CLOSE_GRACE_SECONDS", DEFAULT_CLOSE_GRACE_SECONDS)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop to schedule on; a timer thread closes it instead
+            timer = threading.Timer(grace, self._close_sync, args=(pooled,))
+            timer.daemon = True
+            timer.start()
+            return
+
+        if sync:
+            loop.call_later(grace, lambda: loop.run_in_executor(None, self._close_sync, pooled))
+        else:
+            loop.call_later(grace, lambda: loop.create_task(self._close_async(pooled)))
+
+    def _record_closed(self, pooled: _PooledClient):
+        self._retired.requests += pooled.stats.requests
+        self._retired.connections_opened += pooled.stats.connections_opened
+        self._stats["closed"] += 1
+
+    def _close_sync(self, pooled: _PooledClient):
+        try:
+            pooled.client.close()
+        except Exception as e:
+            Logger.warning(f"{__name__}: _close_sync -> Failed to close replaced OpenAI client: {e}")
+        self._record_closed(pooled)
+
+    async def _close_async(self, pooled: _PooledClient):
+        try:
+            await pooled.client.close()
+        except Exception as e:
+            Logger.warning(f"{__name__}: _close_async -> Failed to close replaced OpenAI client: {e}")
+        self._record_closed(pooled)
+
+    async def close(self):
+        """Close every shared client (called on application shutdown)."""
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for sync, pooled in clients.items():
+            if sync:
+                await asyncio.to_thread(self._close_sync, pooled)
+            else:
+                await self._close_async(pooled)
+
+    def metrics(self) -> Dict[str, Any]:
+        total = ConnectionStats(self._retired.requests, self._retired.connections_opened)
+        clients = {}
+        for sync, pooled in self._clients.items():
+            total.requests += pooled.stats.requests
+            total.connections_opened += pooled.stats.connections_opened
+            clients["sync" if sync else "async"] = {"config_version": pooled.version, **pooled.stats.to_dict()}
+        return {**self._stats, "clients": clients, "total": total.to_dict()}
+
+
+openai_client_pool = OpenAIClientPool()
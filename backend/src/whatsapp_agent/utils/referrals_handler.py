@@ -5,7 +5,7 @@ from pydantic import ValidationError
 from typing import Optional
 from fastapi import HTTPException
 from whatsapp_agent.database.referral import ReferralDataBase
-from whatsapp_agent.database.campaign import CampaignDataBase
+from whatsapp_agent.database.repositories import repositories
 from whatsapp_agent.schema.referrals import ReferralSchema, ReferredUserSchema, PointsSchema
 from pywa_async.types.templates import BodyText, TemplateLanguage
 from whatsapp_agent.schema.customer_schema import CustomerSchema
@@ -13,7 +13,6 @@ from whatsapp_agent.context.global_context import GlobalContext
 from whatsapp_agent.utils.wa_instance import wa
 from pywa_async.types import BusinessPhoneNumber
 from whatsapp_agent.utils.current_time import _get_current_karachi_time_str
-from whatsapp_agent.utils.campaign_handler import CampaignHandler
 from whatsapp_agent._debug import Logger
 from whatsapp_agent.utils.config import Config
 
@@ -39,27 +38,14 @@ class ReferralHandler:
             Logger.error(f"{__name__}: _extract_codes -> Failed to extract codes: {e}")
             return None, None
 
-    def _check_existing_referral(self, phone_number: str, referral_code: str, campaign_code: str) -> bool:
+    async def _check_existing_referral(self, phone_number: str, referral_code: str, campaign_code: str) -> bool:
         """
-        Checks if the phone number already exists in referred_users
-        for the given referral code.
+        Checks if the phone number already joined the campaign
+        through the given referral code (primary key lookup on referred_users,
+        or a scan of the legacy JSON column until that table is installed).
         """
         try:
-            referral = referral_db.get_referral_by_code(referral_code)
-            Logger.info(f"_check_existing_referral: referral data: {referral}")
-
-            if not referral:
-                return True  # Possibly treat as already existing or invalid code
-
-            for user in referral.get('referred_users', []):
-                if ((user.get('phone_number', None) == phone_number) and
-                (user.get('campaign_id', None) == campaign_code)):
-                    return True
-            return False
-
-        except ValidationError as e:
-            Logger.error(f"{__name__}: _check_existing_referral -> Referral data invalid in DB: {e.json()}")
-            return True
+            return await repositories.referrals.has_referred_user(referral_code, campaign_code, phone_number)
         except Exception as e:
             Logger.error(f"{__name__}: _check_existing_referral -> Unexpected error: {e}")
             return True
@@ -73,57 +59,49 @@ class ReferralHandler:
             Logger.error(f"{__name__}: _generate_referral_code -> Error generating code: {e}")
             return "ERROR"
 
-    def _add_user_to_referral(self, phone_number: str, referral_code: str, campaign_code: str):
+    async def _increment_referral_count(self, referral_code: str, phone_number: str, campaign_code: str, send_message: bool = False) -> None:
         """
-        Adds a user to the referral list.
+        Adds the user to the referral and increments the referrer's points for the campaign.
+        Both happen in one idempotent call, so a repeated join awards nothing.
         """
         try:
-            referral_db.add_referred_user(referral_code, ReferredUserSchema(
+            result = await repositories.referrals.record_referral(referral_code, ReferredUserSchema(
                 phone_number=phone_number,
                 time_stamp=_get_current_karachi_time_str(),
                 campaign_id=campaign_code
             ))
-            Logger.info(f"User {phone_number} added to referral {referral_code}")
-        except ValidationError as e:
-            Logger.error(f"{__name__}: _add_user_to_referral -> Validation error adding referred user: {e.json()}")
-        except Exception as e:
-            Logger.error(f"{__name__}: _add_user_to_referral -> Error adding user to referral: {e}")
 
-    async def _increment_referral_count(self, referral_code: str, phone_number: str, campaign_code: str, send_message: bool = False) -> None:
-        """
-        Increments the referral count for a given referral code.
-        """
-        try:
-            self._add_user_to_referral(phone_number, referral_code, campaign_code)
-            referral = referral_db.get_referral_by_code(referral_code)
-
-            if not referral:
+            if not result:
                 Logger.error(f"{__name__}: _increment_referral_count -> Referral not found for code {referral_code}")
                 return
+            if not result.get("added"):
+                Logger.info(f"User {phone_number} was already referred by {referral_code}")
+                return
+            Logger.info(f"User {phone_number} added to referral {referral_code}")
 
-            referral_db.update_referral(referral_code, campaign_code)  # Increment
-            campaign_db = CampaignDataBase()
-            campaign = campaign_db.get_campaign_by_id(campaign_code)
-            if send_message and referral.get("referrer_phone"):
+            campaign = await repositories.campaigns.get_campaign_by_id(campaign_code)
+            if send_message and result.get("referrer_phone"):
                 await wa.send_template(
-                    to=referral["referrer_phone"],
+                    to=result["referrer_phone"],
                     name="referal_point_increment_update",
                     language=TemplateLanguage.ENGLISH,
                     params=[
                         BodyText.params(campaign_name=campaign.name),
                     ],
                 )
+        except ValidationError as e:
+            Logger.error(f"{__name__}: _increment_referral_count -> Validation error adding referred user: {e.json()}")
         except Exception as e:
             Logger.error(f"{__name__}: _increment_referral_count -> Error incrementing referral count: {e}")
 
     @staticmethod
-    def _check_campaign_status(campaign_code: str) -> bool:
+    async def _check_campaign_status(campaign_code: str) -> bool:
         """
         Checks if a campaign exists.
         """
         try:
-            campaign = CampaignHandler()
-            return campaign.check_campaign_status(campaign_code)
+            campaign = await repositories.campaigns.get_campaign_by_id(campaign_code)
+            return campaign.status if campaign else False
         except Exception as e:
             Logger.error(f"{__name__}: _check_campaign_status -> Error checking campaign status: {e}")
             return False
@@ -139,20 +117,20 @@ class ReferralHandler:
             if not campaign_code:
                 Logger.warning("Invalid or missing campaign code.")
 
-            if not self._check_campaign_status(campaign_code):
+            if not await self._check_campaign_status(campaign_code):
                 Logger.warning("Campaign not active or invalid.")
                 
             if not referral_code:
                 Logger.warning("Invalid or missing referral code.")
 
-            if self._check_existing_referral(phone_number, referral_code, campaign_code):
+            if await self._check_existing_referral(phone_number, referral_code, campaign_code):
                 Logger.warning("This user has already been referred with this code.")
             else:
                 # Increment referral count for the referrer
                 await self._increment_referral_count(referral_code, phone_number, campaign_code, send_message=True)
 
             # Check if referral exists for the phone number
-            referral = referral_db.get_referral_by_phone_number(phone_number)
+            referral = await repositories.referrals.get_referral_by_phone_number(phone_number)
             DEFAULT_PHONE_NUMBER: BusinessPhoneNumber = await wa.get_business_phone_number()
             if not DEFAULT_PHONE_NUMBER or not DEFAULT_PHONE_NUMBER.display_phone_number:
                 raise HTTPException(status_code=500, detail="Unable to get business phone number")
@@ -180,7 +158,7 @@ class ReferralHandler:
 
                 # Save to DB
                 try:
-                    referral_db.add_referral(new_referral)
+                    await repositories.referrals.add_referral(new_referral)
                 except Exception as e:
                     Logger.error(f"{__name__}: referral_workflow -> Failed to add new referral: {e}")
 
@@ -238,12 +216,12 @@ class ReferralHandler:
 
         return referral['referral_code']
     
-    def check_or_create_referral(self, customer: CustomerSchema):
+    async def check_or_create_referral(self, customer: CustomerSchema):
         phone_number = customer.phone_number
-        referral = referral_db.get_referral_by_phone_number(phone_number)
+        referral = await repositories.referrals.get_referral_by_phone_number(phone_number)
         if not referral:
             Logger.warning("No existing referral found, creating new one.")
-            referral = referral_db.add_referral(
+            referral = await repositories.referrals.add_referral(
                 ReferralSchema(
                     total_points=[],
                     referrer_id=phone_number,
@@ -0,0 +1,311 @@
+import asyncio
+import hashlib
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from agents import ToolCallItem
+from whatsapp_agent.context.global_context import GlobalContext
+from whatsapp_agent.database.boost_buddy_persona import persona_cache
+from whatsapp_agent.database.knowledge_base_version import KnowledgeBaseVersionDB
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent.utils.vector_store import vector_store_registry
+from whatsapp_agent._debug import Logger
+
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_VERSION_POLL_SECONDS = 30
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Short vectors keep the linear similarity scan cheap without a vector library
+EMBEDDING_DIMENSIONS = 256
+# "yes", "ok" and similar only make sense with the chat history; "delivery time?" is enough
+MIN_QUESTION_TOKENS = 2
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# First-person questions and IDs (order numbers, emails, phones) are never shared. Policy
+# questions ("what is your return policy?") are; answers that needed a lookup tool are
+# kept out of the cache by store()
+_PERSONAL_RE = re.compile(r"(\bmy\b|\bmine\b|@|\d{4,})", re.IGNORECASE)
+# Follow-ups that refer back to earlier messages
+_REFERENTIAL_WORDS = {"it", "its", "that", "this", "these", "those", "they", "them", "same", "above"}
+
+
+def _config_float(key: str, default: float) -> float:
+    try:
+        return float(Config.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _config_flag(key: str, default: bool) -> bool:
+    value = Config.get(key, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def normalize_question(text: str) -> str:
+    return " ".join(_WORD_RE.findall((text or "").lower()))
+
+
+def _unit(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+@dataclass
+class _Entry:
+    question: str
+    embedding: List[float]
+    answer: str
+    created_at: float
+
+
+@dataclass
+class CacheLookup:
+    """Result of a lookup; carries the embedding so a miss can be stored without a second call."""
+    normalized: str
+    answer: Optional[str] = None
+    embedding: Optional[List[float]] = None
+    cacheable: bool = True
+    version: Optional[Tuple] = None
+
+
+class SemanticAnswerCache:
+    """
+    Process-wide cache of D2C support answers to non-personalized questions.
+
+    Questions are normalized and embedded; a new question reuses a stored answer when its
+    cosine similarity reaches SEMANTIC_CACHE_THRESHOLD. Entries expire after
+    SEMANTIC_CACHE_TTL_SECONDS and the least recently used are evicted beyond
+    SEMANTIC_CACHE_MAX_ENTRIES.
+
+    Entries belong to a version made of the shared knowledge base counter (bumped by every
+    FAQ or document change and polled every SEMANTIC_CACHE_VERSION_POLL_SECONDS), the
+    persona version and the vector store registry version. A lookup under a different
+    version clears the cache, so edits made through any worker reach every worker.
+
+    Turns are bypassed when the question is about the customer's own things ("my", emails,
+    order or phone numbers) or is a one-word or referential follow-up. Answers are not
+    stored when the agent called any tool other than file search or when they mention the
+    customer's name.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._entries_version: Optional[Tuple] = None
+        self._kb_version: Optional[int] = None
+        self._db: Optional[KnowledgeBaseVersionDB] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._key_fingerprint: Optional[str] = None
+        self._stats = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "stored": 0,
+            "evicted": 0,
+            "expired": 0,
+            "invalidations": 0,
+            "embedding_errors": 0,
+        }
+
+    @staticmethod
+    def enabled() -> bool:
+        return _config_flag("SEMANTIC_CACHE_ENABLED", True)
+
+    @staticmethod
+    def _ttl() -> float:
+        return _config_float("SEMANTIC_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+
+    @staticmethod
+    def _threshold() -> float:
+        return _config_float("SEMANTIC_CACHE_THRESHOLD", DEFAULT_THRESHOLD)
+
+    @staticmethod
+    def _max_entries() -> int:
+        return max(1, int(_config_float("SEMANTIC_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)))
+
+    @staticmethod
+    def _version_poll_seconds() -> float:
+        return _config_float("SEMANTIC_CACHE_VERSION_POLL_SECONDS", DEFAULT_VERSION_POLL_SECONDS)
+
+    def _get_db(self) -> KnowledgeBaseVersionDB:
+        if self._db is None:
+            self._db = KnowledgeBaseVersionDB()
+        return self._db
+
+    @staticmethod
+    def _openai_key_fingerprint() -> str:
+        return hashlib.sha256(str(Config.get("OPENAI_API_KEY", "") or "").encode("utf-8")).hexdigest()
+
+    def check_openai_key(self):
+        """Clear the cache when the OpenAI key changed since the answers were cached."""
+        fingerprint = self._openai_key_fingerprint()
+        if fingerprint != self._key_fingerprint:
+            self._key_fingerprint = fingerprint
+            self.invalidate("OpenAI key changed")
+
+    def _current_version(self) -> Tuple:
+        return self._kb_version, persona_cache.version, vector_store_registry.version
+
+    def _check_version(self) -> Tuple:
+        """Clear entries cached under an older knowledge base, persona or vector store version."""
+        version = self._current_version()
+        if version != self._entries_version:
+            if self._entries:
+                self.invalidate("knowledge base or persona changed")
+            self._entries_version = version
+        return version
+
+    @staticmethod
+    def is_personalized(question: str) -> bool:
+        words = _WORD_RE.findall((question or "").lower())
+        return (
+            len(words) < MIN_QUESTION_TOKENS
+            or bool(_PERSONAL_RE.search(question or ""))
+            or any(word in _REFERENTIAL_WORDS for word in words)
+        )
+
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        client = Config.get_openai_client()
+        if client is None:
+            return None
+        try:
+            response = await client.embeddings.create(model=EMBEDDING_MODEL, input=text, dimensions=EMBEDDING_DIMENSIONS)
+            return _unit(response.data[0].embedding)
+        except Exception as e:
+            self._stats["embedding_errors"] += 1
+            Logger.warning(f"{__name__}: _embed -> Failed to embed question for the answer cache: {e}")
+            return None
+
+    def _expire(self):
+        cutoff = time.monotonic() - self._ttl()
+        for key in [key for key, entry in self._entries.items() if entry.created_at < cutoff]:
+            del self._entries[key]
+            self._stats["expired"] += 1
+
+    async def lookup(self, question: str) -> CacheLookup:
+        """Return the cached answer for a question, if any."""
+        normalized = normalize_question(question)
+        if not self.enabled() or self.is_personalized(question):
+            self._stats["bypassed"] += 1
+            return CacheLookup(normalized, cacheable=False)
+
+        version = self._check_version()
+        self._expire()
+        entry = self._entries.get(normalized)
+        if entry is not None:
+            self._entries.move_to_end(normalized)
+            self._stats["exact_hits"] += 1
+            return CacheLookup(normalized, answer=entry.answer, embedding=entry.embedding, version=version)
+
+        embedding = await self._embed(normalized)
+        if embedding is None:
+            self._stats["misses"] += 1
+            return CacheLookup(normalized, cacheable=False)
+
+        best_key, best_score = None, 0.0
+        for key, candidate in self._entries.items():
+            score = sum(a * b for a, b in zip(embedding, candidate.embedding))
+            if score > best_score:
+                best_key, best_score = key, score
+        if best_key is not None and best_score >= self._threshold():
+            self._entries.move_to_end(best_key)
+            self._stats["semantic_hits"] += 1
+            Logger.info(f"Answer cache hit ({best_score:.3f}): '{normalized}' ~ '{best_key}'")
+            return CacheLookup(normalized, answer=self._entries[best_key].answer, embedding=embedding, version=version)
+
+        self._stats["misses"] += 1
+        return CacheLookup(normalized, embedding=embedding, version=version)
+
+    def store(self, lookup: CacheLookup, answer: str, result: Any, global_context: GlobalContext):
+        """Cache the answer of a missed lookup when the turn was not personalized."""
+        if not lookup.cacheable or lookup.embedding is None or not answer:
+            return
+        if self._check_version() != lookup.version:
+            # The knowledge base changed while the agent was answering
+            return
+        called_tools = [getattr(item.raw_item, "name", None) for item in result.new_items if isinstance(item, ToolCallItem)]
+        if any(called_tools):
+            # Only file search calls have no name; any function or MCP tool means live data
+            return
+        customer_name = global_context.customer_context.customer_name
+        if customer_name and customer_name.lower() in answer.lower():
+            return
+
+        self._entries[lookup.normalized] = _Entry(lookup.normalized, lookup.embedding, answer, time.monotonic())
+        self._entries.move_to_end(lookup.normalized)
+        self._stats["stored"] += 1
+        while len(self._entries) > self._max_entries():
+            self._entries.popitem(last=False)
+            self._stats["evicted"] += 1
+
+    def invalidate(self, reason: str = ""):
+        """Drop every cached answer, e.g. after the FAQs changed."""
+        if self._entries:
+            Logger.info(f"Clearing {len(self._entries)} cached answers{f' ({reason})' if reason else ''}")
+        self._entries.clear()
+        self._stats["invalidations"] += 1
+
+    async def knowledge_base_changed(self, reason: str = ""):
+        """Clear this worker's answers and bump the shared version so other workers clear theirs."""
+        self.invalidate(reason)
+        try:
+            self._kb_version = await asyncio.to_thread(self._get_db().bump)
+        except Exception as e:
+            Logger.warning(f"{__name__}: knowledge_base_changed -> Failed to bump the knowledge base version: {e}")
+        self._entries_version = self._current_version()
+
+    async def _refresh_version(self):
+        self._kb_version = await asyncio.to_thread(self._get_db().get_version)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self._version_poll_seconds())
+            try:
+                await self._refresh_version()
+            except Exception as e:
+                Logger.warning(f"{__name__}: _poll -> Failed to check the knowledge base version: {e}")
+
+    async def start(self):
+        """Load the shared knowledge base version and keep polling it."""
+        try:
+            self._key_fingerprint = await asyncio.to_thread(self._openai_key_fingerprint)
+            await self._refresh_version()
+        except Exception as e:
+            Logger.error(f"Failed to load the knowledge base version at startup: {e}")
+        if self._poll_task is None and self._version_poll_seconds() > 0:
+            self._poll_task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            await asyncio.gather(self._poll_task, return_exceptions=True)
+            self._poll_task = None
+
+    def metrics(self) -> Dict[str, Any]:
+        hits = self._stats["exact_hits"] + self._stats["semantic_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            "enabled": self.enabled(),
+            "entries": len(self._entries),
+            **self._stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+        }
+
+
+semantic_answer_cache = SemanticAnswerCache()
+
+
+def _on_cache_config_change(new_version: int):
+    """A new OpenAI key may mean different embeddings and knowledge base; other settings keep the cache.
+
+    New vector store IDs bump the registry version, which clears the cache on the next lookup.
+    """
+    semantic_answer_cache.check_openai_key()
+
+Config.add_listener(_on_cache_config_change)
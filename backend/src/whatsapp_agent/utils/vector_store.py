@@ -1,5 +1,8 @@
-from typing import Dict, Any, List
+import asyncio
+import threading
+from typing import Dict, Any, List, Optional
 from whatsapp_agent.utils.config import Config
+from whatsapp_agent._debug import Logger
 
 
 class VectorStoreManager:
@@ -40,6 +43,7 @@ class VectorStoreManager:
         Creates a new vector store.
         """
         vector_store = self.client.vector_stores.create(name=name)
+        vector_store_registry.register(name, vector_store.id)
         return vector_store.to_dict()
 
     def list_vector_stores(self) -> List[Dict[str, Any]]:
@@ -54,6 +58,7 @@ class VectorStoreManager:
         Deletes a vector store by ID.
         """
         deleted = self.client.vector_stores.delete(vector_store_id)
+        vector_store_registry.forget(vector_store_id)
         return deleted.to_dict()
 
     # ---------- Vector Store Files ----------
@@ -86,11 +91,128 @@ class VectorStoreManager:
 
     def get_vector_store_id(self, name: str):
         """
-        Fetches the ID of a vector store by name.
+        Fetches the ID of a vector store by name (served from the process-wide registry).
         """
-        response = self.list_vector_stores()
-        for store in response:
-            if store['name'] == name:
-                return store['id']
-        return None
+        return vector_store_registry.get_id(name)
+
+    def _fetch_vector_store_ids(self) -> Dict[str, str]:
+        """
+        Maps every vector store name to its ID, walking all result pages.
+        The first store wins when names are duplicated, matching the old lookup.
+        """
+        ids: Dict[str, str] = {}
+        for store in self.client.vector_stores.list():
+            if store.name and store.name not in ids:
+                ids[store.name] = store.id
+        return ids
+
+
+class VectorStoreRegistry:
+    """
+    Process-wide cache of vector store name -> ID.
+
+    Loaded once at startup (refresh()), updated in place when VectorStoreManager creates or
+    deletes stores, and reloaded in the background when the OpenAI config changes, so
+    resolving store IDs while building an agent needs no network call.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, str] = {}
+        self._loaded = False
+        self._version = 0
+        self._lock = threading.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _load(self):
+        ids = VectorStoreManager()._fetch_vector_store_ids()
+        with self._lock:
+            if ids != self._ids:
+                self._version += 1
+            self._ids = ids
+            self._loaded = True
+        Logger.info(f"Loaded {len(ids)} vector store IDs")
+
+    async def refresh(self):
+        """Reload the registry from OpenAI without blocking the event loop."""
+        await asyncio.to_thread(self._load)
+
+    def refresh_in_background(self):
+        """Schedule a refresh on the running loop, or refresh inline when there is none."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._load()
+            return
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        self._refresh_task = loop.create_task(self.refresh())
+        self._refresh_task.add_done_callback(self._log_refresh_error)
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            Logger.error(f"{__name__}: refresh -> Failed to refresh vector store IDs: {task.exception()}")
+
+    async def ensure_loaded(self):
+        """
+        Wait until the registry holds a real load. Callers that act on a missing ID
+        (creating the store, answering 404) need this; agents use get_id instead.
+        """
+        if self._loaded:
+            return
+        task = self._refresh_task
+        if task is not None and not task.done():
+            await asyncio.gather(task, return_exceptions=True)
+        if not self._loaded:
+            await self.refresh()
+
+    def get_id(self, name: str) -> Optional[str]:
+        if not self._loaded:
+            # Only reached if the startup refresh failed. Never do I/O on the event loop here:
+            # the reload bumps `version`, so agents built without the IDs are rebuilt with them
+            self.refresh_in_background()
+        return self._ids.get(name)
+
+    def get_ids(self, *names: str) -> List[str]:
+        """IDs of the named stores that are known, in order (missing ones are skipped)."""
+        return [store_id for store_id in (self.get_id(name) for name in names) if store_id]
+
+    def register(self, name: str, store_id: str):
+        with self._lock:
+            if name not in self._ids:
+                self._ids[name] = store_id
+                self._version += 1
+
+    def forget(self, store_id: str):
+        with self._lock:
+            ids = {name: sid for name, sid in self._ids.items() if sid != store_id}
+            if ids != self._ids:
+                self._version += 1
+            self._ids = ids
+        # Another store may share the name; let the next refresh find it
+        self.refresh_in_background()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def version(self) -> int:
+        """Bumped whenever the name -> ID map changes, so cached agents know to rebuild."""
+        return self._version
+
+    def invalidate(self):
+        """Reload in the background; the current IDs are served until the reload finishes."""
+        self.refresh_in_background()
+
+
+vector_store_registry = VectorStoreRegistry()
+
+
+def _on_vector_store_config_change(new_version: int):
+    """A new OpenAI key may point at a different set of stores."""
+    if vector_store_registry.loaded:
+        vector_store_registry.invalidate()
+
+Config.add_listener(_on_vector_store_config_change)
         
@@ -0,0 +1,372 @@
+"""
+Durable queue in front of the pywa webhook.
+
+POST /webhook only validates the signature, stores the raw update in a local SQLite
+database and answers 200. A pool of workers feeds stored updates to pywa's own
+`webhook_update_handler`, retries failures with exponential backoff and moves updates
+that keep failing to a dead-letter state. Updates that were in flight when the process
+stopped are picked up again on the next start (delivery is at-least-once). The bot
+records the finished steps of every message in `message_stages`, so a replay only
+redoes what did not finish.
+
+Row life cycle: pending -> processing -> dispatched (handed to the message queues)
+-> done, or pending again (retry) -> dead after WEBHOOK_QUEUE_MAX_ATTEMPTS. An update
+fails when pywa rejects it or when any message job it queued raises.
+"""
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from fastapi import Request, Response
+from pywa_async import utils as pywa_utils
+from whatsapp_agent.utils import wa_instance
+from whatsapp_agent.utils.config import Config
+from whatsapp_agent.utils.message_dispatcher import dispatched_jobs
+from whatsapp_agent.utils.message_stages import message_stages
+from whatsapp_agent._debug import Logger
+
+DEFAULT_DB_PATH = "webhook_queue.db"
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_ATTEMPTS = 5
+MAX_RETRY_DELAY_SECONDS = 300
+IDLE_POLL_SECONDS = 1.0
+RETENTION_SECONDS = 24 * 60 * 60
+PURGE_INTERVAL_SECONDS = 60 * 60
+
+STATUSES = ("pending", "processing", "dispatched", "done", "dead")
+
+
+def _config_flag(key: str, default: bool) -> bool:
+    value = Config.get(key, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _config_int(key: str, default: int) -> int:
+    try:
+        return max(1, int(Config.get(key, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+class WebhookQueue:
+    """SQLite-backed store of raw webhook updates. Methods are blocking; call them in a thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS webhook_updates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                update_hash TEXT NOT NULL UNIQUE,
+                payload BLOB NOT NULL,
+                signature TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                available_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_webhook_updates_status ON webhook_updates (status, available_at, id)"
+        )
+
+    def enqueue(self, payload: bytes, signature: Optional[str]) -> bool:
+        """Store an update. Returns False if the same update was already stored (Meta retry)."""
+        update_hash = hashlib.sha256(payload).hexdigest()
+        now = time.time()
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO webhook_updates "
+                "(update_hash, payload, signature, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (update_hash, payload, signature, now, now, now),
+            )
+            return cursor.rowcount > 0
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Take the oldest pending update that is due and mark it as processing."""
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    "SELECT id, payload, signature, attempts FROM webhook_updates "
+                    "WHERE status = 'pending' AND available_at <= ? ORDER BY id LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    self._connection.execute(
+                        "UPDATE webhook_updates SET status = 'processing', attempts = attempts + 1, updated_at = ? "
+                        "WHERE id = ?",
+                        (now, row[0]),
+                    )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {"id": row[0], "payload": row[1], "signature": row[2], "attempts": row[3] + 1}
+
+    def _set_status(self, update_id: int, status: str):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE webhook_updates SET status = ?, updated_at = ? WHERE id = ?",
+                (status, time.time(), update_id),
+            )
+
+    def mark_dispatched(self, update_id: int):
+        self._set_status(update_id, "dispatched")
+
+    def mark_done(self, update_id: int):
+        self._set_status(update_id, "done")
+
+    def fail(self, update_id: int, attempts: int, error: str, max_attempts: int) -> str:
+        """Schedule a retry with exponential backoff, or dead-letter the update. Returns the new status."""
+        now = time.time()
+        status = "dead" if attempts >= max_attempts else "pending"
+        delay = min(2 ** attempts, MAX_RETRY_DELAY_SECONDS)
+        with self._lock:
+            self._connection.execute(
+                "UPDATE webhook_updates SET status = ?, last_error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+                (status, error[:1000], now + delay, now, update_id),
+            )
+        return status
+
+    def recover(self) -> int:
+        """Return updates left in flight by a previous process to the pending state."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE webhook_updates SET status = 'pending', available_at = ?, updated_at = ? "
+                "WHERE status IN ('processing', 'dispatched')",
+                (time.time(), time.time()),
+            )
+            return cursor.rowcount
+
+    def requeue_dead(self) -> int:
+        """Give dead-lettered updates a fresh set of attempts."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE webhook_updates SET status = 'pending', attempts = 0, available_at = ?, updated_at = ? "
+                "WHERE status = 'dead'",
+                (time.time(), time.time()),
+            )
+            return cursor.rowcount
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished updates older than `older_than` seconds."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM webhook_updates WHERE status = 'done' AND updated_at < ?",
+                (time.time() - older_than,),
+            )
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, COUNT(*) FROM webhook_updates GROUP BY status"
+            ).fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class WebhookQueueWorkers:
+    """Async workers that drain the WebhookQueue into pywa's update handler."""
+
+    def __init__(self):
+        self._queue: Optional[WebhookQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._completions: set = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_purge = 0.0
+
+    @staticmethod
+    def enabled() -> bool:
+        return _config_flag("WEBHOOK_QUEUE_ENABLED", True)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def _get_queue(self) -> WebhookQueue:
+        if self._queue is None:
+            self._queue = WebhookQueue(Config.get("WEBHOOK_QUEUE_PATH", DEFAULT_DB_PATH) or DEFAULT_DB_PATH)
+        return self._queue
+
+    async def start(self):
+        """Recover in-flight updates and start the workers."""
+        if self.running or not self.enabled():
+            return
+        queue = self._get_queue()
+        recovered = await asyncio.to_thread(queue.recover)
+        if recovered:
+            Logger.warning(f"Recovered {recovered} webhook updates left in flight by a previous run")
+
+        self._wakeup = asyncio.Event()
+        worker_count = _config_int("WEBHOOK_QUEUE_WORKERS", DEFAULT_WORKERS)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(worker_count)]
+        Logger.info(f"Started {worker_count} webhook queue workers using {queue.path}")
+
+    async def stop(self, timeout: float = 30.0):
+        """Stop the workers; updates that are still unfinished are recovered on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Give updates already handed to the message queues a chance to be marked done
+        if self._completions:
+            await asyncio.wait(list(self._completions), timeout=timeout)
+        if self._queue is not None:
+            self._queue.close()
+            self._queue = None
+        message_stages.close()
+
+    async def enqueue(self, payload: bytes, signature: Optional[str]) -> bool:
+        stored = await asyncio.to_thread(self._get_queue().enqueue, payload, signature)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return stored
+
+    async def _worker(self, index: int):
+        queue = self._get_queue()
+        while True:
+            try:
+                update = await asyncio.to_thread(queue.claim)
+                if update is None:
+                    await self._maybe_purge(queue)
+                    await self._wait_for_work()
+                    continue
+                await self._process(queue, update)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                Logger.error(f"{__name__}: _worker -> Webhook worker {index} error: {e}")
+                await asyncio.sleep(IDLE_POLL_SECONDS)
+
+    async def _wait_for_work(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=IDLE_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _maybe_purge(self, queue: WebhookQueue):
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = time.monotonic()
+        purged = await asyncio.to_thread(queue.purge, RETENTION_SECONDS)
+        if purged:
+            Logger.info(f"Purged {purged} handled webhook updates")
+        try:
+            await message_stages.purge(RETENTION_SECONDS)
+        except Exception as e:
+            Logger.warning(f"{__name__}: _maybe_purge -> Failed to purge message stages: {e}")
+
+    async def _fail(self, queue: WebhookQueue, update: Dict[str, Any], error: Exception):
+        max_attempts = _config_int("WEBHOOK_QUEUE_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)
+        status = await asyncio.to_thread(queue.fail, update["id"], update["attempts"], str(error) or repr(error), max_attempts)
+        log = Logger.error if status == "dead" else Logger.warning
+        log(f"Webhook update {update['id']} failed (attempt {update['attempts']}, now {status}): {error}")
+
+    async def _process(self, queue: WebhookQueue, update: Dict[str, Any]):
+        update_id = update["id"]
+        jobs: List[asyncio.Future] = []
+        token = dispatched_jobs.set(jobs)
+        try:
+            # Look the client up on every call; it is replaced when the config changes
+            content, status_code = await wa_instance.wa.webhook_update_handler(
+                update=update["payload"],
+                hmac_header=update["signature"],
+            )
+            if status_code >= 400:
+                raise ValueError(f"pywa rejected the update ({status_code}): {content}")
+        except Exception as e:
+            await self._fail(queue, update, e)
+            return
+        finally:
+            dispatched_jobs.reset(token)
+
+        if not jobs:
+            await asyncio.to_thread(queue.mark_done, update_id)
+            return
+
+        # The row stays "dispatched" until the queued messages were answered, so a crash
+        # in the meantime replays the update on the next start
+        await asyncio.to_thread(queue.mark_dispatched, update_id)
+        completion = asyncio.create_task(self._complete(queue, update, jobs))
+        self._completions.add(completion)
+        completion.add_done_callback(self._completions.discard)
+
+    async def _complete(self, queue: WebhookQueue, update: Dict[str, Any], jobs: List[asyncio.Future]):
+        """
+        Mark the update done once its jobs finished, or retry it if any job failed.
+        pywa swallows handler errors, so the job futures are the only place a failed
+        agent run or send shows up. A retry replays every message of the update; the bot
+        skips the steps `message_stages` shows as finished.
+        """
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        if self._queue is not queue:
+            return
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            await self._fail(queue, update, errors[0])
+        else:
+            await asyncio.to_thread(queue.mark_done, update["id"])
+
+    async def metrics(self) -> Dict[str, Any]:
+        if not self.running:
+            return {"enabled": self.enabled(), "running": False}
+        counts = await asyncio.to_thread(self._get_queue().counts)
+        return {"enabled": True, "running": True, "workers": len(self._tasks), **counts}
+
+
+webhook_workers = WebhookQueueWorkers()
+
+
+async def fast_ack_webhook(request: Request, call_next):
+    """
+    HTTP middleware answering WhatsApp webhook POSTs as soon as the update is stored.
+    Everything else (including the GET verification challenge) goes to the normal routes.
+    """
+    if request.method != "POST" or request.url.path != "/webhook" or not webhook_workers.running:
+        return await call_next(request)
+
+    payload = await request.body()
+    signature = request.headers.get(pywa_utils.HUB_SIG)
+    app_secret = Config.get("WHATSAPP_APP_SECRET")
+    if app_secret:
+        if not signature or not pywa_utils.webhook_updates_validator(
+            app_secret=app_secret,
+            request_body=payload,
+            x_hub_signature=signature,
+        ):
+            Logger.warning("Rejected webhook update with a missing or invalid signature")
+            return Response(content="Error, invalid signature", status_code=401, media_type="text/plain")
+
+    try:
+        stored = await webhook_workers.enqueue(payload, signature)
+    except Exception as e:
+        # Let Meta retry rather than lose the update
+        Logger.error(f"{__name__}: fast_ack_webhook -> Failed to store webhook update: {e}")
+        return Response(content="Error, could not store update", status_code=503, media_type="text/plain")
+
+    if not stored:
+        Logger.debug("Ignored duplicate webhook update")
+    return Response(content="ok", status_code=200, media_type="text/plain")
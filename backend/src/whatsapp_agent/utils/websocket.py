@@ -19,6 +19,10 @@ class ConnectionManager:
             if not self.active_connections[phone_number]:
                 del self.active_connections[phone_number]
 
+    def has_connections(self, phone_number: str) -> bool:
+        """Whether any dashboard is watching this phone number."""
+        return bool(self.active_connections.get(phone_number))
+
     async def send_to_phone(self, phone_number: str, data: BaseModel):
         """Send data only to connections for a specific phone number."""
         json_str = data.model_dump_json()
@@ -2,6 +2,24 @@ from pywa_async import WhatsApp, types, filters
 from whatsapp_agent.bot.whatsapp_bot import WhatsappBot
 from whatsapp_agent._debug import Logger
 from whatsapp_agent.utils.wa_instance import wa  # Import the existing wa instance
+from whatsapp_agent.utils.message_dispatcher import message_dispatcher, dispatched_jobs
+from whatsapp_agent.utils.message_coalescer import message_coalescer
+
+
+def _dispatch(msg: types.Message, message_type: str):
+    """
+    Queue the workflow behind earlier messages from the same customer.
+    Messages arriving within the coalescing window are answered together.
+    """
+    phone_number = msg.from_user.wa_id
+    job = message_coalescer.add(
+        phone_number,
+        (msg, message_type),
+        lambda batch: message_dispatcher.submit(phone_number, lambda: WhatsappBot.execute_batch(batch)),
+    )
+    jobs = dispatched_jobs.get()
+    if jobs is not None:
+        jobs.append(job)
 
 
 @wa.on_message(filters.text)
@@ -9,9 +27,9 @@ async def handle_text_message(client: WhatsApp, msg: types.Message):
     """Handle text messages"""
     try:
         Logger.info(f"TEXT MESSAGE RECEIVED: {msg.text} from {msg.from_user.wa_id}")
-        await WhatsappBot.execute_workflow(msg, message_type="text")
+        _dispatch(msg, "text")
         
-        Logger.info(f"Successfully processed text message from {msg.from_user.wa_id}")
+        Logger.info(f"Queued text message from {msg.from_user.wa_id}")
         return True
         
     except Exception as e:
@@ -23,9 +41,9 @@ async def handle_voice_message(client: WhatsApp, msg: types.Message):
     """Handle voice/audio messages"""
     try:
         Logger.info(f"VOICE MESSAGE RECEIVED from {msg.from_user.wa_id}")
-        await WhatsappBot.execute_workflow(msg, message_type="audio")
+        _dispatch(msg, "audio")
         
-        Logger.info(f"Successfully processed voice message from {msg.from_user.wa_id}")
+        Logger.info(f"Queued voice message from {msg.from_user.wa_id}")
         return True
 
     except Exception as e:
@@ -37,9 +55,9 @@ async def handle_image_message(client: WhatsApp, msg: types.Message):
     """Handle image messages"""
     try:
         Logger.info(f"IMAGE MESSAGE RECEIVED from {msg.from_user.wa_id}")
-        await WhatsappBot.execute_workflow(msg, message_type="image")
+        _dispatch(msg, "image")
         
-        Logger.info(f"Successfully processed image message from {msg.from_user.wa_id}")
+        Logger.info(f"Queued image message from {msg.from_user.wa_id}")
         return True
 
     except Exception as e:
@@ -51,9 +69,9 @@ async def handle_document_message(client: WhatsApp, msg: types.Message):
     """Handle document messages"""
     try:
         Logger.info(f"DOCUMENT MESSAGE RECEIVED from {msg.from_user.wa_id}")
-        await WhatsappBot.execute_workflow(msg, message_type="document")
+        _dispatch(msg, "document")
         
-        Logger.info(f"Successfully processed document message from {msg.from_user.wa_id}")
+        Logger.info(f"Queued document message from {msg.from_user.wa_id}")
         return True
 
     except Exception as e:
@@ -65,9 +83,9 @@ async def handle_video_message(client: WhatsApp, msg: types.Message):
     """Handle video messages"""
     try:
         Logger.info(f"VIDEO MESSAGE RECEIVED from {msg.from_user.wa_id}")
-        await WhatsappBot.execute_workflow(msg, message_type="video")
+        _dispatch(msg, "video")
         
-        Logger.info(f"Successfully processed video message from {msg.from_user.wa_id}")
+        Logger.info(f"Queued video message from {msg.from_user.wa_id}")
         return True
 
     except Exception as e:
@@ -70,7 +70,7 @@ export default function ChatClient({ phone }: { phone: string }) {
 	useEffect(() => {
 		async function fetchChat() {
 			try {
-				const res = await fetch(`/api/chats/${phone}?page=1&messages_count=20`, {
+				const res = await fetch(`/api/chats/${phone}/messages?limit=20`, {
 					method: 'GET',
 					headers: { Accept: 'application/json' },
 				});
@@ -216,7 +216,7 @@ export default function ChatClient({ phone }: { phone: string }) {
 
 				// Force a complete refresh of chat data
 				try {
-					const refreshRes = await fetch(`/api/chats/${phone}?page=1&messages_count=20`, {
+					const refreshRes = await fetch(`/api/chats/${phone}/messages?limit=20`, {
 						method: 'GET',
 						headers: {
 							Accept: 'application/json',
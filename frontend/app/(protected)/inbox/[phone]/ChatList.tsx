@@ -2,7 +2,7 @@
 
 import { SendHorizonal, Paperclip, ChevronDown, FileText } from "lucide-react";
 import React, { useState, useRef, useEffect, useCallback } from "react";
-import { ChatMessage } from "@/types/chat";
+import { AgentStreamFrame, ChatMessage } from "@/types/chat";
 import ChatBubble from "@/components/ui/ChatBubble";
 import Spinner from "@/components/ui/Spinner";
 import Toast from "@/components/ui/Toast";
@@ -11,6 +11,7 @@ interface ChatProps {
 	chat: {
 		messages: ChatMessage[];
 		phone_number: string;
+		has_older?: boolean;
 	};
 	escalationStatus: boolean;
 	repName?: string;
@@ -22,12 +23,12 @@ function ChatList({ chat, escalationStatus, repName = "Support Agent" }: ChatPro
 	const [inputValue, setInputValue] = useState("");
 	const [loading, setLoading] = useState(false);
 	const [loadingOlder, setLoadingOlder] = useState(false);
-	const [page, setPage] = useState(1);
-	const [hasMore, setHasMore] = useState(true);
+	const [hasMore, setHasMore] = useState(chat.has_older ?? true);
 	const [wsStatus, setWsStatus] = useState<'connecting' | 'connected' | 'disconnected' | 'error'>('disconnected');
 	const [showQuickMessages, setShowQuickMessages] = useState(false);
 	const [uploadingFile, setUploadingFile] = useState(false);
 	const [toast, setToast] = useState<{ message: string; type: 'success' | 'error' } | null>(null);
+	const [streamDraft, setStreamDraft] = useState<(ChatMessage & { stream_id: string }) | null>(null);
 
 	// Refs
 	const containerRef = useRef<HTMLDivElement>(null);
@@ -86,10 +87,18 @@ function ChatList({ chat, escalationStatus, repName = "Support Agent" }: ChatPro
 		const currentScrollHeight = container.scrollHeight;
 		const currentScrollTop = container.scrollTop;
 
+		// Messages pushed over the WebSocket have no seq, but they are always the newest
+		const oldestSeq = messages.find((msg) => msg.seq !== undefined)?.seq;
+		if (oldestSeq === undefined) {
+			setHasMore(false);
+			isLoadingOlderRef.current = false;
+			setLoadingOlder(false);
+			return;
+		}
+
 		try {
-			const nextPage = page + 1;
 			const res = await fetch(
-				`/api/chats/${chat.phone_number}?page=${nextPage}&messages_count=20`
+				`/api/chats/${chat.phone_number}/messages?limit=20&before=${oldestSeq}`
 			);
 
 			if (!res.ok) throw new Error(`Failed to fetch: ${res.status}`);
@@ -103,7 +112,7 @@ function ChatList({ chat, escalationStatus, repName = "Support Agent" }: ChatPro
 
 				// Add older messages to the beginning
 				setMessages((prev) => [...olderMessages, ...prev]);
-				setPage(nextPage);
+				setHasMore(Boolean(data.has_older));
 
 				// Restore scroll position after DOM updates
 				requestAnimationFrame(() => {
@@ -125,7 +134,7 @@ function ChatList({ chat, escalationStatus, repName = "Support Agent" }: ChatPro
 				setLoadingOlder(false);
 			}, 300);
 		}
-	}, [chat.phone_number, hasMore, page])
+	}, [chat.phone_number, hasMore, messages])
 
 	// Initial scroll to bottom on mount
 	useEffect(() => {
@@ -160,6 +169,29 @@ function ChatList({ chat, escalationStatus, repName = "Support Agent" }: ChatPro
 	// Fetch older messages
 
 
+	// Agent replies stream in as a draft bubble until the complete message arrives
+	const handleStreamFrame = useCallback((frame: AgentStreamFrame) => {
+		if (frame.event === 'done') {
+			setStreamDraft(null);
+			return;
+		}
+		setStreamDraft((prev) => {
+			const draft = prev && prev.stream_id === frame.stream_id
+				? prev
+				: { stream_id: frame.stream_id, sender: 'agent', message_type: 'text', content: '', time_stamp: frame.time_stamp };
+			if (frame.event === 'delta') {
+				return { ...draft, content: draft.content + frame.delta };
+			}
+			if (frame.event === 'reset') {
+				return { ...draft, content: '' };
+			}
+			return draft;
+		});
+		if (frame.event === 'start') {
+			setTimeout(() => scrollToBottom(), 100);
+		}
+	}, [scrollToBottom]);
+
 	// WebSocket connection
 	const connectWebSocket = useCallback(() => {
 		if (wsRef.current?.readyState === WebSocket.OPEN) return;
@@ -184,7 +216,12 @@ function ChatList({ chat, escalationStatus, repName = "Support Agent" }: ChatPro
 
 			ws.onmessage = (event) => {
 				try {
-					const msg: ChatMessage = JSON.parse(event.data);
+					const data = JSON.parse(event.data);
+					if ('stream_id' in data) {
+						handleStreamFrame(data as AgentStreamFrame);
+						return;
+					}
+					const msg: ChatMessage = data;
 					setMessages((prev) => {
 						const exists = prev.some(
 							(m) => m.sender === msg.sender &&
@@ -224,7 +261,7 @@ function ChatList({ chat, escalationStatus, repName = "Support Agent" }: ChatPro
 			console.error('Failed to create WebSocket:', error);
 			setWsStatus('error');
 		}
-	}, [chat.phone_number, scrollToBottom]);
+	}, [chat.phone_number, scrollToBottom, handleStreamFrame]);
 
 	useEffect(() => {
 		connectWebSocket();
@@ -466,6 +503,10 @@ function ChatList({ chat, escalationStatus, repName = "Support Agent" }: ChatPro
 					return <ChatBubble message={msg} key={`${msg.time_stamp}-${i}`}/>
 				})}
 
+				{streamDraft && (
+					<ChatBubble message={{ ...streamDraft, content: streamDraft.content || '…' }} key={streamDraft.stream_id}/>
+				)}
+
 				<div ref={bottomRef} />
 			</div>
 
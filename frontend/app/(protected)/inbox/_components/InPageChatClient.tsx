@@ -78,7 +78,7 @@ export default function ChatClient({ phone, setSelectedPhone, onEscalationChange
     useEffect(() => {
         async function fetchChat() {
             try {
-                const res = await fetch(`/api/chats/${phone}?page=1&messages_count=20`, {
+                const res = await fetch(`/api/chats/${phone}/messages?limit=20`, {
                     method: 'GET',
                     headers: { Accept: 'application/json' },
                 });
@@ -191,7 +191,7 @@ export default function ChatClient({ phone, setSelectedPhone, onEscalationChange
                 setIsEscalated(false);
                 onEscalationChange(phone, false);
                 // try {
-                //     const refreshRes = await fetch(`/api/chats/${phone}?page=1&messages_count=20`, {
+                //     const refreshRes = await fetch(`/api/chats/${phone}/messages?limit=20`, {
                 //         method: 'GET',
                 //         headers: {
                 //             Accept: 'application/json',
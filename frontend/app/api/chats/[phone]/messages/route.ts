@@ -0,0 +1,37 @@
+import { NextRequest } from 'next/server';
+
+// Keyset pagination: pass the `seq` of the oldest loaded message as `before` to load older ones
+export async function GET(
+	req: NextRequest,
+	context: { params: Promise<{ phone: string }> }
+) {
+	const { phone } = await context.params;
+
+	const { searchParams } = new URL(req.url);
+	const query = new URLSearchParams({ limit: searchParams.get('limit') ?? '20' });
+	const before = searchParams.get('before');
+	if (before) query.set('before', before);
+
+	try {
+		const res = await fetch(
+			`${process.env.SERVER_BASE_URL}/chats/${phone}/messages?${query.toString()}`,
+			{
+				method: 'GET',
+				headers: {
+					accept: 'application/json',
+					'x-api-key': process.env.API_KEY ?? 'abcd',
+				},
+				cache: 'no-store',
+			}
+		);
+
+		if (!res.ok) {
+			return Response.json({ error: `Upstream error: ${res.statusText}` }, { status: res.status });
+		}
+
+		return Response.json(await res.json());
+	} catch (err) {
+		console.error('Error fetching chat messages:', err);
+		return Response.json({ error: 'Failed to fetch chat messages' }, { status: 500 });
+	}
+}
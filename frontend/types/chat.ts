@@ -12,6 +12,18 @@ export type ChatMessage = {
 	content: string;
 	message_type: 'audio' | 'text' | 'image' | string;
 	sender: string;
+	// Keyset cursor; set on messages loaded from /chats/{phone}/messages
+	seq?: number;
+}
+
+// Incremental frame of an agent reply that is still being generated
+export type AgentStreamFrame = {
+	stream_id: string;
+	event: 'start' | 'delta' | 'tool_call' | 'tool_output' | 'reset' | 'done';
+	delta: string;
+	tool_name: string | null;
+	sender: 'agent';
+	time_stamp: string;
 }
 
 export type ChatData = {
@@ -9,12 +9,15 @@ interface ChatMessage {
 	content: string;
 	message_type: 'audio' | 'text' | 'image' | string; // can refine if needed
 	sender: string;
+	seq?: number;
 }
 
 export interface ChatApiResponse {
 	phone_number: string;
-	page: number;
+	page?: number;
 	messages: ChatMessage[];
+	next_cursor?: number | null;
+	has_older?: boolean;
 }
 
 